@@ -22,6 +22,7 @@ export default function ProfileScreen() {
   const [profileSaving, setProfileSaving] = useState(false);
   const [referralCode, setReferralCode] = useState<string | null>(null);
   const [referrals, setReferrals] = useState<api.ReferralUser[]>([]);
+  const [referralsTotal, setReferralsTotal] = useState(0);
   const [loadingReferrals, setLoadingReferrals] = useState(false);
   const [achievements, setAchievements] = useState<api.AchievementItem[]>([]);
   const [loadingAchievements, setLoadingAchievements] = useState(false);
@@ -76,6 +77,7 @@ export default function ProfileScreen() {
       
       const referralsResponse = await api.getMyReferrals();
       setReferrals(referralsResponse.referrals);
+      setReferralsTotal(referralsResponse.total_count);
     } catch (error) {
       console.error('Ошибка загрузки реферальных данных:', error);
       Alert.alert('Ошибка', 'Не удалось загрузить данные реферальной программы');
@@ -495,7 +497,7 @@ export default function ProfileScreen() {
 
                 <ThemedView style={styles.section}>
                   <ThemedText type="subtitle" style={styles.sectionTitle}>
-                    Ваши рефералы ({referrals.length})
+                    Ваши рефералы ({referralsTotal})
                   </ThemedText>
                   
                   {referrals.length === 0 ? (
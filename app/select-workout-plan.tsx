@@ -39,7 +39,8 @@ export default function SelectWorkoutPlanScreen() {
   const [heightCm, setHeightCm] = useState('');
   const [weightKg, setWeightKg] = useState('');
   const [age, setAge] = useState('');
-  const [publicPlans, setPublicPlans] = useState<api.CustomWorkoutPlan[]>([]);
+  const [publicPlans, setPublicPlans] = useState<api.PlanSummary[]>([]);
+  const [plansCursor, setPlansCursor] = useState<string | null>(null);
   const [loadingPlans, setLoadingPlans] = useState(false);
 
   const toggleGoal = (g: Goal) => {
@@ -78,13 +79,31 @@ export default function SelectWorkoutPlanScreen() {
   useEffect(() => {
     if (step === 4) {
       setLoadingPlans(true);
-      api.getPublicWorkoutPlans()
-        .then(setPublicPlans)
-        .catch(() => setPublicPlans([]))
+      api.getPublicPlanCatalog('popular')
+        .then((page) => {
+          setPublicPlans(page.items);
+          setPlansCursor(page.next_cursor);
+        })
+        .catch(() => {
+          setPublicPlans([]);
+          setPlansCursor(null);
+        })
         .finally(() => setLoadingPlans(false));
     }
   }, [step]);
 
+  const loadMorePlans = () => {
+    if (!plansCursor || loadingPlans) return;
+    setLoadingPlans(true);
+    api.getPublicPlanCatalog('popular', plansCursor)
+      .then((page) => {
+        setPublicPlans((prev) => [...prev, ...page.items]);
+        setPlansCursor(page.next_cursor);
+      })
+      .catch(() => setPlansCursor(null))
+      .finally(() => setLoadingPlans(false));
+  };
+
   // Шаг 0: Код плана
   const renderStep0 = () => (
     <View style={styles.stepContent}>
@@ -322,7 +341,7 @@ export default function SelectWorkoutPlanScreen() {
           Выберите план и нажмите, чтобы посмотреть детали и расписание.
         </ThemedText>
 
-        {loadingPlans ? (
+        {loadingPlans && publicPlans.length === 0 ? (
           <ThemedText style={[styles.emptyText, { color: colors.text + '99' }]}>
             Загрузка планов...
           </ThemedText>
@@ -345,10 +364,17 @@ export default function SelectWorkoutPlanScreen() {
                   {plan.description || ''}
                 </ThemedText>
                 <ThemedText style={[styles.planMeta, { color: colors.text + '99' }]}>
-                  {plan.schedule?.length || 0} слотов в расписании
+                  {plan.slots_count} слотов в расписании
                 </ThemedText>
               </Pressable>
             ))}
+            {plansCursor && (
+              <Pressable style={[styles.backLink, { borderColor: 'transparent' }]} onPress={loadMorePlans}>
+                <ThemedText style={{ color: colors.tint, fontSize: 14 }}>
+                  {loadingPlans ? 'Загрузка...' : 'Показать ещё'}
+                </ThemedText>
+              </Pressable>
+            )}
           </View>
         )}
 
@@ -0,0 +1,133 @@
+"""
+Сервис аккаунта: удаление пользователя со всеми данными.
+
+Удаление идёт set-based запросами DELETE ... WHERE user_id = :id по таблицам в порядке
+зависимостей, без загрузки дочерних строк в сессию (ORM-каскад грузил бы каждую строку и удалял
+по одной). Для очень длинной истории можно удалять порциями (chunk_size) — каждая порция
+в своей транзакции, строка users удаляется последней, поэтому прерванное удаление можно повторить.
+"""
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.cache import cache, resource_tag
+from app.models import (
+    ActivitySettings,
+    CustomWorkoutPlan,
+    Dish,
+    ExerciseResult,
+    FoodLogEntry,
+    LeaderboardRank,
+    LeaderboardScore,
+    NotificationOutbox,
+    PlanScheduleSlot,
+    StepsEntry,
+    User,
+    UserAchievement,
+    UserPlanEnrollment,
+    UserProfile,
+    Workout,
+    WorkoutSession,
+)
+from app.leaderboards import LEADERBOARD_TAG
+from app.plan_catalog import plan_code_tag, release_user_enrollments
+
+# Порядок важен: сначала строки, которые ссылаются на другие данные пользователя
+# (food_log → dishes, exercise_results/workout_sessions → workouts, enrollments → plans)
+USER_OWNED_MODELS = (
+    NotificationOutbox,
+    LeaderboardRank,
+    LeaderboardScore,
+    FoodLogEntry,
+    ExerciseResult,
+    WorkoutSession,
+    UserPlanEnrollment,
+    UserAchievement,
+    StepsEntry,
+    ActivitySettings,
+    UserProfile,
+    CustomWorkoutPlan,
+    Workout,
+    Dish,
+)
+
+# Составной ключ без id (порциями по id не удалить); строк на пользователя немного — доски
+# за срок хранения и за всё время
+_UNCHUNKED_MODELS = (LeaderboardRank, LeaderboardScore)
+
+
+def _delete_where(db: Session, model, condition, chunk_size: Optional[int]) -> int:
+    """DELETE по условию; при chunk_size — порциями по id, с commit после каждой."""
+    if not chunk_size:
+        result = db.execute(
+            delete(model).where(condition).execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    total = 0
+    while True:
+        ids = select(model.id).where(condition).limit(chunk_size).scalar_subquery()
+        result = db.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted = result.rowcount or 0
+        total += deleted
+        if deleted < chunk_size:
+            return total
+
+
+def delete_user_account(user_id, db: Session, chunk_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Удаляет пользователя и все его данные. Возвращает количество удалённых строк по таблицам.
+    Записи других пользователей на его планы удаляются, у приглашённых им пользователей
+    сбрасывается referred_by_id.
+    """
+    counts: Dict[str, int] = {}
+
+    user_plan_ids = select(CustomWorkoutPlan.id).where(CustomWorkoutPlan.user_id == user_id)
+    had_public_plans = db.execute(
+        select(CustomWorkoutPlan.id)
+        .where(CustomWorkoutPlan.user_id == user_id, CustomWorkoutPlan.is_public == True)
+        .limit(1)
+    ).first() is not None
+    private_codes = db.execute(
+        select(CustomWorkoutPlan.code)
+        .where(CustomWorkoutPlan.user_id == user_id, CustomWorkoutPlan.is_public == False)
+    ).scalars().all()
+
+    counts["user_plan_enrollments:others"] = _delete_where(
+        db, UserPlanEnrollment, UserPlanEnrollment.plan_id.in_(user_plan_ids), chunk_size
+    )
+    counts["plan_schedule_slots"] = _delete_where(
+        db, PlanScheduleSlot, PlanScheduleSlot.plan_id.in_(user_plan_ids), chunk_size
+    )
+    for model in USER_OWNED_MODELS:
+        if model is UserPlanEnrollment:
+            # Счётчики чужих планов уменьшаются в одной транзакции с удалением записей
+            release_user_enrollments(db, user_id)
+            counts[model.__tablename__] = _delete_where(db, model, model.user_id == user_id, None)
+            continue
+        if model in _UNCHUNKED_MODELS:
+            counts[model.__tablename__] = _delete_where(db, model, model.user_id == user_id, None)
+            continue
+        counts[model.__tablename__] = _delete_where(db, model, model.user_id == user_id, chunk_size)
+
+    db.execute(
+        update(User)
+        .where(User.referred_by_id == user_id)
+        .values(referred_by_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    counts["users"] = db.execute(
+        delete(User).where(User.id == user_id).execution_options(synchronize_session=False)
+    ).rowcount or 0
+    db.commit()
+
+    cache.invalidate(*(resource_tag(m.__tablename__, user_id) for m in USER_OWNED_MODELS))
+    if had_public_plans:
+        cache.invalidate(resource_tag("custom_workout_plans"))
+    cache.invalidate(*(plan_code_tag(code) for code in private_codes))
+    cache.invalidate(LEADERBOARD_TAG)
+    return counts
@@ -7,6 +7,7 @@ from typing import Any, List
 
 from sqlalchemy.orm import Session
 
+from app.eager import eager
 from app.models import Achievement, ExerciseResult, User, UserAchievement
 
 # Определения для сидирования
@@ -62,10 +63,18 @@ def _max_streak(dates: List[str]) -> int:
     return max(max_s, curr)
 
 
+# Справочник уже проверен в этом процессе — повторный COUNT не нужен
+_catalog_seeded = False
+
+
 def ensure_achievements_seeded(db: Session) -> None:
     """Создаёт записи в справочнике achievements, если их ещё нет."""
+    global _catalog_seeded
+    if _catalog_seeded:
+        return
     count = db.query(Achievement).count()
     if count > 0:
+        _catalog_seeded = True
         return
     for d in ACHIEVEMENT_DEFS:
         a = Achievement(
@@ -77,6 +86,7 @@ def ensure_achievements_seeded(db: Session) -> None:
         )
         db.add(a)
     db.commit()
+    _catalog_seeded = True
 
 
 def compute_earned_achievement_ids(results: List[ExerciseResult], achievements: List[Achievement]) -> List[str]:
@@ -122,7 +132,7 @@ def compute_earned_achievement_ids(results: List[ExerciseResult], achievements:
 def check_and_award_achievements(user: User, db: Session) -> List[UserAchievement]:
     """
     Проверяет, заработал ли пользователь какие-либо достижения, и выдаёт новые.
-    Возвращает список только что выданных UserAchievement (для пуш-уведомлений).
+    Возвращает список только что выданных UserAchievement с загруженным achievement (для пуш-уведомлений).
     """
     ensure_achievements_seeded(db)
 
@@ -153,9 +163,18 @@ def check_and_award_achievements(user: User, db: Session) -> List[UserAchievemen
         newly_awarded.append(ua)
         existing.add(aid)
 
-    if newly_awarded:
-        db.commit()
-        for ua in newly_awarded:
-            db.refresh(ua)
-
-    return newly_awarded
+    if not newly_awarded:
+        return []
+    user_id, awarded_ids = user.id, [ua.achievement_id for ua in newly_awarded]
+    db.commit()
+    # Один запрос вместо refresh каждой строки; achievement — тем же JOIN
+    return (
+        db.query(UserAchievement)
+        .filter(
+            UserAchievement.user_id == user_id,
+            UserAchievement.achievement_id.in_(awarded_ids),
+        )
+        .options(*eager(UserAchievement.achievement))
+        .order_by(UserAchievement.achievement_id)
+        .all()
+    )
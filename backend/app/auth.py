@@ -4,19 +4,35 @@
 import hashlib
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.config import settings
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import User
 import uuid
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer(auto_error=False)
 
+# passlib/bcrypt и jose импортируются при первом использовании, а не при импорте модуля:
+# на холодном старте функции запросы без пароля/токена (health, by-code) их не грузят
+_pwd_context = None
+
+
+def get_pwd_context():
+    """CryptContext для bcrypt (создаётся один раз при первом обращении)."""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def warm_up_crypto() -> None:
+    """Загружает bcrypt-бэкенд passlib и jose (ключ HMAC) заранее — для прогрева контейнера."""
+    get_pwd_context().handler("bcrypt").get_backend()
+    decode_access_token(create_access_token({"sub": "warmup"}, timedelta(minutes=1)))
+
 
 def _get_token_from_headers(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
@@ -42,17 +58,19 @@ def _password_to_bcrypt_input(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверка пароля."""
     bcrypt_input = _password_to_bcrypt_input(plain_password)
-    return pwd_context.verify(bcrypt_input, hashed_password)
+    return get_pwd_context().verify(bcrypt_input, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Хеширование пароля. Пароль любой длины сначала приводится к фиксированной строке через SHA-256."""
     bcrypt_input = _password_to_bcrypt_input(password)
-    return pwd_context.hash(bcrypt_input)
+    return get_pwd_context().hash(bcrypt_input)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Создание JWT токена"""
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -65,6 +83,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Декодирование JWT токена"""
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
@@ -72,11 +92,8 @@ def decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(
-    token: Optional[str] = Depends(_get_token_from_headers),
-    db: Session = Depends(get_db),
-) -> User:
-    """Получение текущего пользователя из токена (Authorization или X-Access-Token)."""
+def _user_from_token(token: Optional[str], db: Session) -> User:
+    """Пользователь по токену; 401 — токена нет, он неверный или пользователь удалён."""
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -107,3 +124,20 @@ async def get_current_user(
         )
     
     return user
+
+
+async def get_current_user(
+    token: Optional[str] = Depends(_get_token_from_headers),
+    db: Session = Depends(get_db),
+) -> User:
+    """Получение текущего пользователя из токена (Authorization или X-Access-Token)."""
+    return _user_from_token(token, db)
+
+
+async def get_current_user_id(token: Optional[str] = Depends(_get_token_from_headers)) -> uuid.UUID:
+    """
+    Id текущего пользователя; сессия закрывается до ответа. Для потоковых ответов: yield-зависимость
+    get_db закрывается только после отправки тела, и соединение пула простаивало бы в транзакции.
+    """
+    with SessionLocal() as db:
+        return _user_from_token(token, db).id
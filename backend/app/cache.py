@@ -0,0 +1,248 @@
+"""
+Кеш для горячих путей чтения.
+
+Два уровня:
+- локальный (in-process) LRU с TTL — живёт в памяти процесса / тёплого контейнера функции;
+- общий (shared) — необязательный, за интерфейсом SharedCacheBackend (Redis, Memcached и т.п.).
+  Для тестов и локального запуска есть LocalSharedCache — простая реализация в памяти.
+
+Инвалидация — по тегам ресурса (таблица + user_id): маршруты записи вызывают
+cache.invalidate(resource_tag("user_profiles", user.id)), и все ключи с этим тегом удаляются
+из обоих уровней. Локальный уровень других процессов инвалидация не достаёт, поэтому данные
+пользователя или отдельной записи (тег не «таблица:*») живут в нём не дольше
+CACHE_USER_LOCAL_TTL_SECONDS — запись, обработанная другим контейнером, становится видна
+через несколько секунд, а не через TTL.
+Значения в кеше — только простые данные (dict/list/скаляры), не ORM-объекты,
+и их нельзя менять после получения из кеша.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+
+_MISSING = object()
+# None в общем кеше (отрицательное кеширование): backend отдаёт None при промахе
+_SHARED_NONE = "__cache:none__"
+
+
+def resource_tag(table: str, user_id: Optional[Hashable] = None) -> str:
+    """Тег ресурса для инвалидации: «таблица:user_id» или «таблица:*» для общих данных."""
+    return f"{table}:{user_id if user_id is not None else '*'}"
+
+
+def _has_user_tag(tags: Tuple[str, ...]) -> bool:
+    return any(not tag.endswith(":*") for tag in tags)
+
+
+class LRUCache:
+    """Ограниченный по размеру LRU-кеш с TTL и индексом тегов. Потокобезопасен."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value, _ = item
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, tags: Iterable[str] = (), ttl: Optional[float] = None) -> None:
+        tags = tuple(tags)
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tag(self, tag: str) -> None:
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+            self._tags.pop(tag, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SharedCacheBackend:
+    """
+    Интерфейс общего кеша между процессами/контейнерами.
+    get возвращает None при промахе, поэтому None в общий кеш не кладём
+    (кроме get_or_set с negative_ttl — тогда вместо None хранится маркер).
+    """
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, tags: Iterable[str], ttl: float) -> None:
+        raise NotImplementedError
+
+    def invalidate_tag(self, tag: str) -> None:
+        raise NotImplementedError
+
+
+class LocalSharedCache(SharedCacheBackend):
+    """Реализация общего кеша в памяти — для тестов и локального запуска без Redis."""
+
+    def __init__(self):
+        self._cache = LRUCache(max_entries=100_000)
+
+    def get(self, key: str) -> Any:
+        value = self._cache.get(key)
+        return None if value is _MISSING else value
+
+    def set(self, key: str, value: Any, tags: Iterable[str], ttl: float) -> None:
+        self._cache.set(key, value, tags=tags, ttl=ttl)
+
+    def invalidate_tag(self, tag: str) -> None:
+        self._cache.invalidate_tag(tag)
+
+
+class Cache:
+    """Двухуровневый кеш: локальный LRU + необязательный общий backend. Считает попадания и промахи."""
+
+    def __init__(
+        self,
+        local: LRUCache,
+        shared: Optional[SharedCacheBackend] = None,
+        enabled: bool = True,
+        user_local_ttl: Optional[float] = None,
+    ):
+        self.local = local
+        self.shared = shared
+        self.enabled = enabled
+        self.user_local_ttl = user_local_ttl
+        self._counters: Dict[str, int] = {
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+        }
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _local_ttl(self, tags: Tuple[str, ...], ttl: Optional[float]) -> Optional[float]:
+        """TTL локального уровня: для данных пользователя — не больше user_local_ttl."""
+        if self.user_local_ttl is None or not _has_user_tag(tags):
+            return ttl
+        return min(self.local.ttl_seconds if ttl is None else ttl, self.user_local_ttl)
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Значение из кеша или результат loader(), сохранённый с тегами.
+        negative_ttl — отрицательное кеширование: None от loader() («не найдено») хранится
+        с этим TTL (обычно короче ttl); без него None в общий кеш не попадает.
+        При общем backend промах хранится только в нём: инвалидация локального уровня
+        не доходит до других контейнеров, и локальный промах скрывал бы созданную запись.
+        """
+        if not self.enabled:
+            return loader()
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+        tags = tuple(tags)
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._count("shared_hits")
+                if value == _SHARED_NONE:
+                    return None
+                self.local.set(key, value, tags=tags, ttl=self._local_ttl(tags, ttl))
+                return value
+        self._count("misses")
+        value = loader()
+        if value is None and negative_ttl is not None:
+            if self.shared is not None:
+                self.shared.set(key, _SHARED_NONE, tags, negative_ttl)
+            else:
+                self.local.set(key, None, tags=tags, ttl=self._local_ttl(tags, negative_ttl))
+            return None
+        self.local.set(key, value, tags=tags, ttl=self._local_ttl(tags, ttl))
+        if self.shared is not None and value is not None:
+            self.shared.set(key, value, tags, ttl if ttl is not None else self.local.ttl_seconds)
+        return value
+
+    def invalidate(self, *tags: str) -> None:
+        """Удаляет из обоих уровней все ключи с указанными тегами."""
+        for tag in tags:
+            self._count("invalidations")
+            self.local.invalidate_tag(tag)
+            if self.shared is not None:
+                self.shared.invalidate_tag(tag)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            counters = dict(self._counters)
+        hits = counters["local_hits"] + counters["shared_hits"]
+        total = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "local_entries": len(self.local),
+            "shared_enabled": self.shared is not None,
+        }
+
+
+cache = Cache(
+    local=LRUCache(
+        max_entries=settings.CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.CACHE_TTL_SECONDS,
+    ),
+    enabled=settings.CACHE_ENABLED,
+    user_local_ttl=settings.CACHE_USER_LOCAL_TTL_SECONDS,
+)
+
+
+def set_shared_backend(backend: Optional[SharedCacheBackend]) -> None:
+    """Подключает (или отключает, если None) общий уровень кеша."""
+    cache.shared = backend
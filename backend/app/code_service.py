@@ -0,0 +1,140 @@
+"""
+Выдача уникальных кодов (реферальные коды, коды планов) без проверочных запросов к БД.
+
+Код — номер из счётчика, переставленный ключевой перестановкой (сеть Фейстеля с cycle-walking)
+в пространство alphabet^length и записанный в этом алфавите. Перестановка — биекция, поэтому
+разные номера дают разные коды, а по коду нельзя угадать соседние. Номера выдаются блоками:
+один UPDATE ... RETURNING в code_sequences на CODE_BLOCK_SIZE кодов (блок, не выданный до
+конца, просто пропускается). Ключ перестановки хранится в той же строке и не меняется.
+
+Прежние коды были случайными 8-символьными; новые — длиной 9, поэтому с ними не пересекаются.
+"""
+import hashlib
+import secrets
+import string
+import threading
+from typing import Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import CodeSequence
+
+CODE_LENGTH = 9
+CODE_BLOCK_SIZE = 1000
+FEISTEL_ROUNDS = 6
+
+# Без похожих символов (0/O, 1/I) — код вводят вручную
+REFERRAL_ALPHABET = (
+    string.ascii_uppercase.replace("O", "").replace("I", "")
+    + string.digits.replace("0", "").replace("1", "")
+)
+PLAN_ALPHABET = string.ascii_uppercase + string.digits
+
+
+class KeyedPermutation:
+    """Биекция [0, domain) → [0, domain): сеть Фейстеля на blake2b с ключом, cycle-walking до domain."""
+
+    def __init__(self, key: bytes, domain: int, rounds: int = FEISTEL_ROUNDS):
+        bits = max(2, (domain - 1).bit_length())
+        self.half_bits = (bits + 1) // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.domain = domain
+        self.rounds = rounds
+        self.key = hashlib.blake2b(key, digest_size=32).digest()
+
+    def _round(self, i: int, value: int) -> int:
+        digest = hashlib.blake2b(bytes((i,)) + value.to_bytes(8, "big"), key=self.key, digest_size=8).digest()
+        return int.from_bytes(digest, "big") & self.mask
+
+    def permute(self, n: int) -> int:
+        if not 0 <= n < self.domain:
+            raise ValueError(f"{n} вне диапазона [0, {self.domain})")
+        while True:
+            left, right = n >> self.half_bits, n & self.mask
+            for i in range(self.rounds):
+                left, right = right, left ^ self._round(i, right)
+            n = (left << self.half_bits) | right
+            if n < self.domain:
+                return n
+
+
+class CodeAllocator:
+    """Выдаёт коды из своего счётчика; потокобезопасен, блок номеров — на процесс."""
+
+    def __init__(self, name: str, alphabet: str, length: int = CODE_LENGTH, block_size: int = CODE_BLOCK_SIZE):
+        self.name = name
+        self.alphabet = alphabet
+        self.length = length
+        self.block_size = block_size
+        self.domain = len(alphabet) ** length
+        self._lock = threading.Lock()
+        self._permutation: Optional[KeyedPermutation] = None
+        self._next = 0
+        self._end = 0
+
+    def _reserve_block(self) -> None:
+        """Следующий блок номеров — отдельной короткой транзакцией (не откатывается вместе с запросом)."""
+        from app.database import engine
+
+        t = CodeSequence.__table__
+        for _ in range(3):
+            with engine.begin() as conn:
+                row = conn.execute(
+                    update(t)
+                    .where(t.c.name == self.name)
+                    .values(next_block=t.c.next_block + 1)
+                    .returning(t.c.next_block, t.c.secret)
+                ).first()
+            if row is not None:
+                break
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(t).values(name=self.name, next_block=0, secret=secrets.token_hex(32)))
+            except IntegrityError:
+                pass  # строку создал другой процесс
+        else:
+            raise RuntimeError(f"Не удалось получить блок кодов {self.name}")
+
+        block, secret = row
+        if self._permutation is None:
+            self._permutation = KeyedPermutation(secret.encode(), self.domain)
+        self._next = (block - 1) * self.block_size
+        self._end = self._next + self.block_size
+        if self._end > self.domain:
+            raise RuntimeError(f"Коды {self.name} исчерпаны")
+
+    def encode(self, n: int) -> str:
+        base = len(self.alphabet)
+        chars = []
+        for _ in range(self.length):
+            n, digit = divmod(n, base)
+            chars.append(self.alphabet[digit])
+        return "".join(reversed(chars))
+
+    def next_code(self) -> str:
+        with self._lock:
+            if self._next >= self._end:
+                self._reserve_block()
+            n = self._next
+            self._next += 1
+            permutation = self._permutation
+        return self.encode(permutation.permute(n))
+
+    def reset(self) -> None:
+        """Забыть текущий блок и ключ (тесты, смена БД)."""
+        with self._lock:
+            self._permutation = None
+            self._next = self._end = 0
+
+
+referral_codes = CodeAllocator("referral", REFERRAL_ALPHABET)
+plan_codes = CodeAllocator("plan", PLAN_ALPHABET)
+
+
+def next_referral_code() -> str:
+    return referral_codes.next_code()
+
+
+def next_plan_code() -> str:
+    return plan_codes.next_code()
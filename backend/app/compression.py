@@ -0,0 +1,162 @@
+"""
+Сжатие ответов (brotli / gzip) с порогом по размеру и списком допустимых content-type.
+
+Сжимаются только ответы не меньше minimum_size байт с content-type из allowlist и без
+собственного Content-Encoding. Brotli выбирается, если клиент его принимает и установлен
+пакет brotli; иначе gzip. Потоковые ответы (StreamingResponse) сжимаются по чанкам.
+
+В serverless (handler.py) сжатое тело отдаётся в base64 с isBase64Encoded=True.
+"""
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен — без него только gzip
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Выбирает кодировку по заголовку Accept-Encoding: br (если доступен) > gzip > None."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Единый интерфейс для потокового gzip/brotli."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+            self._compress = self._impl.process
+            self._flush = self._impl.flush
+            self._finish = self._impl.finish
+        else:
+            # wbits=31 — формат gzip (заголовок + CRC), совместимый с Content-Encoding: gzip
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._compress = self._impl.compress
+            self._flush = lambda: self._impl.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._impl.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        """Сжимает очередной чанк и сбрасывает буфер, чтобы клиент получал данные сразу."""
+        return self._compress(data) + self._flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compress(data) + self._finish()
+
+
+class CompressionMiddleware:
+    """ASGI middleware сжатия ответов."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, config: CompressionMiddleware, encoding: str, send: Send):
+        self.config = config
+        self.encoding = encoding
+        self._send = send
+        self.initial_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(self.config.content_types)
+
+    def _set_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Заголовки отправим, когда станет ясно, сжимаем ли ответ
+            self.initial_message = message
+            self.passthrough = not self._is_compressible(Headers(raw=message["headers"]))
+            return
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+        if self.passthrough:
+            if self.initial_message is not None:
+                await self._send(self.initial_message)
+                self.initial_message = None
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.config.minimum_size:
+                # Маленький ответ — сжатие не окупается
+                self.passthrough = True
+                await self._send(self.initial_message)
+                self.initial_message = None
+                await self._send(message)
+                return
+            self.compressor = _Compressor(self.encoding, self.config.gzip_level, self.config.brotli_quality)
+            if more_body:
+                body = self.compressor.chunk(body)
+                self._set_headers(None)
+            else:
+                body = self.compressor.finish(body)
+                self._set_headers(len(body))
+            await self._send(self.initial_message)
+            self.initial_message = None
+        else:
+            body = self.compressor.chunk(body) if more_body else self.compressor.finish(body)
+
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -5,26 +5,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings, IS_LAMBDA
+from app.db_pool import engine_options, normalize_url
+from app.request_log import install_db_timing
 
-# Параметры пула: в Lambda меньше соединений и переподключение, чтобы не исчерпать RDS и не держать «мёртвые» соединения
-_engine_kwargs: dict = {
-    "pool_pre_ping": True,
-    "echo": False,
-}
-if IS_LAMBDA:
-    _engine_kwargs["pool_size"] = 1
-    _engine_kwargs["max_overflow"] = 2
-    _engine_kwargs["pool_recycle"] = 60  # переподключение раз в минуту
-else:
-    _engine_kwargs["pool_size"] = 5
-    _engine_kwargs["max_overflow"] = 10
+# Параметры пула (app.db_pool): в Lambda — 1–2 соединения с переподключением, за внешним
+# пулером (DB_EXTERNAL_POOLER) — без собственного пула, на сервере — обычный пул
+_db_url = normalize_url(settings.DATABASE_URL)
 
-# Yandex Cloud и др. часто отдают postgres:// — SQLAlchemy 2.x ожидает postgresql://
-_db_url = settings.DATABASE_URL
-if _db_url and _db_url.startswith("postgres://"):
-    _db_url = "postgresql://" + _db_url[11:]
-
-engine = create_engine(_db_url, **_engine_kwargs)
+engine = create_engine(_db_url, **engine_options(_db_url, IS_LAMBDA))
+install_db_timing(engine)
 
 # Создаём фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,185 @@
+"""
+Параметры пула подключений к БД: обычный сервер, serverless и внешний пулер (PgBouncer / Odyssey).
+
+При DB_EXTERNAL_POOLER функция не держит собственный пул: по умолчанию NullPool (соединение
+с пулером открывается на запрос и сразу возвращается), серверные prepared statements
+отключены — в режиме transaction pooling соседние транзакции клиента попадают на разные
+серверные соединения. Параметры сессии (statement_timeout) в этом режиме не передаются
+при подключении: пулер не пробрасывает их на сервер — задайте их на роль (ALTER ROLE ... SET).
+
+Время ожидания соединения (checkout из пула или подключение при NullPool) считается в
+pool_metrics и в RequestStats текущего запроса.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.config import settings
+from app.request_log import current_stats
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Счётчики ожидания соединений (на контейнер)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            if ok:
+                self.checkouts += 1
+                self.wait_total += seconds
+                self.wait_max = max(self.wait_max, seconds)
+            else:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "errors": self.errors,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedCheckoutMixin:
+    """Замер времени получения соединения из пула (для NullPool — времени подключения)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record(time.perf_counter() - started, ok=False)
+            raise
+        elapsed = time.perf_counter() - started
+        pool_metrics.record(elapsed)
+        stats = current_stats.get()
+        if stats is not None:
+            stats.db_wait += elapsed
+        return connection
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckoutMixin, NullPool):
+    pass
+
+
+def normalize_url(url: str) -> str:
+    """Yandex Cloud и др. часто отдают postgres:// — SQLAlchemy 2.x ожидает postgresql://"""
+    if url and url.startswith("postgres://"):
+        return "postgresql://" + url[11:]
+    return url
+
+
+def _connect_args(url: str) -> dict:
+    """Параметры подключения libpq/psycopg: таймаут, имя приложения, keepalive, prepared statements."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return {}
+    args = {
+        "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+        "application_name": settings.DB_APPLICATION_NAME,
+        "keepalives": 1,
+        "keepalives_idle": 30,
+    }
+    if settings.DB_EXTERNAL_POOLER:
+        # psycopg2 prepared statements не использует; psycopg 3 готовит повторяющиеся запросы —
+        # в transaction pooling это ломается, отключаем
+        if parsed.get_driver_name() == "psycopg":
+            args["prepare_threshold"] = None
+    elif settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    return args
+
+
+def engine_options(url: str, is_lambda: bool) -> dict:
+    """Аргументы create_engine для текущего режима (внешний пулер / Lambda / сервер)."""
+    if settings.DB_EXTERNAL_POOLER:
+        default_size, default_overflow = 0, 0
+    elif is_lambda:
+        default_size, default_overflow = 1, 2
+    else:
+        default_size, default_overflow = 5, 10
+    pool_size = default_size if settings.DB_POOL_SIZE is None else settings.DB_POOL_SIZE
+    max_overflow = default_overflow if settings.DB_MAX_OVERFLOW is None else settings.DB_MAX_OVERFLOW
+
+    options: dict = {"echo": False, "connect_args": _connect_args(url)}
+    if pool_size <= 0:
+        # Свежее соединение на каждый checkout: проверять его ping'ом незачем
+        options["poolclass"] = TimedNullPool
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+    if is_lambda or settings.DB_EXTERNAL_POOLER:
+        options["pool_recycle"] = 60  # не держать «мёртвые» соединения в замороженном контейнере
+    return options
+
+
+def probe_database(engine: Engine) -> dict:
+    """SELECT 1 через соединение из пула engine (при NullPool — новое): доступность БД, время подключения и запроса."""
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            connected = time.perf_counter()
+            conn.execute(text("SELECT 1"))
+            finished = time.perf_counter()
+    except Exception as exc:
+        return {
+            "ok": False,
+            "error": f"{type(exc).__name__}: {exc}",
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    return {
+        "ok": True,
+        "connect_ms": round((connected - started) * 1000, 2),
+        "query_ms": round((finished - connected) * 1000, 2),
+    }
+
+
+def run_startup_probe(engine: Optional[Engine] = None) -> dict:
+    """Проверка БД при старте: результат в лог, ошибка не останавливает приложение."""
+    if engine is None:
+        from app.database import engine
+    result = probe_database(engine)
+    if result["ok"]:
+        logger.info("DB probe ok: connect %.1f ms, query %.1f ms", result["connect_ms"], result["query_ms"])
+    else:
+        logger.error("DB probe failed: %s", result["error"])
+    return result
+
+
+def pool_status(engine: Engine) -> dict:
+    """Состояние пула и счётчики ожидания соединений."""
+    return {
+        "pool": engine.pool.status(),
+        "external_pooler": settings.DB_EXTERNAL_POOLER,
+        **pool_metrics.snapshot(),
+    }
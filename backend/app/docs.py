@@ -0,0 +1,241 @@
+"""
+Документация API: OpenAPI-схема, собранная при сборке архива, и Swagger UI без CDN.
+
+Схема генерируется один раз при сборке (`python -m app.docs`, вызывается из
+build_function_zip.py) и лежит в app/static/openapi.json вместе с файлами swagger-ui-dist.
+Запрос документации отдаёт готовые байты с ETag (If-None-Match → 304); сжатые варианты
+кодируются один раз на контейнер. Если файла схемы нет (локальный запуск), схема
+генерируется при первом запросе и дальше тоже отдаётся из памяти; без локальных файлов
+Swagger UI грузится с unpkg. DOCS_ENABLED=false отключает документацию целиком.
+"""
+import argparse
+import gzip
+import hashlib
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import Response
+
+from app.compression import brotli, choose_encoding
+from app.config import settings
+from app.responses import dumps
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+OPENAPI_FILENAME = "openapi.json"
+SWAGGER_UI_DIRNAME = "swagger-ui"
+SWAGGER_UI_VERSION = "5.10.3"
+SWAGGER_UI_CDN = f"https://unpkg.com/swagger-ui-dist@{SWAGGER_UI_VERSION}"
+SWAGGER_UI_ASSETS = {
+    "swagger-ui.css": "text/css",
+    "swagger-ui-bundle.js": "application/javascript; charset=utf-8",
+}
+
+SWAGGER_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <title>OmniActive API — Docs</title>
+  <link rel="stylesheet" href="{css_url}" />
+</head>
+<body>
+  <div id="swagger-ui"></div>
+  <script src="{js_url}"></script>
+  <script>
+    SwaggerUIBundle({{
+      url: "{openapi_url}",
+      dom_id: '#swagger-ui',
+      presets: [SwaggerUIBundle.presets.apis, SwaggerUIBundle.SwaggerUIStandalonePreset]
+    }});
+  </script>
+</body>
+</html>
+"""
+
+
+class StaticPayload:
+    """Готовое тело ответа: байты, ETag и сжатые варианты (кодируются при первом запросе)."""
+
+    def __init__(self, body: bytes, media_type: str, max_age: int):
+        self.body = body
+        self.media_type = media_type
+        self.max_age = max_age
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            else:
+                data = gzip.compress(self.body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+            self._encoded[encoding] = data
+        return data
+
+
+_payloads: Dict[str, StaticPayload] = {}
+_lock = threading.Lock()
+
+
+def _cached(key: str, factory) -> StaticPayload:
+    payload = _payloads.get(key)
+    if payload is None:
+        with _lock:
+            payload = _payloads.get(key)
+            if payload is None:
+                payload = _payloads[key] = factory()
+    return payload
+
+
+def generate_openapi(app: FastAPI) -> bytes:
+    """Полная схема OpenAPI (все роутеры) в JSON-байтах."""
+    from app.router_registry import include_routers
+
+    include_routers(app)
+    return dumps(app.openapi())
+
+
+def openapi_payload(app: FastAPI) -> StaticPayload:
+    def load() -> StaticPayload:
+        path = STATIC_DIR / OPENAPI_FILENAME
+        body = path.read_bytes() if path.is_file() else generate_openapi(app)
+        return StaticPayload(body, "application/json", max_age=300)
+
+    return _cached("openapi", load)
+
+
+def _local_swagger_ui() -> bool:
+    return all((STATIC_DIR / SWAGGER_UI_DIRNAME / name).is_file() for name in SWAGGER_UI_ASSETS)
+
+
+def swagger_asset_payload(name: str) -> Optional[StaticPayload]:
+    if name not in SWAGGER_UI_ASSETS or not _local_swagger_ui():
+        return None
+
+    def load() -> StaticPayload:
+        body = (STATIC_DIR / SWAGGER_UI_DIRNAME / name).read_bytes()
+        return StaticPayload(body, SWAGGER_UI_ASSETS[name], max_age=86400)
+
+    return _cached(f"asset:{name}", load)
+
+
+def swagger_html_payload(openapi_url: str, asset_url_prefix: str) -> StaticPayload:
+    """HTML Swagger UI; файлы swagger-ui — свои (asset_url_prefix + имя) или с CDN."""
+
+    def load() -> StaticPayload:
+        base = asset_url_prefix if _local_swagger_ui() else SWAGGER_UI_CDN + "/"
+        html = SWAGGER_HTML.format(
+            css_url=base + "swagger-ui.css",
+            js_url=base + "swagger-ui-bundle.js",
+            openapi_url=openapi_url,
+        )
+        return StaticPayload(html.encode("utf-8"), "text/html", max_age=300)
+
+    return _cached(f"html:{openapi_url}:{asset_url_prefix}", load)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+def payload_response(request: Request, payload: StaticPayload) -> Response:
+    """Ответ из готовых байтов: 304 по If-None-Match, сжатый вариант по Accept-Encoding."""
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": f"public, max-age={payload.max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, payload.etag):
+        return Response(status_code=304, headers=headers)
+
+    body = payload.body
+    if settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding is not None:
+            # Content-Encoding уже задан — CompressionMiddleware второй раз не сжимает
+            body = payload.encoded(encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=payload.media_type, headers=headers)
+
+
+def serve_docs_query(request: Request, app: FastAPI) -> Optional[Response]:
+    """
+    Документация по query-параметрам корня (когда пути /docs и /openapi.json не проксируются,
+    напр. Yandex Cloud): ?page=docs, ?openapi=json, ?docs_asset=<файл>. None — не запрос документации.
+    """
+    q = request.query_params
+    if q.get("openapi") == "json":
+        return payload_response(request, openapi_payload(app))
+    if q.get("page") == "docs":
+        return payload_response(request, swagger_html_payload("?openapi=json", "?docs_asset="))
+    asset = q.get("docs_asset")
+    if asset is not None:
+        payload = swagger_asset_payload(asset)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return payload_response(request, payload)
+    return None
+
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/openapi.json")
+async def openapi_json(request: Request):
+    return payload_response(request, openapi_payload(request.app))
+
+
+@router.get("/docs")
+async def swagger_ui(request: Request):
+    # Относительные ссылки: работают и за префиксом стадии API Gateway
+    return payload_response(request, swagger_html_payload("openapi.json", "docs/assets/"))
+
+
+@router.get("/docs/assets/{name}")
+async def swagger_ui_asset(name: str, request: Request):
+    payload = swagger_asset_payload(name)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return payload_response(request, payload)
+
+
+def build_static(output_dir: Path, swagger_ui: bool = True, swagger_ui_url: str = SWAGGER_UI_CDN) -> None:
+    """
+    Сборка: openapi.json и (опционально) файлы swagger-ui-dist в output_dir.
+    Если файлы Swagger UI скачать не удалось, HTML будет ссылаться на CDN.
+    """
+    import shutil
+
+    from app.main import app
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    body = generate_openapi(app)
+    (output_dir / OPENAPI_FILENAME).write_bytes(body)
+    print(f"OpenAPI: {output_dir / OPENAPI_FILENAME} ({len(body) / 1024:.1f} KB)")
+    if not swagger_ui:
+        return
+    assets_dir = output_dir / SWAGGER_UI_DIRNAME
+    assets_dir.mkdir(exist_ok=True)
+    for name in SWAGGER_UI_ASSETS:
+        try:
+            with urllib.request.urlopen(f"{swagger_ui_url.rstrip('/')}/{name}", timeout=30) as resp:
+                data = resp.read()
+        except OSError as exc:
+            shutil.rmtree(assets_dir)
+            print(f"⚠️ Swagger UI не скачан ({exc}) — страница документации будет брать файлы с CDN")
+            return
+        (assets_dir / name).write_bytes(data)
+        print(f"Swagger UI: {assets_dir / name} ({len(data) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сборка статической документации API")
+    parser.add_argument("--output-dir", required=True, help=f"куда положить файлы (в архиве функции — {STATIC_DIR.name}/ пакета app)")
+    parser.add_argument("--no-swagger-ui", action="store_true", help="не скачивать swagger-ui-dist")
+    parser.add_argument("--swagger-ui-url", default=SWAGGER_UI_CDN, help="откуда скачать swagger-ui-dist (зеркало)")
+    args = parser.parse_args()
+    build_static(Path(args.output_dir), swagger_ui=not args.no_swagger_ui, swagger_ui_url=args.swagger_ui_url)
@@ -0,0 +1,46 @@
+"""
+Жадная загрузка связей для списковых эндпоинтов: список отдаётся фиксированным числом запросов,
+а не «один запрос на строку» (N+1) и не двумя шагами через список id в Python.
+
+eager(...) возвращает опции для query.options(...) / select(...).options(...):
+связь «многие к одному» и «один к одному» — joinedload (тот же запрос, LEFT JOIN),
+коллекция — selectinload (второй запрос WHERE ... IN по ключам первой выборки).
+Цепочка связей — кортежем: eager((Workout.sessions, WorkoutSession.user)).
+strict=True (по умолчанию) добавляет raiseload("*"): обращение к не перечисленной связи
+падает сразу, а не превращается в скрытый запрос на каждую строку.
+
+Если по связанной таблице нужно фильтровать или сортировать — явный join и contains_eager
+(или выборка нужных колонок), как в /custom-workout-plans/enrolled.
+"""
+from typing import List, Tuple, Union
+
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import QueryableAttribute
+
+Path = Union[QueryableAttribute, Tuple[QueryableAttribute, ...]]
+
+
+def _is_collection(attr: QueryableAttribute) -> bool:
+    return bool(attr.property.uselist)
+
+
+def _load(attr: QueryableAttribute, parent=None):
+    if _is_collection(attr):
+        return parent.selectinload(attr) if parent is not None else selectinload(attr)
+    return parent.joinedload(attr) if parent is not None else joinedload(attr)
+
+
+def eager(*paths: Path, strict: bool = True) -> List:
+    """Опции загрузки связей paths (атрибут или кортеж-цепочка); strict — запрет остальных ленивых загрузок."""
+    options = []
+    for path in paths:
+        chain = path if isinstance(path, tuple) else (path,)
+        loader = None
+        for attr in chain:
+            loader = _load(attr, loader)
+        if strict:
+            loader = loader.raiseload("*")
+        options.append(loader)
+    if strict:
+        options.append(raiseload("*"))
+    return options
@@ -0,0 +1,306 @@
+"""
+Доски лидеров: повторения, шаги и тренировки за день, ISO-неделю и всё время.
+
+Очки лежат в leaderboard_scores — строка на (метрика, период, ключ периода, пользователь) — и
+растут в той же транзакции, что и запись результата: record_activity делает upsert
+score = score + delta сразу для трёх периодов. Места на каждом чтении не считаются: раз в
+LEADERBOARD_REFRESH_SECONDS (фоновая задача app.lifespan или таймер leaderboard_handler.py)
+доски, очки которых менялись с прошлого прогона, сверяются с rank() по очкам, и в leaderboard_ranks
+пишется только разница — снимок мест. Доски «всё время» (самые большие) пересчитываются реже —
+раз в LEADERBOARD_ALL_TIME_REFRESH_SECONDS. Пересчёт доски идёт под advisory-блокировкой (app.locks),
+так что пересекающиеся прогоны из разных воркеров и таймеров друг другу не мешают. «Моё место» — поиск по первичному ключу снимка,
+топ — первые строки индекса (доска, место), кешируется в app.cache с тегом LEADERBOARD_TAG,
+который сбрасывает пересчёт. Очки «моего» места — живые, место — на момент снимка.
+
+Без period_key читается доска текущего периода (по UTC). Даты результатов задаёт клиент,
+поэтому активность с датой позже завтрашнего дня (запас на часовые пояса) в очки не идёт:
+иначе доски будущих дней создавал бы любой пользователь.
+
+Доска реферальной сети (пригласивший, сам пользователь и приглашённые им) маленькая
+и считается по живым очкам без снимка.
+Дневные и недельные доски старше LEADERBOARD_RETENTION_DAYS удаляются при пересчёте.
+"""
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.cache import cache, resource_tag
+from app.config import settings
+from app.locks import try_xact_lock
+from app.models import LeaderboardBoard, LeaderboardRank, LeaderboardScore, User
+
+LEADERBOARD_TAG = resource_tag("leaderboards")
+METRICS = ("reps", "steps", "workouts")
+PERIODS = ("day", "week", "all")
+_PERIOD_KEY_RE = {
+    "day": re.compile(r"^\d{4}-\d{2}-\d{2}$"),
+    "week": re.compile(r"^\d{4}-W\d{2}$"),
+    "all": re.compile(r"^all$"),
+}
+_SCORE_KEY = ("metric", "period", "period_key", "user_id")
+# Насколько дата активности может опережать текущий день UTC (клиенты в часовых поясах до +14)
+_FUTURE_TOLERANCE = timedelta(days=1)
+# Запас на запись, начатую до прошлого пересчёта и закоммиченную после него
+_REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+def period_keys(day: date) -> Dict[str, str]:
+    """Ключи периодов, в которые попадает день: {"day": "2026-10-18", "week": "2026-W42", "all": "all"}."""
+    year, week, _ = day.isocalendar()
+    return {"day": day.isoformat(), "week": f"{year}-W{week:02d}", "all": "all"}
+
+
+def display_name(email: str) -> str:
+    """Имя на доске: начало адреса без домена — почта других пользователей не раскрывается."""
+    local = email.split("@", 1)[0]
+    return f"{local[:2]}***"
+
+
+def _upsert(db: Session):
+    """insert с ON CONFLICT для диалекта сессии (PostgreSQL в проде, SQLite локально)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+def record_activity(db: Session, user_id, metric: str, day: date, delta: int) -> None:
+    """
+    Очки пользователя за день, неделю и всё время +delta — в текущей транзакции (commit делает вызывающий).
+    Активность из будущего (позже завтрашнего дня UTC) не учитывается.
+    """
+    if not delta:
+        return
+    if isinstance(day, datetime):
+        day = day.date()
+    if day > datetime.utcnow().date() + _FUTURE_TOLERANCE:
+        return
+    now = datetime.utcnow()
+    rows = [
+        {"metric": metric, "period": period, "period_key": key, "user_id": user_id,
+         "score": delta, "updated_at": now}
+        for period, key in period_keys(day).items()
+    ]
+    stmt = _upsert(db)(LeaderboardScore).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=list(_SCORE_KEY),
+        set_={"score": LeaderboardScore.score + stmt.excluded.score, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+# ==================== Снимок мест ====================
+
+def _board_filter(model, metric: str, period: str, period_key: str):
+    return (model.metric == metric, model.period == period, model.period_key == period_key)
+
+
+def purge_expired(db: Session, today: Optional[date] = None) -> int:
+    """Удаляет дневные и недельные доски старше срока хранения. Возвращает число удалённых строк очков."""
+    cutoff = period_keys((today or datetime.utcnow().date()) - timedelta(days=settings.LEADERBOARD_RETENTION_DAYS))
+    deleted = 0
+    for model in (LeaderboardScore, LeaderboardRank, LeaderboardBoard):
+        # Ключи одного периода одной длины — строки сравниваются в хронологическом порядке
+        expired = or_(*(
+            (model.period == period) & (model.period_key < cutoff[period]) for period in ("day", "week")
+        ))
+        result = db.execute(delete(model).where(expired).execution_options(synchronize_session=False))
+        if model is LeaderboardScore:
+            deleted = result.rowcount or 0
+    db.commit()
+    return deleted
+
+
+def refresh_board(
+    db: Session, metric: str, period: str, period_key: str, now: Optional[datetime] = None
+) -> Optional[int]:
+    """
+    Снимок мест одной доски по rank() над очками (индекс доски по score). Пишутся только
+    разница со снимком: UPDATE строк, у которых сменились место или очки, INSERT новых участников,
+    DELETE выбывших — у доски «всё время» переписывается не вся таблица мест.
+    Одна транзакция под advisory-блокировкой доски: читатели до commit видят прежний снимок,
+    параллельный пересчёт той же доски пропускается (None). Возвращает число участников.
+    """
+    now = now or datetime.utcnow()
+    if not try_xact_lock(db, f"leaderboard:{metric}:{period}:{period_key}"):
+        db.rollback()
+        return None
+    score, snapshot = LeaderboardScore, LeaderboardRank
+    ranked = (
+        select(
+            score.user_id.label("user_id"),
+            func.rank().over(order_by=score.score.desc()).label("rank"),
+            score.score.label("score"),
+        )
+        .where(*_board_filter(score, metric, period, period_key), score.score > 0)
+        .subquery("ranked")
+    )
+    in_board = _board_filter(snapshot, metric, period, period_key)
+    db.execute(
+        delete(snapshot)
+        .where(*in_board, ~snapshot.user_id.in_(select(ranked.c.user_id)))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(snapshot)
+        .where(
+            *in_board,
+            snapshot.user_id == ranked.c.user_id,
+            or_(snapshot.rank != ranked.c.rank, snapshot.score != ranked.c.score),
+        )
+        .values(rank=ranked.c.rank, score=ranked.c.score)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(insert(snapshot).from_select(
+        ["metric", "period", "period_key", "user_id", "rank", "score"],
+        select(literal(metric), literal(period), literal(period_key), ranked.c.user_id, ranked.c.rank, ranked.c.score)
+        .where(~exists().where(*in_board, snapshot.user_id == ranked.c.user_id)),
+    ))
+    entries = db.execute(select(func.count()).where(*in_board)).scalar() or 0
+    stmt = _upsert(db)(LeaderboardBoard).values(
+        metric=metric, period=period, period_key=period_key, entries=entries, refreshed_at=now
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["metric", "period", "period_key"],
+        set_={"entries": stmt.excluded.entries, "refreshed_at": stmt.excluded.refreshed_at},
+    ))
+    db.commit()
+    return entries
+
+
+def _changed_boards(db: Session, period: str, now: datetime) -> list:
+    """Доски периода, очки которых менялись с его последнего пересчёта (индекс по updated_at)."""
+    last = db.execute(
+        select(func.max(LeaderboardBoard.refreshed_at)).where(LeaderboardBoard.period == period)
+    ).scalar()
+    all_time_interval = timedelta(seconds=settings.LEADERBOARD_ALL_TIME_REFRESH_SECONDS)
+    if period == "all" and last is not None and now - last < all_time_interval:
+        return []
+    changed = (
+        select(LeaderboardScore.metric, LeaderboardScore.period, LeaderboardScore.period_key)
+        .where(LeaderboardScore.period == period)
+        .distinct()
+    )
+    if last is not None:
+        changed = changed.where(LeaderboardScore.updated_at >= last - _REFRESH_OVERLAP)
+    return db.execute(changed).all()
+
+
+def refresh_leaderboards(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Пересчёт снимков досок, очки которых менялись с прошлого прогона, после удаления устаревших
+    досок. Каждая доска — своя транзакция; доски «всё время» — не чаще
+    LEADERBOARD_ALL_TIME_REFRESH_SECONDS. Доски, которые сейчас пересчитывает другой прогон, пропускаются.
+    """
+    now = now or datetime.utcnow()
+    purged = purge_expired(db, now.date())
+    refreshed = skipped = 0
+    for period in PERIODS:
+        for metric, board_period, period_key in _changed_boards(db, period, now):
+            if refresh_board(db, metric, board_period, period_key, now) is None:
+                skipped += 1
+            else:
+                refreshed += 1
+    cache.invalidate(LEADERBOARD_TAG)
+    return {"boards": refreshed, "skipped": skipped, "purged": purged}
+
+
+# ==================== Чтение ====================
+
+def resolve_period_key(period: str, period_key: Optional[str]) -> str:
+    """Ключ доски: заданный (400 — не того формата) или текущего периода по UTC."""
+    if period_key is None:
+        return period_keys(datetime.utcnow().date())[period]
+    if not _PERIOD_KEY_RE[period].match(period_key):
+        raise HTTPException(status_code=400, detail="Некорректный ключ периода")
+    return period_key
+
+
+def _load_top(db: Session, metric: str, period: str, period_key: str, limit: int) -> dict:
+    board = db.execute(
+        select(LeaderboardBoard.entries, LeaderboardBoard.refreshed_at)
+        .where(*_board_filter(LeaderboardBoard, metric, period, period_key))
+    ).first()
+    rows = db.execute(
+        select(LeaderboardRank.rank, LeaderboardRank.user_id, User.email, LeaderboardRank.score)
+        .join(User, User.id == LeaderboardRank.user_id)
+        .where(*_board_filter(LeaderboardRank, metric, period, period_key))
+        .order_by(LeaderboardRank.rank, LeaderboardRank.user_id)
+        .limit(limit)
+    ).all()
+    return {
+        "entries": board.entries if board else 0,
+        "refreshed_at": board.refreshed_at if board else None,
+        "top": [
+            {"rank": rank, "user_id": user_id, "name": display_name(email), "score": score}
+            for rank, user_id, email, score in rows
+        ],
+    }
+
+
+def get_leaderboard(
+    db: Session, user_id, metric: str, period: str, period_key: Optional[str] = None, limit: int = 100
+) -> dict:
+    """Топ доски из снимка (кеш) и место пользователя — поиск по ключу снимка, очки — живые."""
+    period_key = resolve_period_key(period, period_key)
+    result = {"metric": metric, "period": period, "period_key": period_key, "scope": "global"}
+    result.update(cache.get_or_set(
+        f"leaderboards:{metric}:{period}:{period_key}:top:{limit}",
+        lambda: _load_top(db, metric, period, period_key, limit),
+        tags=[LEADERBOARD_TAG],
+    ))
+    rank = db.execute(
+        select(LeaderboardRank.rank)
+        .where(*_board_filter(LeaderboardRank, metric, period, period_key), LeaderboardRank.user_id == user_id)
+    ).scalar()
+    score = db.execute(
+        select(LeaderboardScore.score)
+        .where(*_board_filter(LeaderboardScore, metric, period, period_key), LeaderboardScore.user_id == user_id)
+    ).scalar()
+    result["me"] = {"rank": rank, "score": score or 0}
+    return result
+
+
+def get_network_leaderboard(
+    db: Session, user: User, metric: str, period: str, period_key: Optional[str] = None, limit: int = 100
+) -> dict:
+    """
+    Доска реферальной сети пользователя: он сам, пригласивший и приглашённые им — по живым очкам.
+    Места — с общими местами при равных очках; место пользователя считается и вне топа.
+    """
+    period_key = resolve_period_key(period, period_key)
+    members = [User.id == user.id, User.referred_by_id == user.id]
+    if user.referred_by_id is not None:
+        members.append(User.id == user.referred_by_id)
+    score = func.coalesce(LeaderboardScore.score, 0)
+    network = (
+        select(User.id.label("user_id"), User.email, score.label("score"))
+        .outerjoin(LeaderboardScore, and_(
+            LeaderboardScore.user_id == User.id, *_board_filter(LeaderboardScore, metric, period, period_key)
+        ))
+        .where(or_(*members))
+    )
+    rows = db.execute(network.order_by(score.desc(), User.id).limit(limit)).all()
+
+    top: List[dict] = []
+    for position, (member_id, email, member_score) in enumerate(rows, start=1):
+        rank = top[-1]["rank"] if top and top[-1]["score"] == member_score else position
+        top.append({"rank": rank, "user_id": member_id, "name": display_name(email), "score": member_score})
+
+    net = network.subquery()
+    my_score = next((entry["score"] for entry in top if entry["user_id"] == user.id), None)
+    if my_score is None:
+        my_score = db.execute(select(net.c.score).where(net.c.user_id == user.id)).scalar() or 0
+    entries, ahead = db.execute(
+        select(func.count(), func.coalesce(func.sum(case((net.c.score > my_score, 1), else_=0)), 0))
+        .select_from(net)
+    ).one()
+    return {
+        "metric": metric, "period": period, "period_key": period_key, "scope": "network",
+        "entries": entries, "refreshed_at": None, "top": top,
+        "me": {"rank": ahead + 1, "score": my_score},
+    }
@@ -0,0 +1,268 @@
+"""
+Ресурсы приложения с явным жизненным циклом: запуск, остановка и фоновые задачи.
+
+Ресурс — пара функций startup/shutdown (синхронных или async). Все startup выполняются
+параллельно (синхронные — в потоках), время каждого замеряется; ошибка одного ресурса
+логируется и не мешает остальным. shutdown — в обратном порядке регистрации.
+Периодические задачи (планировщики) работают только при долгоживущем процессе и идут
+в каждом воркере — поэтому каждая выполняется под advisory-блокировкой по имени
+(app.locks.job_session): прогон берёт один воркер кластера, остальные его пропускают.
+Ресурс с ошибкой startup не считается запущенным: следующий start() повторит попытку.
+
+Под uvicorn всё запускается через lifespan FastAPI. В serverless Mangum работает
+с lifespan="off" (иначе он запускал бы и останавливал ресурсы на каждом вызове),
+поэтому handler.py запускает ресурсы сам: при холодном старте (EAGER_STARTUP) или
+по пингу прогрева, без фоновых задач.
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi import FastAPI
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Resource:
+    __slots__ = ("name", "startup", "shutdown", "started", "startup_ms", "error")
+
+    def __init__(self, name: str, startup: Optional[Callable] = None, shutdown: Optional[Callable] = None):
+        self.name = name
+        self.startup = startup
+        self.shutdown = shutdown
+        self.started = False
+        self.startup_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+# Результат задачи, пропущенной из-за блокировки (прогон идёт в другом воркере)
+SKIPPED = object()
+
+
+class PeriodicTask:
+    __slots__ = ("name", "interval", "func", "runs", "skipped", "failures", "last_ms")
+
+    def __init__(self, name: str, interval: float, func: Callable):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_ms: Optional[float] = None
+
+
+async def _call(func: Callable) -> Any:
+    """Async-функция — await, синхронная — в потоке (не блокирует параллельный запуск остальных)."""
+    if inspect.iscoroutinefunction(func):
+        return await func()
+    return await asyncio.to_thread(func)
+
+
+class ResourceManager:
+    """Реестр ресурсов и фоновых задач приложения."""
+
+    def __init__(self):
+        self._resources: Dict[str, Resource] = {}
+        self._periodic: Dict[str, PeriodicTask] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._lock = threading.Lock()
+        self.startup_ms: Optional[float] = None
+
+    def register(self, name: str, startup: Optional[Callable] = None, shutdown: Optional[Callable] = None) -> None:
+        self._resources[name] = Resource(name, startup, shutdown)
+
+    def add_periodic(self, name: str, interval_seconds: float, func: Callable) -> None:
+        """Фоновая задача: func раз в interval_seconds (только под долгоживущим сервером)."""
+        self._periodic[name] = PeriodicTask(name, interval_seconds, func)
+
+    async def _start_one(self, resource: Resource) -> None:
+        t0 = time.perf_counter()
+        try:
+            if resource.startup is not None:
+                await _call(resource.startup)
+            resource.error = None
+            resource.started = True
+        except Exception as exc:
+            logger.exception("Startup of %s failed", resource.name)
+            resource.error = f"{type(exc).__name__}: {str(exc).splitlines()[0] if str(exc) else ''}"
+        resource.startup_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    async def start(self, names: Optional[Iterable[str]] = None, background: bool = True) -> dict:
+        """Параллельно запускает ещё не запущенные ресурсы (все или names); затем фоновые задачи."""
+        selected = [
+            r for r in self._resources.values()
+            if not r.started and (names is None or r.name in names)
+        ]
+        t0 = time.perf_counter()
+        await asyncio.gather(*(self._start_one(r) for r in selected))
+        if selected:
+            self.startup_ms = round((time.perf_counter() - t0) * 1000, 2)
+            logger.info("Startup: %s", {r.name: r.error or r.startup_ms for r in selected})
+        if background and not self._tasks:
+            self._tasks = [asyncio.create_task(self._run_periodic(t)) for t in self._periodic.values()]
+        return self.stats()
+
+    async def _run_periodic(self, task: PeriodicTask) -> None:
+        while True:
+            await asyncio.sleep(task.interval)
+            t0 = time.perf_counter()
+            try:
+                if await _call(task.func) is SKIPPED:
+                    task.skipped += 1
+                else:
+                    task.runs += 1
+            except Exception:
+                task.failures += 1
+                logger.exception("Periodic task %s failed", task.name)
+            task.last_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    async def stop(self) -> None:
+        """Останавливает фоновые задачи, затем ресурсы в обратном порядке."""
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for resource in reversed(list(self._resources.values())):
+            if not resource.started:
+                continue
+            resource.started = False
+            if resource.shutdown is None:
+                continue
+            try:
+                await _call(resource.shutdown)
+            except Exception:
+                logger.exception("Shutdown of %s failed", resource.name)
+
+    def start_sync(self, names: Optional[Iterable[str]] = None) -> dict:
+        """Запуск вне event loop (serverless handler): без фоновых задач, один раз на процесс."""
+        with self._lock:
+            return asyncio.run(self.start(names, background=False))
+
+    def all_started(self) -> bool:
+        return all(r.started for r in self._resources.values())
+
+    def stats(self) -> dict:
+        return {
+            "startup_ms": self.startup_ms,
+            "resources": {
+                r.name: {"started": r.started, "startup_ms": r.startup_ms, "error": r.error}
+                for r in self._resources.values()
+            },
+            "periodic": {
+                t.name: {
+                    "interval_s": t.interval, "runs": t.runs, "skipped": t.skipped,
+                    "failures": t.failures, "last_ms": t.last_ms,
+                }
+                for t in self._periodic.values()
+            },
+        }
+
+
+resources = ResourceManager()
+
+
+async def _start_thread_pool() -> None:
+    # Пул потоков для синхронных эндпоинтов (def-роуты и Depends): размер по WORKER_THREADS.
+    # Лимитер привязан к event loop — поэтому async и выполняется в самом loop
+    from anyio import to_thread
+
+    if settings.WORKER_THREADS:
+        to_thread.current_default_thread_limiter().total_tokens = settings.WORKER_THREADS
+
+
+def _start_db() -> None:
+    # Создание engine (импорт драйвера) и первое соединение в пуле
+    from app.db_pool import run_startup_probe
+
+    result = run_startup_probe()
+    if not result["ok"]:
+        raise RuntimeError(result["error"])
+
+
+def _stop_db() -> None:
+    from app.database import engine
+
+    engine.dispose()
+
+
+def _start_achievements() -> None:
+    from app.warmup import warm_achievements
+
+    warm_achievements()
+
+
+def _start_crypto() -> None:
+    from app.auth import warm_up_crypto
+
+    warm_up_crypto()
+
+
+def _stop_cache() -> None:
+    from app.cache import cache
+
+    cache.clear()
+
+
+def _locked(name: str, job: Callable) -> Callable:
+    """job(db) под блокировкой задачи name: в кластере прогон выполняет один воркер."""
+    def run():
+        from app.locks import job_session
+
+        with job_session(f"job:{name}") as db:
+            if db is None:
+                return SKIPPED
+            job(db)
+
+    return run
+
+
+def _refresh_trending(db) -> None:
+    from app.plan_catalog import refresh_trending
+
+    refresh_trending(db)
+
+
+def _run_notifications(db) -> None:
+    from app.notifications import run_notifications
+
+    run_notifications(db)
+
+
+def _refresh_leaderboards(db) -> None:
+    from app.leaderboards import refresh_leaderboards
+
+    refresh_leaderboards(db)
+
+
+resources.register("thread_pool", _start_thread_pool)
+resources.register("db", _start_db, _stop_db)
+resources.register("achievements", _start_achievements)
+resources.register("crypto", _start_crypto)
+resources.register("cache", shutdown=_stop_cache)
+if settings.TRENDING_REFRESH_SECONDS > 0:
+    resources.add_periodic(
+        "plan_trending", settings.TRENDING_REFRESH_SECONDS, _locked("plan_trending", _refresh_trending)
+    )
+if settings.NOTIFICATION_INTERVAL_SECONDS > 0:
+    resources.add_periodic(
+        "notifications", settings.NOTIFICATION_INTERVAL_SECONDS, _locked("notifications", _run_notifications)
+    )
+if settings.LEADERBOARD_REFRESH_SECONDS > 0:
+    resources.add_periodic(
+        "leaderboards", settings.LEADERBOARD_REFRESH_SECONDS, _locked("leaderboards", _refresh_leaderboards)
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Lifespan FastAPI (uvicorn): запуск ресурсов и фоновых задач, при остановке — освобождение."""
+    await resources.start()
+    yield
+    await resources.stop()
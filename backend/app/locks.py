@@ -0,0 +1,78 @@
+"""
+Advisory-блокировки PostgreSQL: одна фоновая операция над ресурсом одновременно на весь кластер.
+
+Фоновые задачи идут в каждом воркере uvicorn и в таймерах Cloud Functions, и прогоны могут
+пересекаться. Ключ блокировки — 64-битный хеш имени (стабилен между процессами).
+try_xact_lock берёт блокировку до конца текущей транзакции (снимается commit/rollback)
+и не ждёт: занято — False, операцию можно пропустить. На SQLite (локально) блокировок нет —
+запись там и так сериализуется.
+
+job_session — для периодических задач целиком: session-level pg_try_advisory_lock на отдельном
+соединении, которое держится до конца задачи (переживает её commit'ы), и сессия на этом же
+соединении — второе соединение из пула не нужно. Вне PostgreSQL — блокировка внутри процесса.
+"""
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+def lock_key(name: str) -> int:
+    """bigint-ключ advisory-блокировки по имени."""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def try_xact_lock(db: Session, name: str) -> bool:
+    """pg_try_advisory_xact_lock(name) в текущей транзакции; False — блокировку держит другой."""
+    if db.get_bind().dialect.name != "postgresql":
+        return True  # SQLite сериализует запись сам
+    return bool(db.execute(select(func.pg_try_advisory_xact_lock(lock_key(name)))).scalar())
+
+
+@contextmanager
+def job_session(name: str) -> Iterator[Optional[Session]]:
+    """Сессия задачи name под блокировкой на всё время задачи; None — задача уже идёт в другом воркере."""
+    from app.database import SessionLocal, engine
+
+    if engine.dialect.name != "postgresql":
+        with _local_locks_guard:
+            lock = _local_locks.setdefault(name, threading.Lock())
+        if not lock.acquire(blocking=False):
+            yield None
+            return
+        try:
+            with SessionLocal() as db:
+                yield db
+        finally:
+            lock.release()
+        return
+
+    key = lock_key(name)
+    with engine.connect() as conn:
+        acquired = bool(conn.execute(select(func.pg_try_advisory_lock(key))).scalar())
+        conn.commit()  # блокировка сессионная — транзакцию можно закрыть
+        if not acquired:
+            yield None
+            return
+        try:
+            with SessionLocal(bind=conn) as db:
+                yield db
+        finally:
+            try:
+                conn.rollback()
+                conn.execute(select(func.pg_advisory_unlock(key)))
+                conn.commit()
+            except Exception:
+                # Соединение не вернётся в пул с чужой блокировкой: закрытие снимет её на сервере
+                logger.exception("Advisory unlock of %s failed", name)
+                conn.invalidate()
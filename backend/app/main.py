@@ -1,29 +1,36 @@
 """
 Главный файл FastAPI приложения
 """
+import logging
+import math
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import JSONResponse
+from app import docs
+from app.cache import cache
+from app.compression import CompressionMiddleware
 from app.config import settings
-from app.routers import (
-    auth,
-    workouts,
-    exercise_results,
-    dishes,
-    food_log,
-    profile,
-    steps,
-    workout_sessions,
-    activity_settings,
-    achievements,
-    custom_workout_plans,
-)
+from app.lifespan import lifespan, resources
+from app.rate_limit import TokenBucketLimiter
+from app.router_registry import LazyRouterMiddleware, include_routers
+
+logger = logging.getLogger(__name__)
 
-# Создаём приложение FastAPI
+# /health/db открыт: один лимит на процесс (не по IP), чтобы частые проверки не нагружали БД
+health_db_limiter = TokenBucketLimiter(settings.HEALTH_DB_RATE_LIMIT_PER_MINUTE, settings.HEALTH_DB_RATE_LIMIT_BURST)
+
+# Создаём приложение FastAPI. Встроенные /docs, /redoc и /openapi.json отключены:
+# документация отдаётся из заранее собранной схемы (app.docs).
+# Ресурсы (БД, кеши, пул потоков, фоновые задачи) запускаются в lifespan (app.lifespan)
 app = FastAPI(
     title="OmniActive API",
     description="API для приложения OmniActive",
-    version="1.0.0"
+    version="1.0.0",
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
+    lifespan=lifespan,
 )
 
 # Настройка CORS (явные origins обязательны при allow_credentials=True — иначе браузер блокирует запрос после OPTIONS)
@@ -35,61 +42,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Подключаем роутеры
-app.include_router(auth.router)
-app.include_router(workouts.router)
-app.include_router(exercise_results.router)
-app.include_router(dishes.router)
-app.include_router(food_log.router)
-app.include_router(profile.router)
-app.include_router(steps.router)
-app.include_router(workout_sessions.router)
-app.include_router(activity_settings.router)
-app.include_router(achievements.router)
-app.include_router(custom_workout_plans.router)
-
-
-# Swagger UI по ?page=docs (когда путь /docs не проксируется, напр. Yandex Cloud)
-SWAGGER_HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-  <title>OmniActive API — Docs</title>
-  <link rel="stylesheet" href="https://unpkg.com/swagger-ui-dist@5/swagger-ui.css" />
-</head>
-<body>
-  <div id="swagger-ui"></div>
-  <script src="https://unpkg.com/swagger-ui-dist@5/swagger-ui-bundle.js"></script>
-  <script>
-    SwaggerUIBundle({
-      url: "?openapi=json",
-      dom_id: '#swagger-ui',
-      presets: [SwaggerUIBundle.presets.apis, SwaggerUIBundle.SwaggerUIStandalonePreset]
-    });
-  </script>
-</body>
-</html>
-"""
+# Сжатие больших ответов (история упражнений, дневник питания, публичные планы)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        content_types=settings.COMPRESSION_CONTENT_TYPES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Подключаем роутеры: сразу все или (LAZY_ROUTERS, для serverless) при первом запросе к префиксу
+if settings.LAZY_ROUTERS:
+    app.add_middleware(LazyRouterMiddleware, fastapi_app=app)
+else:
+    include_routers(app)
+
+
+if settings.DOCS_ENABLED:
+    app.include_router(docs.router)
 
 
 @app.get("/")
 async def root(request: Request):
     """Корневой эндпоинт. ?page=docs — Swagger UI, ?openapi=json — схема OpenAPI."""
-    q = request.query_params
-    if q.get("openapi") == "json":
-        return JSONResponse(content=app.openapi())
-    if q.get("page") == "docs":
-        return HTMLResponse(content=SWAGGER_HTML)
-    return JSONResponse(
-        content={
-            "message": "OmniActive API",
-            "version": "1.0.0",
-            "docs": "?page=docs",
-        }
-    )
+    if settings.DOCS_ENABLED:
+        # Swagger UI по ?page=docs (когда путь /docs не проксируется, напр. Yandex Cloud)
+        response = docs.serve_docs_query(request, app)
+        if response is not None:
+            return response
+    content = {"message": "OmniActive API", "version": "1.0.0"}
+    if settings.DOCS_ENABLED:
+        content["docs"] = "?page=docs"
+    return JSONResponse(content=content)
 
 
 @app.get("/health")
 async def health_check():
     """Проверка здоровья API"""
     return {"status": "ok"}
+
+
+@app.get("/health/startup")
+async def startup_stats():
+    """Запуск ресурсов: время и ошибки по каждому, состояние фоновых задач"""
+    return resources.stats()
+
+
+@app.get("/health/db")
+def db_health():
+    """Доступность БД (SELECT 1), состояние пула и время ожидания соединений; 503 — БД недоступна"""
+    from app.database import engine
+    from app.db_pool import pool_status, probe_database
+
+    wait = health_db_limiter.hit("health_db")
+    if wait > 0:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Слишком много запросов, попробуйте позже"},
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+    probe = probe_database(engine)
+    if not probe["ok"]:
+        # Текст ошибки (адрес, пользователь БД) — только в лог
+        logger.error("DB health probe failed: %s", probe["error"])
+        return JSONResponse(
+            status_code=503,
+            content={"probe": {"ok": False, "elapsed_ms": probe["elapsed_ms"]}, "detail": "База данных недоступна"},
+        )
+    return {"probe": probe, **pool_status(engine)}
+
+
+@app.get("/health/cache")
+async def cache_stats():
+    """Счётчики кеша: попадания (локальные/общие), промахи, инвалидации"""
+    return cache.stats()
@@ -1,7 +1,7 @@
 """
 SQLAlchemy модели для базы данных
 """
-from sqlalchemy import Boolean, Column, String, Integer, DateTime, Date, ForeignKey, JSON, Text, UniqueConstraint, Numeric
+from sqlalchemy import Boolean, Column, String, Integer, SmallInteger, DateTime, Date, Time, ForeignKey, JSON, Text, UniqueConstraint, Numeric, BigInteger, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -17,22 +17,22 @@ class User(Base):
     email = Column(String(255), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
     referral_code = Column(String(20), unique=True, nullable=True, index=True)  # Реферальный код пользователя
-    referred_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)  # Кто пригласил
+    referred_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)  # Кто пригласил
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationships
-    profile = relationship("UserProfile", back_populates="user", uselist=False)
-    workouts = relationship("Workout", back_populates="user", cascade="all, delete-orphan")
-    exercise_results = relationship("ExerciseResult", back_populates="user", cascade="all, delete-orphan")
-    dishes = relationship("Dish", back_populates="user", cascade="all, delete-orphan")
-    food_log_entries = relationship("FoodLogEntry", back_populates="user", cascade="all, delete-orphan")
-    steps_entries = relationship("StepsEntry", back_populates="user", cascade="all, delete-orphan")
-    workout_sessions = relationship("WorkoutSession", back_populates="user", cascade="all, delete-orphan")
-    activity_settings = relationship("ActivitySettings", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    user_achievements = relationship("UserAchievement", back_populates="user", cascade="all, delete-orphan")
-    custom_workout_plans = relationship("CustomWorkoutPlan", back_populates="user", cascade="all, delete-orphan")
-    plan_enrollments = relationship("UserPlanEnrollment", back_populates="user", cascade="all, delete-orphan")
+    # Relationships (passive_deletes: дочерние строки удаляет БД через ON DELETE CASCADE, ORM их не загружает)
+    profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    workouts = relationship("Workout", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    exercise_results = relationship("ExerciseResult", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    dishes = relationship("Dish", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    food_log_entries = relationship("FoodLogEntry", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    steps_entries = relationship("StepsEntry", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    workout_sessions = relationship("WorkoutSession", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    activity_settings = relationship("ActivitySettings", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    user_achievements = relationship("UserAchievement", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    custom_workout_plans = relationship("CustomWorkoutPlan", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    plan_enrollments = relationship("UserPlanEnrollment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
     
     # Реферальные связи (self-referential)
     # referred_by: кто меня пригласил (Many-to-One)
@@ -49,13 +49,18 @@ class User(Base):
         back_populates="referred_by",
     )
 
+    __table_args__ = (
+        # Приглашённые пользователем (новые сначала) и шаг рекурсивного обхода сети (app.referrals)
+        Index("ix_users_referred_by_created", "referred_by_id", "created_at"),
+    )
+
 
 class UserProfile(Base):
     """Профиль пользователя"""
     __tablename__ = "user_profiles"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), unique=True, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
     height_cm = Column(Integer, nullable=True)
     weight_kg = Column(Numeric(5, 2), nullable=True)
     age_years = Column(Integer, nullable=True)
@@ -70,7 +75,7 @@ class Workout(Base):
     __tablename__ = "workouts"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     category = Column(String(20), nullable=False, index=True)  # index, basketball, football, hockey
     type = Column(String(20), nullable=False)  # strength, basketball, hockey
@@ -88,17 +93,50 @@ class CustomWorkoutPlan(Base):
     __tablename__ = "custom_workout_plans"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
-    schedule = Column(JSON, default=list)
+    schedule = Column(JSON, default=list)  # как прислал клиент; для запросов — plan_schedule_slots
     is_public = Column(Boolean, default=False, nullable=False)
     code = Column(String(12), unique=True, nullable=False, index=True)
+    enrollment_count = Column(Integer, default=0, server_default="0", nullable=False)  # число записей, ведётся в enroll/unenroll
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="custom_workout_plans")
-    enrollments = relationship("UserPlanEnrollment", back_populates="plan", cascade="all, delete-orphan")
+    enrollments = relationship("UserPlanEnrollment", back_populates="plan", cascade="all, delete-orphan", passive_deletes=True)
+    slots = relationship("PlanScheduleSlot", back_populates="plan", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Частичные индексы каталога публичных планов (app.plan_catalog): keyset по (ключ сортировки, id)
+    __table_args__ = (
+        Index("ix_custom_workout_plans_public_created", "created_at", "id",
+              postgresql_where=text("is_public"), sqlite_where=text("is_public")),
+        Index("ix_custom_workout_plans_public_title", "title", "id",
+              postgresql_where=text("is_public"), sqlite_where=text("is_public")),
+        Index("ix_custom_workout_plans_public_popular", "enrollment_count", "id",
+              postgresql_where=text("is_public"), sqlite_where=text("is_public")),
+    )
+
+
+class PlanScheduleSlot(Base):
+    """Слот расписания плана (нормализованная копия schedule, ведётся app.plan_schedule)"""
+    __tablename__ = "plan_schedule_slots"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    plan_id = Column(UUID(as_uuid=True), ForeignKey("custom_workout_plans.id", ondelete="CASCADE"), nullable=False)
+    position = Column(SmallInteger, nullable=False)  # порядок слота в schedule
+    day_of_week = Column(SmallInteger, nullable=False)  # 0–6, как dayOfWeek у клиента
+    time = Column(Time, nullable=False)
+    workout_id = Column(String(255), nullable=False, default="")
+    workout_name = Column(String(255), nullable=False, default="")
+
+    plan = relationship("CustomWorkoutPlan", back_populates="slots")
+
+    __table_args__ = (
+        # Расписание плана по дням (повестка), и все слоты на день/время (рассылка напоминаний)
+        Index("ix_plan_schedule_slots_plan_day_time", "plan_id", "day_of_week", "time"),
+        Index("ix_plan_schedule_slots_day_time", "day_of_week", "time"),
+    )
 
 
 class UserPlanEnrollment(Base):
@@ -106,9 +144,9 @@ class UserPlanEnrollment(Base):
     __tablename__ = "user_plan_enrollments"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
-    plan_id = Column(UUID(as_uuid=True), ForeignKey("custom_workout_plans.id"), nullable=False, index=True)
-    enrolled_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    plan_id = Column(UUID(as_uuid=True), ForeignKey("custom_workout_plans.id", ondelete="CASCADE"), nullable=False, index=True)
+    enrolled_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     user = relationship("User", back_populates="plan_enrollments")
     plan = relationship("CustomWorkoutPlan", back_populates="enrollments")
@@ -118,16 +156,26 @@ class UserPlanEnrollment(Base):
     )
 
 
+class PlanTrending(Base):
+    """Рейтинг публичных планов по записям за 7 и 30 дней (пересчитывается периодически, app.plan_catalog)"""
+    __tablename__ = "plan_trending"
+
+    plan_id = Column(UUID(as_uuid=True), ForeignKey("custom_workout_plans.id", ondelete="CASCADE"), primary_key=True)
+    enrollments_7d = Column(Integer, nullable=False, default=0, index=True)
+    enrollments_30d = Column(Integer, nullable=False, default=0, index=True)
+    refreshed_at = Column(DateTime, nullable=False)
+
+
 class ExerciseResult(Base):
     """Результат выполнения упражнения"""
     __tablename__ = "exercise_results"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     exercise_id = Column(String(100), nullable=False, index=True)
     exercise_name = Column(String(255), nullable=False)
     date = Column(DateTime, nullable=False, index=True)
-    workout_id = Column(UUID(as_uuid=True), ForeignKey("workouts.id"), nullable=True)
+    workout_id = Column(UUID(as_uuid=True), ForeignKey("workouts.id", ondelete="SET NULL"), nullable=True)
     session_id = Column(String(100), nullable=True, index=True)
     
     # Для силовых тренировок
@@ -143,13 +191,18 @@ class ExerciseResult(Base):
     user = relationship("User", back_populates="exercise_results")
     workout = relationship("Workout", back_populates="exercise_results")
 
+    __table_args__ = (
+        # Последняя активность пользователя (напоминания о перерыве, app.notifications)
+        Index("ix_exercise_results_user_date", "user_id", "date"),
+    )
+
 
 class Dish(Base):
     """Модель блюда"""
     __tablename__ = "dishes"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     calories = Column(Numeric(7, 2), nullable=False)
     protein = Column(Numeric(7, 2), default=0)
@@ -167,7 +220,7 @@ class FoodLogEntry(Base):
     __tablename__ = "food_log_entries"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     dish_id = Column(UUID(as_uuid=True), ForeignKey("dishes.id"), nullable=False)
     dish_name = Column(String(255), nullable=False)
     date = Column(Date, nullable=False, index=True)
@@ -186,7 +239,7 @@ class StepsEntry(Base):
     __tablename__ = "steps_entries"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     date = Column(Date, nullable=False, index=True)
     steps = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -204,8 +257,8 @@ class WorkoutSession(Base):
     __tablename__ = "workout_sessions"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
-    workout_id = Column(UUID(as_uuid=True), ForeignKey("workouts.id"), nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    workout_id = Column(UUID(as_uuid=True), ForeignKey("workouts.id", ondelete="SET NULL"), nullable=True)
     workout_name = Column(String(255), nullable=True)
     workout_type = Column(String(20), nullable=False)
     date = Column(Date, nullable=False, index=True)
@@ -215,6 +268,10 @@ class WorkoutSession(Base):
     user = relationship("User", back_populates="workout_sessions")
     workout = relationship("Workout", back_populates="sessions")
 
+    __table_args__ = (
+        Index("ix_workout_sessions_user_date", "user_id", "date"),
+    )
+
 
 class Achievement(Base):
     """Определение достижения (справочник)"""
@@ -234,7 +291,7 @@ class UserAchievement(Base):
     __tablename__ = "user_achievements"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     achievement_id = Column(String(50), ForeignKey("achievements.id"), nullable=False, index=True)
     achieved_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     push_notified = Column(Boolean, default=False, nullable=False)
@@ -244,6 +301,9 @@ class UserAchievement(Base):
     
     __table_args__ = (
         UniqueConstraint("user_id", "achievement_id", name="unique_user_achievement"),
+        # Непоказанные пуши: малая доля строк, индекс только по ним
+        Index("ix_user_achievements_push_pending", "user_id", "achieved_at",
+              postgresql_where=text("NOT push_notified"), sqlite_where=text("NOT push_notified")),
     )
 
 
@@ -252,7 +312,7 @@ class ActivitySettings(Base):
     __tablename__ = "activity_settings"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), unique=True, nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), unique=True, nullable=False)
     mode = Column(String(20), nullable=True)  # fixed, daily, steps_workouts
     fixed_pal = Column(Numeric(3, 2), nullable=True)
     daily_activity_log = Column(JSON, default=dict)
@@ -260,3 +320,86 @@ class ActivitySettings(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     user = relationship("User", back_populates="activity_settings")
+
+
+class CodeSequence(Base):
+    """Счётчик блоков и ключ перестановки для выдачи кодов (app.code_service)"""
+    __tablename__ = "code_sequences"
+    
+    name = Column(String(32), primary_key=True)  # referral, plan
+    next_block = Column(BigInteger, nullable=False, default=0)
+    secret = Column(String(64), nullable=False)  # ключ перестановки: не меняется после создания
+
+
+class NotificationOutbox(Base):
+    """Очередь уведомлений к отправке (app.notifications): одна строка — одно сообщение пользователю"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # plan_slot, inactivity, achievement
+    dedup_key = Column(String(160), nullable=False, unique=True)  # одно уведомление на событие
+    ref_id = Column(String(64), nullable=True)  # план или достижение, к которому относится
+    title = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String(10), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    lease_until = Column(DateTime, nullable=True)  # sending: до какого времени строка захвачена отправкой
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Выборка к отправке: только pending, по времени следующей попытки
+        Index("ix_notification_outbox_pending", "next_attempt_at", "id",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        # Захваченные отправкой: возврат строк с истёкшей арендой
+        Index("ix_notification_outbox_sending", "lease_until",
+              postgresql_where=text("status = 'sending'"), sqlite_where=text("status = 'sending'")),
+    )
+
+
+class LeaderboardScore(Base):
+    """Очки пользователя на доске лидеров (app.leaderboards): растут вместе с записью результатов"""
+    __tablename__ = "leaderboard_scores"
+
+    metric = Column(String(16), primary_key=True)  # reps, steps, workouts
+    period = Column(String(8), primary_key=True)  # day, week, all
+    period_key = Column(String(10), primary_key=True)  # 2026-10-18, 2026-W42, all
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        # Пересчёт мест доски: строки доски по убыванию очков
+        Index("ix_leaderboard_scores_board_score", "metric", "period", "period_key", "score"),
+    )
+
+
+class LeaderboardRank(Base):
+    """Снимок мест на доске лидеров (пересчитывается периодически, app.leaderboards)"""
+    __tablename__ = "leaderboard_ranks"
+
+    metric = Column(String(16), primary_key=True)
+    period = Column(String(8), primary_key=True)
+    period_key = Column(String(10), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    score = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        # Топ доски: первые места по индексу
+        Index("ix_leaderboard_ranks_board_rank", "metric", "period", "period_key", "rank"),
+    )
+
+
+class LeaderboardBoard(Base):
+    """Доска лидеров: когда пересчитан снимок мест и сколько в нём участников"""
+    __tablename__ = "leaderboard_boards"
+
+    metric = Column(String(16), primary_key=True)
+    period = Column(String(8), primary_key=True)
+    period_key = Column(String(10), primary_key=True)
+    entries = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime, nullable=False, index=True)
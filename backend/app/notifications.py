@@ -0,0 +1,414 @@
+"""
+Напоминания и пуш-уведомления: расчёт, очередь (outbox) и доставка.
+
+Прогон run_notifications() в три шага:
+1. Постановка в очередь — set-based: пользователи идут пакетами по NOTIFICATION_USER_BATCH_SIZE
+   (keyset по users.id), на пакет — по одному INSERT ... SELECT на вид уведомления прямо
+   в notification_outbox, без выборки строк в Python:
+   - plan_slot — слоты планов, на которые записан пользователь, в ближайшие
+     NOTIFICATION_LOOKAHEAD_MINUTES (время слотов — местное, NOTIFICATION_TIMEZONE);
+   - inactivity — активность (workout_sessions / exercise_results) была, но не за последние
+     NOTIFICATION_INACTIVITY_DAYS дней; не чаще раза в этот срок;
+   - achievement — достижения без push_notified, полученные за последние сутки.
+   Повторы отсекает dedup_key (уникальный индекс): повторный или параллельный прогон ничего
+   не добавляет. В памяти процесса — только границы пакетов, поэтому память не растёт с числом
+   пользователей.
+2. Доставка — пакетами по NOTIFICATION_SEND_BATCH_SIZE. Пакет сначала захватывается коротким
+   UPDATE (FOR UPDATE SKIP LOCKED на PostgreSQL): status sending и аренда lease_until на
+   NOTIFICATION_SEND_LEASE_SECONDS, commit — и только потом отправка, вне транзакции: сетевой
+   вызов не держит блокировки строк и открытую транзакцию. Строки упавшего на отправке процесса
+   возвращаются в работу по истечении аренды. Ошибка — повтор с экспоненциальной задержкой
+   NOTIFICATION_RETRY_BASE_SECONDS * 2^попытка, после NOTIFICATION_MAX_ATTEMPTS — status failed.
+   Доставленное достижение отмечается push_notified — только настоящим отправителем.
+3. Очистка — отправленные и неудачные старше NOTIFICATION_RETENTION_DAYS удаляются пакетами.
+
+Отправитель подключается set_sender() (как общий кеш в app.cache). По умолчанию — LocalFakeSender:
+ничего не отправляет и хранит последние сообщения в памяти (локальный запуск и проверка).
+Он не подтверждает доставку (acknowledges = False): push_notified у достижений не меняется, и без
+подключённого отправителя /achievements/pending-notifications не опустошается.
+Запуск: фоновая задача app.lifespan раз в NOTIFICATION_INTERVAL_SECONDS или notifications_handler.py
+по таймеру.
+"""
+import logging
+import time as time_module
+from collections import defaultdict, deque
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import String, and_, case, cast, delete, exists, insert, literal, or_, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.cache import cache, resource_tag
+from app.config import settings
+from app.models import (
+    Achievement,
+    CustomWorkoutPlan,
+    ExerciseResult,
+    NotificationOutbox,
+    PlanScheduleSlot,
+    User,
+    UserAchievement,
+    UserPlanEnrollment,
+    WorkoutSession,
+)
+
+logger = logging.getLogger(__name__)
+
+_OUTBOX_COLUMNS = ("user_id", "kind", "dedup_key", "ref_id", "title", "body", "status", "attempts",
+                   "next_attempt_at", "created_at")
+
+
+class OutboxMessage(NamedTuple):
+    id: int
+    user_id: object
+    kind: str
+    title: str
+    body: str
+    ref_id: Optional[str]
+
+
+class NotificationSender:
+    """
+    Интерфейс доставки (Expo / FCM / APNs и т.п.).
+    send получает пакет и возвращает ошибки {id сообщения: текст}; не вошедшие в ответ — доставлены.
+    acknowledges — доставка настоящая: доставленные достижения отмечаются push_notified.
+    """
+
+    acknowledges = True
+
+    def send(self, messages: List[OutboxMessage]) -> Dict[int, str]:
+        raise NotImplementedError
+
+
+class LocalFakeSender(NotificationSender):
+    """Отправитель для локального запуска: хранит последние сообщения; fail_every — каждое N-е «не доставлено»."""
+
+    acknowledges = False  # ничего не доставляет — push_notified не трогаем
+
+    def __init__(self, keep: int = 1000, fail_every: int = 0):
+        self.sent: "deque[OutboxMessage]" = deque(maxlen=keep)
+        self.fail_every = fail_every
+        self._count = 0
+
+    def send(self, messages: List[OutboxMessage]) -> Dict[int, str]:
+        failures = {}
+        for message in messages:
+            self._count += 1
+            if self.fail_every and self._count % self.fail_every == 0:
+                failures[message.id] = "fake failure"
+                continue
+            self.sent.append(message)
+        return failures
+
+
+_sender: NotificationSender = LocalFakeSender()
+
+
+def set_sender(sender: NotificationSender) -> None:
+    """Подключает отправителя уведомлений."""
+    global _sender
+    _sender = sender
+
+
+def get_sender() -> NotificationSender:
+    return _sender
+
+
+def _timezone():
+    try:
+        return ZoneInfo(settings.NOTIFICATION_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning("Unknown NOTIFICATION_TIMEZONE %r, using UTC", settings.NOTIFICATION_TIMEZONE)
+        return ZoneInfo("UTC")
+
+
+def _day_of_week(day: date) -> int:
+    # 0 — воскресенье, как dayOfWeek у клиента (Date.getDay)
+    return (day.weekday() + 1) % 7
+
+
+def slot_windows(now_local: datetime, minutes: int) -> List[Tuple[date, int, time, Optional[time]]]:
+    """Окно [now, now + minutes) в местном времени — отрезки (дата, день недели, с, по); через полночь — два."""
+    end = now_local + timedelta(minutes=minutes)
+    start_day = now_local.date()
+    if end.date() == start_day:
+        return [(start_day, _day_of_week(start_day), now_local.time().replace(tzinfo=None), end.time().replace(tzinfo=None))]
+    windows = [(start_day, _day_of_week(start_day), now_local.time().replace(tzinfo=None), None)]
+    if end.time() > time(0, 0):
+        windows.append((end.date(), _day_of_week(end.date()), time(0, 0), end.time().replace(tzinfo=None)))
+    return windows
+
+
+def _text(value) -> object:
+    return cast(value, String)
+
+
+def _pending_columns(now: datetime) -> tuple:
+    return literal("pending"), literal(0), literal(now), literal(now)
+
+
+def _in_batch(column, lower, upper):
+    condition = true() if lower is None else column > lower
+    return condition if upper is None else and_(condition, column <= upper)
+
+
+def _not_queued(dedup_key):
+    return ~exists().where(NotificationOutbox.dedup_key == dedup_key)
+
+
+def _plan_slot_selects(now: datetime, now_local: datetime, lower, upper) -> list:
+    slot, plan, enrollment = PlanScheduleSlot, CustomWorkoutPlan, UserPlanEnrollment
+    selects = []
+    for day, day_of_week, since, until in slot_windows(now_local, settings.NOTIFICATION_LOOKAHEAD_MINUTES):
+        # План + время, а не id слота: слоты пересоздаются при изменении плана
+        dedup_key = (
+            literal("plan_slot:") + _text(enrollment.user_id) + literal(":") + _text(plan.id)
+            + literal(f":{day.isoformat()}:") + _text(slot.time)
+        )
+        in_window = and_(slot.day_of_week == day_of_week, slot.time >= since)
+        if until is not None:
+            in_window = and_(in_window, slot.time < until)
+        selects.append(
+            select(
+                enrollment.user_id,
+                literal("plan_slot"),
+                dedup_key,
+                _text(plan.id),
+                literal("Время тренировки"),
+                case((slot.workout_name == "", plan.title), else_=plan.title + literal(": ") + slot.workout_name),
+                *_pending_columns(now),
+            )
+            .select_from(enrollment)
+            .join(slot, slot.plan_id == enrollment.plan_id)
+            .join(plan, plan.id == enrollment.plan_id)
+            .where(_in_batch(enrollment.user_id, lower, upper), in_window, _not_queued(dedup_key))
+        )
+    return selects
+
+
+def _inactivity_select(now: datetime, today: date, lower, upper):
+    days = settings.NOTIFICATION_INACTIVITY_DAYS
+    since = today - timedelta(days=days)
+    # Одно напоминание на каждые days дней перерыва
+    dedup_key = literal("inactivity:") + _text(User.id) + literal(f":{today.toordinal() // days}")
+    sessions, results = WorkoutSession, ExerciseResult
+    was_active = or_(
+        exists().where(sessions.user_id == User.id),
+        exists().where(results.user_id == User.id),
+    )
+    active_recently = or_(
+        exists().where(sessions.user_id == User.id, sessions.date >= since),
+        exists().where(results.user_id == User.id, results.date >= datetime.combine(since, time())),
+    )
+    return select(
+        User.id,
+        literal("inactivity"),
+        dedup_key,
+        literal(None, String),
+        literal("Давно не виделись"),
+        literal(f"Нет тренировок уже {days} дн. — самое время вернуться"),
+        *_pending_columns(now),
+    ).where(_in_batch(User.id, lower, upper), was_active, ~active_recently, _not_queued(dedup_key))
+
+
+def _achievement_select(now: datetime, lower, upper):
+    ua = UserAchievement
+    dedup_key = literal("achievement:") + _text(ua.user_id) + literal(":") + ua.achievement_id
+    return (
+        select(
+            ua.user_id,
+            literal("achievement"),
+            dedup_key,
+            ua.achievement_id,
+            literal("Новое достижение"),
+            Achievement.name,
+            *_pending_columns(now),
+        )
+        .join(Achievement, Achievement.id == ua.achievement_id)
+        .where(
+            _in_batch(ua.user_id, lower, upper),
+            ua.push_notified == False,  # noqa: E712
+            ua.achieved_at >= now - timedelta(days=1),
+            _not_queued(dedup_key),
+        )
+    )
+
+
+def _user_batches(db: Session, batch_size: int) -> Iterable[Tuple[object, object]]:
+    """Границы пакетов пользователей (lower, upper]: по одному запросу по индексу на пакет."""
+    lower = None
+    while True:
+        query = select(User.id).order_by(User.id).offset(batch_size - 1).limit(1)
+        if lower is not None:
+            query = query.where(User.id > lower)
+        upper = db.execute(query).scalar()
+        yield lower, upper
+        if upper is None:
+            return
+        lower = upper
+
+
+def enqueue_due(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+    """Шаг 1: все виды уведомлений в outbox, пакетами пользователей. Возвращает число новых строк."""
+    now = now or datetime.utcnow()
+    now_local = now.replace(tzinfo=ZoneInfo("UTC")).astimezone(_timezone())
+    batch_size = batch_size or settings.NOTIFICATION_USER_BATCH_SIZE
+    queued = 0
+    for lower, upper in _user_batches(db, batch_size):
+        statements = _plan_slot_selects(now, now_local, lower, upper) + [
+            _inactivity_select(now, now_local.date(), lower, upper),
+            _achievement_select(now, lower, upper),
+        ]
+        for attempt in range(2):
+            try:
+                inserted = sum(
+                    db.execute(insert(NotificationOutbox).from_select(_OUTBOX_COLUMNS, statement)).rowcount or 0
+                    for statement in statements
+                )
+                db.commit()
+                queued += inserted
+                break
+            except IntegrityError:
+                # Параллельный прогон успел поставить то же событие — повтор пакета его уже не выберет
+                db.rollback()
+                if attempt:
+                    raise
+    return queued
+
+
+def _retry_at(now: datetime, attempts: int) -> datetime:
+    return now + timedelta(seconds=settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** attempts)
+
+
+def _claim_batch(db: Session, now: datetime, batch_size: int) -> list:
+    """
+    Захват пакета к отправке одним UPDATE ... RETURNING и commit: pending с наступившим
+    next_attempt_at и sending с истёкшей арендой (процесс упал посреди отправки).
+    """
+    outbox = NotificationOutbox
+    ready = or_(
+        and_(outbox.status == "pending", outbox.next_attempt_at <= now),
+        and_(outbox.status == "sending", outbox.lease_until <= now),
+    )
+    claimable = (
+        select(outbox.id)
+        .where(ready)
+        .order_by(outbox.next_attempt_at, outbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = db.execute(
+        update(outbox)
+        .where(outbox.id.in_(claimable.scalar_subquery()))
+        .values(status="sending", lease_until=now + timedelta(seconds=settings.NOTIFICATION_SEND_LEASE_SECONDS))
+        .returning(outbox.id, outbox.user_id, outbox.kind, outbox.title, outbox.body, outbox.ref_id, outbox.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def deliver_due(db: Session, sender: Optional[NotificationSender] = None, now: Optional[datetime] = None,
+                batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Шаг 2: отправка очереди пакетами до её конца. Возвращает {"sent", "retried", "failed"}."""
+    sender = sender or _sender
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.NOTIFICATION_SEND_BATCH_SIZE
+    outbox = NotificationOutbox
+    counts = {"sent": 0, "retried": 0, "failed": 0}
+    while True:
+        rows = _claim_batch(db, now, batch_size)
+        if not rows:
+            return counts
+        # Сетевой вызов — вне транзакции: захваченные строки защищает статус sending и аренда
+        try:
+            failures = sender.send([OutboxMessage(*row[:6]) for row in rows]) or {}
+        except Exception as exc:
+            logger.exception("Notification sender failed")
+            failures = {row.id: f"{type(exc).__name__}: {exc}" for row in rows}
+
+        sending = outbox.status == "sending"
+        sent_ids = [row.id for row in rows if row.id not in failures]
+        if sent_ids:
+            db.execute(
+                update(outbox).where(outbox.id.in_(sent_ids), sending)
+                .values(status="sent", sent_at=now, attempts=outbox.attempts + 1, last_error=None, lease_until=None)
+            )
+            if sender.acknowledges:
+                _mark_achievements_notified(db, sent_ids)
+        # Неудачи — группами (число попыток, ошибка): один UPDATE на группу
+        failed_groups: Dict[Tuple[int, str], List[int]] = defaultdict(list)
+        for row in rows:
+            if row.id in failures:
+                failed_groups[(row.attempts + 1, str(failures[row.id])[:1000])].append(row.id)
+        for (attempts, error), ids in failed_groups.items():
+            exhausted = attempts >= settings.NOTIFICATION_MAX_ATTEMPTS
+            db.execute(
+                update(outbox).where(outbox.id.in_(ids), sending).values(
+                    status="failed" if exhausted else "pending",
+                    attempts=attempts,
+                    next_attempt_at=_retry_at(now, attempts),
+                    last_error=error,
+                    lease_until=None,
+                )
+            )
+            counts["failed" if exhausted else "retried"] += len(ids)
+        db.commit()
+        counts["sent"] += len(sent_ids)
+        users = {row.user_id for row in rows if row.kind == "achievement" and row.id not in failures}
+        if users and sender.acknowledges:
+            cache.invalidate(*(resource_tag("user_achievements", user_id) for user_id in users))
+
+
+def _mark_achievements_notified(db: Session, sent_ids: List[int]) -> None:
+    ua, outbox = UserAchievement, NotificationOutbox
+    db.execute(
+        update(ua)
+        .where(exists().where(
+            outbox.id.in_(sent_ids),
+            outbox.kind == "achievement",
+            outbox.user_id == ua.user_id,
+            outbox.ref_id == ua.achievement_id,
+        ))
+        .values(push_notified=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def purge_outbox(db: Session, now: Optional[datetime] = None, batch_size: int = 5000) -> int:
+    """Шаг 3: удаление отправленных и неудачных старше NOTIFICATION_RETENTION_DAYS, пакетами по id."""
+    now = now or datetime.utcnow()
+    outbox = NotificationOutbox
+    cutoff = now - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    total = 0
+    while True:
+        ids = select(outbox.id).where(outbox.status.in_(("sent", "failed")), outbox.created_at < cutoff).limit(batch_size)
+        deleted = db.execute(
+            delete(outbox).where(outbox.id.in_(ids.scalar_subquery())).execution_options(synchronize_session=False)
+        ).rowcount or 0
+        db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def run_notifications(db: Session, now: Optional[datetime] = None) -> dict:
+    """Полный прогон: постановка в очередь, доставка, очистка. Возвращает счётчики и время шагов."""
+    now = now or datetime.utcnow()
+    timings = {}
+
+    t0 = time_module.perf_counter()
+    queued = enqueue_due(db, now)
+    timings["enqueue_ms"] = round((time_module.perf_counter() - t0) * 1000, 2)
+
+    t0 = time_module.perf_counter()
+    delivered = deliver_due(db, now=now)
+    timings["deliver_ms"] = round((time_module.perf_counter() - t0) * 1000, 2)
+
+    t0 = time_module.perf_counter()
+    purged = purge_outbox(db, now)
+    timings["purge_ms"] = round((time_module.perf_counter() - t0) * 1000, 2)
+
+    return {"queued": queued, **delivered, "purged": purged, **timings}
@@ -0,0 +1,246 @@
+"""
+Каталог публичных планов: постраничная выдача кратких карточек (без schedule),
+счётчики записей и рейтинг «в тренде».
+
+Сортировки: newest (created_at), popular (enrollment_count), title. Пагинация по
+ключу (keyset): курсор — последнее значение сортировки и id, следующая страница читается
+с места по индексу, а не через OFFSET, поэтому стоимость страницы не растёт с каталогом.
+Первые PLAN_CATALOG_CACHED_PAGES страниц каждой сортировки кешируются в app.cache
+с тегом PUBLIC_PLANS_TAG — его сбрасывают публикация, снятие с публикации, изменение
+и удаление публичного плана, а также запись на план и отписка (меняется enrollment_count).
+
+Приватный план по коду (/by-code/{code}, без авторизации) кешируется по коду вместе с промахами
+(отрицательное кеширование) с тегом plan_code_tag(code) — его сбрасывают изменение, смена
+приватности и удаление плана. Промах при общем backend кеша хранится только в нём; без общего
+backend — в памяти процесса, и сброс до других контейнеров не доходит: там новый код может
+отвечать 404 до PLAN_CODE_NEGATIVE_TTL_SECONDS.
+
+custom_workout_plans.enrollment_count меняется в той же транзакции, что и запись/отписка;
+закешированные страницы сбрасываются после коммита. Без общего backend кеша сброс виден
+только в своём процессе — в других счётчик может отставать до CACHE_TTL_SECONDS.
+Рейтинг за 7 и 30 дней лежит в plan_trending и пересчитывается целиком раз в
+TRENDING_REFRESH_SECONDS (фоновая задача app.lifespan или таймер trending_handler.py) —
+чтение рейтинга идёт по индексу и таблицу записей не сканирует.
+"""
+import base64
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import String, case, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from app.cache import cache, resource_tag
+from app.config import settings
+from app.models import CustomWorkoutPlan, PlanTrending, UserPlanEnrollment
+from app.schemas import CustomWorkoutPlanResponse
+
+PUBLIC_PLANS_TAG = resource_tag("custom_workout_plans")
+TRENDING_TAG = resource_tag("plan_trending")
+CATALOG_SORTS = ("newest", "popular", "title")
+TRENDING_WINDOWS = {"7d": PlanTrending.enrollments_7d, "30d": PlanTrending.enrollments_30d}
+_PLAN_CODE_RE = re.compile(r"^[A-Z0-9]{1,12}$")
+
+
+class _json_type(FunctionElement):
+    """Тип JSON-значения ('array', 'object', 'null', ...): json_typeof в PostgreSQL, json_type в SQLite."""
+    type = String()
+    name = "json_type"
+    inherit_cache = True
+
+
+@compiles(_json_type)
+def _json_type_default(element, compiler, **kw):
+    return f"json_type({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_json_type, "postgresql")
+def _json_type_postgresql(element, compiler, **kw):
+    return f"json_typeof({compiler.process(element.clauses, **kw)})"
+
+
+# Число слотов; schedule не массив (JSON null, объект) — 0: json_array_length на нём падает в PostgreSQL
+_SLOTS_COUNT = case(
+    (_json_type(CustomWorkoutPlan.schedule) == "array", func.json_array_length(CustomWorkoutPlan.schedule)),
+    else_=0,
+)
+
+_SUMMARY_COLUMNS = (
+    CustomWorkoutPlan.id,
+    CustomWorkoutPlan.title,
+    CustomWorkoutPlan.description,
+    _SLOTS_COUNT.label("slots_count"),
+    CustomWorkoutPlan.enrollment_count,
+    CustomWorkoutPlan.created_at,
+)
+_SUMMARY_KEYS = ("id", "title", "description", "slots_count", "enrollment_count", "created_at")
+
+
+def encode_cursor(value, plan_id: UUID, page: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, str(plan_id), page], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """(значение сортировки, id, номер страницы); 400 — курсор повреждён или от другой сортировки."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, plan_id, page = json.loads(raw)
+        if sort == "newest":
+            value = datetime.fromisoformat(value)
+        elif sort == "popular":
+            value = int(value)
+        elif not isinstance(value, str):
+            raise ValueError(value)
+        return value, UUID(plan_id), int(page)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def _load_page(db: Session, sort: str, limit: int, after: Optional[tuple], page: int) -> dict:
+    plan = CustomWorkoutPlan
+    sort_key = {"newest": plan.created_at, "popular": plan.enrollment_count, "title": plan.title}[sort]
+    descending = sort != "title"
+    query = select(*_SUMMARY_COLUMNS).where(plan.is_public == True)  # noqa: E712
+    if after is not None:
+        value, plan_id = after
+        position = tuple_(sort_key, plan.id)
+        query = query.where(position < (value, plan_id) if descending else position > (value, plan_id))
+    order = (sort_key.desc(), plan.id.desc()) if descending else (sort_key.asc(), plan.id.asc())
+    rows = db.execute(query.order_by(*order).limit(limit + 1)).all()
+
+    has_more = len(rows) > limit
+    items = [dict(zip(_SUMMARY_KEYS, row)) for row in rows[:limit]]
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor(last[sort_key.key], last["id"], page + 1)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def get_catalog_page(db: Session, sort: str, limit: int, cursor: Optional[str] = None) -> dict:
+    """Страница каталога {"items": [...], "next_cursor": str | None}; первые страницы — из кеша."""
+    after, page = None, 0
+    if cursor:
+        value, plan_id, page = decode_cursor(cursor, sort)
+        after = (value, plan_id)
+    if page >= settings.PLAN_CATALOG_CACHED_PAGES:
+        return _load_page(db, sort, limit, after, page)
+    return cache.get_or_set(
+        f"custom_workout_plans:catalog:{sort}:{limit}:{cursor or ''}",
+        lambda: _load_page(db, sort, limit, after, page),
+        tags=[PUBLIC_PLANS_TAG],
+    )
+
+
+# ==================== План по коду ====================
+
+def plan_code_tag(code: str) -> str:
+    return resource_tag("custom_workout_plans:code", code)
+
+
+def get_private_plan_by_code(db: Session, code: str) -> Optional[dict]:
+    """Приватный план по коду (dict как CustomWorkoutPlanResponse) или None; промах тоже кешируется."""
+    code = code.upper().strip()
+    if not _PLAN_CODE_RE.match(code):
+        return None  # заведомо не код — ни запроса, ни места в кеше
+
+    def load() -> Optional[dict]:
+        plan = db.query(CustomWorkoutPlan).filter(
+            CustomWorkoutPlan.code == code,
+            CustomWorkoutPlan.is_public == False  # noqa: E712
+        ).first()
+        return CustomWorkoutPlanResponse.model_validate(plan).model_dump() if plan else None
+
+    return cache.get_or_set(
+        f"custom_workout_plans:by-code:{code}",
+        load,
+        tags=[plan_code_tag(code)],
+        ttl=settings.PLAN_CODE_CACHE_TTL_SECONDS,
+        negative_ttl=settings.PLAN_CODE_NEGATIVE_TTL_SECONDS,
+    )
+
+
+# ==================== Счётчики и рейтинг ====================
+
+def _shifted_count(delta: int):
+    value = CustomWorkoutPlan.enrollment_count + delta
+    return case((value < 0, 0), else_=value)
+
+
+def adjust_enrollment_count(db: Session, plan_id, delta: int) -> None:
+    """Счётчик записей плана ±delta — в текущей транзакции, вместе с самой записью/отпиской."""
+    db.execute(
+        update(CustomWorkoutPlan)
+        .where(CustomWorkoutPlan.id == plan_id)
+        .values(enrollment_count=_shifted_count(delta))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_user_enrollments(db: Session, user_id) -> None:
+    """Минус один у всех планов, на которые записан пользователь (перед удалением его записей)."""
+    db.execute(
+        update(CustomWorkoutPlan)
+        .where(CustomWorkoutPlan.id.in_(
+            select(UserPlanEnrollment.plan_id).where(UserPlanEnrollment.user_id == user_id)
+        ))
+        .values(enrollment_count=_shifted_count(-1))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_trending(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Пересчёт plan_trending одним INSERT ... SELECT по записям за 30 дней (индекс по enrolled_at),
+    в одной транзакции: читатели до commit видят прежний рейтинг. Возвращает число планов в рейтинге.
+    """
+    now = now or datetime.utcnow()
+    since_7d, since_30d = now - timedelta(days=7), now - timedelta(days=30)
+    recent = (
+        select(
+            UserPlanEnrollment.plan_id,
+            func.sum(case((UserPlanEnrollment.enrolled_at >= since_7d, 1), else_=0)),
+            func.count(),
+            literal(now),
+        )
+        .where(UserPlanEnrollment.enrolled_at >= since_30d)
+        .group_by(UserPlanEnrollment.plan_id)
+    )
+    db.execute(delete(PlanTrending))
+    db.execute(insert(PlanTrending).from_select(
+        ["plan_id", "enrollments_7d", "enrollments_30d", "refreshed_at"], recent
+    ))
+    db.commit()
+    cache.invalidate(TRENDING_TAG)
+    return db.query(func.count(PlanTrending.plan_id)).scalar() or 0
+
+
+def get_trending(db: Session, window: str, limit: int) -> dict:
+    """Топ публичных планов по записям за окно (7d / 30d) — из plan_trending, по индексу."""
+    recent = TRENDING_WINDOWS[window]
+
+    def load() -> dict:
+        rows = db.execute(
+            select(*_SUMMARY_COLUMNS, recent, PlanTrending.refreshed_at)
+            .join(PlanTrending, PlanTrending.plan_id == CustomWorkoutPlan.id)
+            .where(CustomWorkoutPlan.is_public == True, recent > 0)  # noqa: E712
+            .order_by(recent.desc(), CustomWorkoutPlan.id)
+            .limit(limit)
+        ).all()
+        items = [
+            {**dict(zip(_SUMMARY_KEYS, row)), "recent_enrollments": row[len(_SUMMARY_KEYS)]}
+            for row in rows
+        ]
+        return {"window": window, "refreshed_at": rows[0][-1] if rows else None, "items": items}
+
+    return cache.get_or_set(
+        f"custom_workout_plans:trending:{window}:{limit}", load, tags=[PUBLIC_PLANS_TAG, TRENDING_TAG]
+    )
@@ -0,0 +1,92 @@
+"""
+Расписания планов: слоты из schedule в таблице plan_schedule_slots и недельная повестка.
+
+custom_workout_plans.schedule остаётся как есть (его отдаёт API), а для запросов по дням и времени
+слоты лежат строками с индексами (plan_id, day_of_week, time) и (day_of_week, time).
+Слоты переписываются в той же транзакции, что и schedule (создание/изменение плана).
+Повестка пользователя — один запрос: слоты планов, на которые он записан (и, по желанию, своих).
+"""
+from datetime import time
+from typing import Any, Iterable, List, Optional
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import CustomWorkoutPlan, PlanScheduleSlot, UserPlanEnrollment
+
+
+def parse_slot_time(value: Any) -> Optional[time]:
+    """«HH:MM» → time; None — время не разобрать (старые расписания проверялись нестрого)."""
+    if not isinstance(value, str):
+        return None
+    try:
+        hours, minutes = (int(part) for part in value.strip().split(":"))
+        return time(hours, minutes)
+    except ValueError:
+        return None
+
+
+def slot_rows(plan_id, schedule: Optional[Iterable[Any]]) -> List[dict]:
+    """Строки plan_schedule_slots из schedule плана; слоты без дня недели или времени пропускаются."""
+    rows = []
+    for position, slot in enumerate(schedule or []):
+        if not isinstance(slot, dict):
+            continue
+        day = slot.get("dayOfWeek")
+        slot_time = parse_slot_time(slot.get("time"))
+        if not isinstance(day, int) or not 0 <= day <= 6 or slot_time is None:
+            continue
+        rows.append({
+            "plan_id": plan_id,
+            "position": position,
+            "day_of_week": day,
+            "time": slot_time,
+            "workout_id": str(slot.get("workoutId") or "")[:255],
+            "workout_name": str(slot.get("workoutName") or "")[:255],
+        })
+    return rows
+
+
+def replace_plan_slots(db: Session, plan_id, schedule: Optional[Iterable[Any]]) -> None:
+    """Слоты плана заново по schedule — в текущей транзакции (commit делает вызывающий)."""
+    db.execute(
+        delete(PlanScheduleSlot)
+        .where(PlanScheduleSlot.plan_id == plan_id)
+        .execution_options(synchronize_session=False)
+    )
+    rows = slot_rows(plan_id, schedule)
+    if rows:
+        db.execute(insert(PlanScheduleSlot), rows)
+
+
+def get_weekly_agenda(
+    db: Session, user_id, day_of_week: Optional[int] = None, include_own: bool = False
+) -> List[dict]:
+    """
+    Слоты всех планов, на которые записан пользователь (include_own — и его собственных),
+    по дню недели и времени. Ключи — как у AgendaSlotResponse (camelCase).
+    """
+    slot, plan = PlanScheduleSlot, CustomWorkoutPlan
+    enrolled = select(UserPlanEnrollment.plan_id).where(UserPlanEnrollment.user_id == user_id)
+    plan_filter = plan.id.in_(enrolled)
+    if include_own:
+        plan_filter = or_(plan_filter, plan.user_id == user_id)
+    query = (
+        select(slot.day_of_week, slot.time, slot.workout_id, slot.workout_name, plan.id, plan.title)
+        .join(plan, plan.id == slot.plan_id)
+        .where(plan_filter)
+    )
+    if day_of_week is not None:
+        query = query.where(slot.day_of_week == day_of_week)
+    rows = db.execute(query.order_by(slot.day_of_week, slot.time, plan.title, slot.position)).all()
+    return [
+        {
+            "dayOfWeek": day,
+            "time": slot_time.strftime("%H:%M"),
+            "workoutId": workout_id,
+            "workoutName": workout_name,
+            "planId": plan_id,
+            "planTitle": title,
+        }
+        for day, slot_time, workout_id, workout_name, plan_id, title in rows
+    ]
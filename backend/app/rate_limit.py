@@ -0,0 +1,69 @@
+"""
+Ограничение частоты запросов по IP для открытых (без авторизации) эндпоинтов.
+
+Token bucket на ключ (IP клиента): ёмкость burst, пополнение per_minute токенов в минуту.
+Состояние — в памяти процесса (LRU на max_keys адресов), поэтому в serverless лимит действует
+в пределах одного контейнера; его задача — не дать перебору кодов превратиться в нагрузку на БД,
+а не точный глобальный учёт. IP — request.client.host: в Cloud Functions это sourceIp
+из контекста события (handler.py; X-Forwarded-For не используется — его задаёт клиент).
+Под uvicorn — адрес соединения; X-Forwarded-For учитывается (--proxy-headers), только если
+соединение пришло с адреса из FORWARDED_ALLOW_IPS. Без этого за обратным прокси все клиенты
+делят одно ведро (адрес прокси), а FORWARDED_ALLOW_IPS="*" при открытом наружу порте
+позволяет обойти лимит подменой заголовка.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+from fastapi import HTTPException, Request
+
+
+class TokenBucketLimiter:
+    """Token bucket по ключам; потокобезопасен. per_minute <= 0 — без ограничения."""
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = 10_000):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> float:
+        """Списывает токен: 0 — запрос разрешён, иначе — через сколько секунд появится токен."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+def rate_limit(limiter: TokenBucketLimiter) -> Callable[[Request], None]:
+    """Зависимость FastAPI: 429 с Retry-After, если IP исчерпал лимит."""
+
+    def dependency(request: Request) -> None:
+        ip = request.client.host if request.client else "unknown"
+        wait = limiter.hit(ip)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много запросов, попробуйте позже",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    return dependency
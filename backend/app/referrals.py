@@ -0,0 +1,119 @@
+"""
+Реферальная сеть: приглашённые пользователем, его «нижняя линия» по уровням и их активность.
+
+Дерево задаёт users.referred_by_id (индекс (referred_by_id, created_at)). Нижняя линия —
+рекурсивный CTE от пользователя вниз с ограничением глубины (REFERRAL_MAX_DEPTH): каждый шаг —
+поиск приглашённых по индексу, в Python приходят только агрегаты по уровням или одна страница.
+Циклов в дереве нет (пригласивший всегда зарегистрирован раньше), глубина ограничивает размер обхода.
+Активный реферал — с тренировкой или результатом упражнения за последние REFERRAL_ACTIVE_DAYS дней
+(индексы (user_id, date) сессий и результатов).
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+
+from sqlalchemy import case, exists, func, literal, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.config import settings
+from app.leaderboards import display_name
+from app.models import ExerciseResult, User, WorkoutSession
+
+
+def downline_cte(user_id, depth: int):
+    """CTE (user_id, level): приглашённые пользователем (level 1), их приглашённые (2) ... до depth."""
+    tree = (
+        select(User.id.label("user_id"), literal(1).label("level"))
+        .where(User.referred_by_id == user_id)
+        .cte("downline", recursive=True)
+    )
+    child = aliased(User)
+    return tree.union_all(
+        select(child.id, tree.c.level + 1)
+        .where(child.referred_by_id == tree.c.user_id, tree.c.level < depth)
+    )
+
+
+def _active_since(user_column, since: date):
+    return or_(
+        exists().where(WorkoutSession.user_id == user_column, WorkoutSession.date >= since),
+        exists().where(ExerciseResult.user_id == user_column, ExerciseResult.date >= datetime.combine(since, time())),
+    )
+
+
+def _last_activity(user_column) -> tuple:
+    """Скалярные подзапросы: последняя дата сессии и последний результат (по индексам (user_id, date))."""
+    return (
+        select(func.max(WorkoutSession.date)).where(WorkoutSession.user_id == user_column).scalar_subquery(),
+        select(func.max(ExerciseResult.date)).where(ExerciseResult.user_id == user_column).scalar_subquery(),
+    )
+
+
+def _latest(session_day: Optional[date], result_at: Optional[datetime]) -> Optional[date]:
+    days = [day for day in (session_day, result_at.date() if result_at else None) if day is not None]
+    return max(days) if days else None
+
+
+def get_direct_referrals(db: Session, user_id, limit: int, offset: int = 0) -> dict:
+    """Страница приглашённых (новые сначала) с датой последней активности и общее число — COUNT в БД."""
+    total = db.execute(select(func.count()).where(User.referred_by_id == user_id)).scalar() or 0
+    rows = db.execute(
+        select(User.id, User.email, User.created_at, *_last_activity(User.id))
+        .where(User.referred_by_id == user_id)
+        .order_by(User.created_at.desc(), User.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    referrals = [
+        {"id": ref_id, "email": email, "created_at": created_at, "last_activity_date": _latest(session_day, result_at)}
+        for ref_id, email, created_at, session_day, result_at in rows
+    ]
+    return {"referrals": referrals, "total_count": total}
+
+
+def get_referral_stats(db: Session, user_id, depth: int, today: Optional[date] = None) -> dict:
+    """Размер сети по уровням и число активных — один запрос с рекурсивным CTE и GROUP BY level."""
+    since = (today or datetime.utcnow().date()) - timedelta(days=settings.REFERRAL_ACTIVE_DAYS)
+    tree = downline_cte(user_id, depth)
+    rows = db.execute(
+        select(tree.c.level, func.count(), func.sum(case((_active_since(tree.c.user_id, since), 1), else_=0)))
+        .group_by(tree.c.level)
+        .order_by(tree.c.level)
+    ).all()
+    levels: List[dict] = [
+        {"level": level, "count": count, "active_count": int(active or 0)} for level, count, active in rows
+    ]
+    direct = levels[0] if levels and levels[0]["level"] == 1 else {"count": 0, "active_count": 0}
+    return {
+        "depth": depth,
+        "active_days": settings.REFERRAL_ACTIVE_DAYS,
+        "direct_count": direct["count"],
+        "active_direct_count": direct["active_count"],
+        "downline_count": sum(level["count"] for level in levels),
+        "active_downline_count": sum(level["active_count"] for level in levels),
+        "levels": levels,
+    }
+
+
+def get_downline_page(db: Session, user_id, depth: int, limit: int, offset: int = 0) -> dict:
+    """Страница нижней линии: по уровню, внутри уровня — новые сначала. Почта не раскрывается."""
+    tree = downline_cte(user_id, depth)
+    total = db.execute(select(func.count()).select_from(tree)).scalar() or 0
+    rows = db.execute(
+        select(tree.c.level, User.id, User.email, User.referred_by_id, User.created_at, *_last_activity(User.id))
+        .join(User, User.id == tree.c.user_id)
+        .order_by(tree.c.level, User.created_at.desc(), User.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    items = [
+        {
+            "level": level,
+            "id": member_id,
+            "name": display_name(email),
+            "referred_by_id": referred_by_id,
+            "created_at": created_at,
+            "last_activity_date": _latest(session_day, result_at),
+        }
+        for level, member_id, email, referred_by_id, created_at, session_day, result_at in rows
+    ]
+    return {"depth": depth, "items": items, "total_count": total}
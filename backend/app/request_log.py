@@ -0,0 +1,137 @@
+"""
+Структурные логи запросов serverless-функции и учёт времени БД на запрос.
+
+Вместо печати сырых событий на каждый вызов — одна JSON-строка на запрос, и только для
+выборки (LOG_SAMPLE_RATE), а также всегда для ошибок 5xx и медленных запросов (LOG_SLOW_MS).
+Тело запроса в лог попадает только JSON-ом, с замаскированными секретными полями (пароли, токены);
+тела /auth/* и base64-тела не логируются.
+Время БД считается слушателями SQLAlchemy и складывается в RequestStats текущего запроса
+(через contextvars: объект общий для event loop и потоков threadpool).
+"""
+import json
+import logging
+import random
+import sys
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import settings
+
+
+class RequestStats:
+    """Накопленные за запрос показатели БД."""
+
+    __slots__ = ("db_time", "db_queries", "db_wait")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.db_wait = 0.0  # ожидание соединения (checkout из пула / подключение)
+
+
+# Поля тела запроса, значения которых в лог не попадают (сравнение без учёта регистра)
+SECRET_BODY_FIELDS = frozenset({
+    "password", "new_password", "old_password", "token", "access_token", "refresh_token", "secret",
+})
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_logger: Optional[logging.Logger] = None
+
+
+def get_request_logger() -> logging.Logger:
+    """Логгер omniactive.requests: по строке JSON в stdout, без форматирования и propagate."""
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger("omniactive.requests")
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _logger = logger
+    return _logger
+
+
+def start_request() -> RequestStats:
+    """Новый RequestStats для текущего запроса."""
+    stats = RequestStats()
+    current_stats.set(stats)
+    return stats
+
+
+def should_log(status: Optional[int], duration_ms: float) -> bool:
+    """Ошибки и медленные запросы — всегда, остальные — с вероятностью LOG_SAMPLE_RATE."""
+    if status is None or status >= 500 or duration_ms >= settings.LOG_SLOW_MS:
+        return True
+    rate = settings.LOG_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def truncate(value, limit: int) -> Optional[str]:
+    """Строка не длиннее limit символов (с пометкой об обрезке); None, если limit <= 0."""
+    if limit <= 0 or value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="replace")
+    value = str(value)
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}…(+{len(value) - limit})"
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {
+            k: "***" if isinstance(k, str) and k.lower() in SECRET_BODY_FIELDS else _redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+
+def body_for_log(body, path: Optional[str], is_base64: bool, limit: int) -> Optional[str]:
+    """
+    Тело запроса для лога: None для /auth/*, base64 и при limit <= 0; JSON — с маскировкой
+    SECRET_BODY_FIELDS; не-JSON — только длина (в нём нельзя надёжно найти секреты).
+    """
+    if limit <= 0 or not body or is_base64:
+        return None
+    if path and (path == "/auth" or path.startswith("/auth/")):
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        parsed = json.loads(body)
+    except (TypeError, ValueError):
+        return f"<не JSON, {len(str(body))} символов>"
+    return truncate(json.dumps(_redact(parsed), ensure_ascii=False), limit)
+
+
+def emit(record: dict) -> None:
+    get_request_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def install_db_timing(engine) -> None:
+    """Слушатели SQLAlchemy: время и число запросов к БД в RequestStats текущего запроса."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        stats = current_stats.get()
+        if stats is not None:
+            stats.db_time += time.perf_counter() - started
+            stats.db_queries += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
@@ -0,0 +1,84 @@
+"""
+Быстрая JSON-сериализация для больших списков.
+
+FastJSONResponse кодирует ответ через orjson (если установлен), иначе через json с тем же
+форматом. rows_to_dicts собирает ответ прямо из кортежей SQL-строк — без гидрации ORM-объектов
+и повторной валидации Pydantic (from_attributes). Ключи и формат значений совпадают с тем,
+что отдаёт соответствующая response_model.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен — без него работает запасной путь через json
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Типы, которые не умеет кодировать JSON-энкодер напрямую."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Сериализация в JSON-байты (UTF-8, без пробелов) — как у JSONResponse."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse на orjson: понимает UUID, datetime/date и Decimal без jsonable_encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(
+    rows: Iterable[Sequence[Any]],
+    keys: Sequence[str],
+    converters: Optional[Dict[str, Callable[[Any], Any]]] = None,
+) -> List[dict]:
+    """
+    Строки результата SQL (кортежи) в список словарей с ключами keys.
+    converters — преобразования отдельных полей (например date → datetime, None → значение по умолчанию).
+    """
+    if not converters:
+        return [dict(zip(keys, row)) for row in rows]
+    items = list(converters.items())
+    out = []
+    for row in rows:
+        d = dict(zip(keys, row))
+        for key, fn in items:
+            d[key] = fn(d[key])
+        out.append(d)
+    return out
+
+
+def as_float(value: Any) -> Optional[float]:
+    """Decimal/int из Numeric-колонки в float, как при валидации в Pydantic."""
+    return float(value) if value is not None else None
+
+
+def date_as_datetime(value: Any) -> Any:
+    """date в datetime (полночь) — для схем, где поле объявлено как datetime, а колонка Date."""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
@@ -0,0 +1,75 @@
+"""
+Реестр роутеров и ленивое подключение по префиксу пути.
+
+В обычном режиме все роутеры подключаются при старте. В режиме LAZY_ROUTERS (для serverless)
+модуль роутера импортируется и подключается при первом запросе к его префиксу — холодный
+старт функции не платит за импорт и сборку всех одиннадцати роутеров и их схем.
+"""
+import importlib
+import threading
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Префикс пути → модуль роутера (префикс совпадает с APIRouter(prefix=...) в модуле)
+ROUTER_MODULES = {
+    "/auth": "app.routers.auth",
+    "/workouts": "app.routers.workouts",
+    "/exercise-results": "app.routers.exercise_results",
+    "/dishes": "app.routers.dishes",
+    "/food-log": "app.routers.food_log",
+    "/profile": "app.routers.profile",
+    "/steps": "app.routers.steps",
+    "/workout-sessions": "app.routers.workout_sessions",
+    "/activity-settings": "app.routers.activity_settings",
+    "/achievements": "app.routers.achievements",
+    "/custom-workout-plans": "app.routers.custom_workout_plans",
+    "/export": "app.routers.export",
+    "/leaderboards": "app.routers.leaderboards",
+}
+
+_included: set = set()
+_lock = threading.Lock()
+
+
+def include_routers(app: FastAPI, prefixes: Optional[Iterable[str]] = None) -> None:
+    """Подключает роутеры с указанными префиксами (по умолчанию все), каждый не более одного раза."""
+    for prefix in ROUTER_MODULES if prefixes is None else prefixes:
+        if prefix in _included:
+            continue
+        with _lock:
+            if prefix in _included:
+                continue
+            module = importlib.import_module(ROUTER_MODULES[prefix])
+            app.include_router(module.router)
+            _included.add(prefix)
+
+
+def all_routers_included() -> bool:
+    return len(_included) == len(ROUTER_MODULES)
+
+
+def prefix_for_path(path: str) -> Optional[str]:
+    """Префикс роутера для пути запроса ("/food-log/123" → "/food-log")."""
+    end = path.find("/", 1)
+    prefix = path if end == -1 else path[:end]
+    return prefix if prefix in ROUTER_MODULES else None
+
+
+class LazyRouterMiddleware:
+    """
+    Подключает роутер перед первым запросом к его префиксу. Документации роутеры не нужны:
+    схема собрана заранее (app.docs), а без неё app.docs сам подключает все роутеры.
+    """
+
+    def __init__(self, app: ASGIApp, fastapi_app: FastAPI) -> None:
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not all_routers_included():
+            prefix = prefix_for_path(scope["path"])
+            if prefix is not None:
+                include_routers(self.fastapi_app, [prefix])
+        await self.app(scope, receive, send)
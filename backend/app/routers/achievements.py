@@ -1,15 +1,20 @@
 """
 Роутер для достижений
 """
+from datetime import datetime, timezone
 from typing import List
 
 from fastapi import APIRouter, Depends
+from sqlalchemy import and_, update
 from sqlalchemy.orm import Session
 
 from app.achievements_service import check_and_award_achievements, ensure_achievements_seeded
 from app.auth import get_current_user
+from app.cache import cache, resource_tag
 from app.database import get_db
+from app.eager import eager
 from app.models import Achievement, User, UserAchievement
+from app.schemas import PushNotifiedAck
 
 router = APIRouter(prefix="/achievements", tags=["achievements"])
 
@@ -20,30 +25,41 @@ async def get_achievements(
     db: Session = Depends(get_db),
 ):
     """Все достижения с отметкой achieved, achieved_at, push_notified."""
-    ensure_achievements_seeded(db)
+    def load() -> list:
+        ensure_achievements_seeded(db)
 
-    achievements = db.query(Achievement).order_by(Achievement.id).all()
-    user_achievements = {
-        ua.achievement_id: ua
-        for ua in db.query(UserAchievement)
-        .filter(UserAchievement.user_id == current_user.id)
-        .all()
-    }
+        rows = (
+            db.query(Achievement, UserAchievement)
+            .outerjoin(
+                UserAchievement,
+                and_(
+                    UserAchievement.achievement_id == Achievement.id,
+                    UserAchievement.user_id == current_user.id,
+                ),
+            )
+            .options(*eager())
+            .order_by(Achievement.id)
+            .all()
+        )
 
-    out = []
-    for a in achievements:
-        ua = user_achievements.get(a.id)
-        out.append({
-            "id": a.id,
-            "name": a.name,
-            "type": a.type,
-            "target": a.target,
-            "achieved": ua is not None,
-            "achieved_at": ua.achieved_at.isoformat() if ua and ua.achieved_at else None,
-            "push_notified": ua.push_notified if ua else False,
-        })
+        out = []
+        for a, ua in rows:
+            out.append({
+                "id": a.id,
+                "name": a.name,
+                "type": a.type,
+                "target": a.target,
+                "achieved": ua is not None,
+                "achieved_at": ua.achieved_at.isoformat() if ua and ua.achieved_at else None,
+                "push_notified": ua.push_notified if ua else False,
+            })
+        return out
 
-    return out
+    return cache.get_or_set(
+        f"achievements:{current_user.id}",
+        load,
+        tags=[resource_tag("user_achievements", current_user.id)],
+    )
 
 
 @router.post("/check")
@@ -56,17 +72,57 @@ async def check_achievements(
     Выдаёт их и возвращает список только что полученных (для пуш-уведомлений).
     """
     newly = check_and_award_achievements(current_user, db)
-    result = []
-    for ua in newly:
-        a = db.query(Achievement).filter(Achievement.id == ua.achievement_id).first()
-        result.append({
+    if newly:
+        cache.invalidate(resource_tag("user_achievements", current_user.id))
+    result = [
+        {
             "id": ua.achievement_id,
-            "name": a.name if a else ua.achievement_id,
+            "name": ua.achievement.name if ua.achievement else ua.achievement_id,
             "achieved_at": ua.achieved_at.isoformat(),
-        })
+        }
+        for ua in newly
+    ]
     return {"newly_awarded": result}
 
 
+@router.get("/pending-notifications")
+async def get_pending_notifications(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Полученные достижения, пуш по которым ещё не показан (частичный индекс по push_notified = false)."""
+    rows = (
+        db.query(UserAchievement.achievement_id, Achievement.name, UserAchievement.achieved_at)
+        .join(Achievement, Achievement.id == UserAchievement.achievement_id)
+        .filter(
+            UserAchievement.user_id == current_user.id,
+            UserAchievement.push_notified == False,  # noqa: E712
+        )
+        .order_by(UserAchievement.achieved_at)
+        .all()
+    )
+    return [
+        {"id": achievement_id, "name": name, "achieved_at": achieved_at.isoformat()}
+        for achievement_id, name, achieved_at in rows
+    ]
+
+
+@router.post("/push-notified")
+async def mark_push_notified_bulk(
+    data: PushNotifiedAck,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Отметить пуши отправленными одним UPDATE: по списку achievement_ids или все полученные до up_to."""
+    condition = (
+        UserAchievement.achievement_id.in_(data.achievement_ids)
+        if data.achievement_ids is not None
+        else UserAchievement.achieved_at <= _naive_utc(data.up_to)
+    )
+    updated = _mark_notified(db, current_user.id, condition)
+    return {"success": True, "updated": updated}
+
+
 @router.patch("/{achievement_id}/push-notified")
 async def mark_push_notified(
     achievement_id: str,
@@ -74,17 +130,36 @@ async def mark_push_notified(
     db: Session = Depends(get_db),
 ):
     """Отметить, что пуш-уведомление по достижению отправлено."""
-    ua = (
-        db.query(UserAchievement)
-        .filter(
+    updated = _mark_notified(db, current_user.id, UserAchievement.achievement_id == achievement_id)
+    if not updated:
+        # Нет такого достижения у пользователя (или оно уже отмечено)
+        exists_for_user = db.query(UserAchievement.id).filter(
             UserAchievement.user_id == current_user.id,
             UserAchievement.achievement_id == achievement_id,
+        ).first()
+        if not exists_for_user:
+            return {"success": False, "message": "Achievement not found for user"}
+    return {"success": True}
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # achieved_at хранится в UTC без часового пояса
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+def _mark_notified(db: Session, user_id, condition) -> int:
+    """UPDATE ... SET push_notified = true по условию (только ещё не отмеченные); commit и сброс кеша."""
+    updated = db.execute(
+        update(UserAchievement)
+        .where(
+            UserAchievement.user_id == user_id,
+            UserAchievement.push_notified == False,  # noqa: E712
+            condition,
         )
-        .first()
-    )
-    if not ua:
-        return {"success": False, "message": "Achievement not found for user"}
-    ua.push_notified = True
+        .values(push_notified=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount or 0
     db.commit()
-    db.refresh(ua)
-    return {"success": True}
+    if updated:
+        cache.invalidate(resource_tag("user_achievements", user_id))
+    return updated
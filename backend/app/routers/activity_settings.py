@@ -14,6 +14,7 @@ from app.schemas import (
     ActivitySettingsResponse
 )
 from app.auth import get_current_user
+from app.cache import cache, resource_tag
 import uuid
 
 router = APIRouter(prefix="/activity-settings", tags=["activity-settings"])
@@ -38,14 +39,32 @@ def get_or_create_activity_settings(user_id: uuid.UUID, db: Session) -> Activity
     return settings
 
 
+def get_activity_settings_snapshot(user_id: uuid.UUID, db: Session) -> dict:
+    """Настройки активности в виде словаря (копия закешированного) — для эндпоинтов чтения"""
+    def load() -> dict:
+        settings = get_or_create_activity_settings(user_id, db)
+        return {
+            "mode": settings.mode,
+            "fixed_pal": float(settings.fixed_pal) if settings.fixed_pal else None,
+            "daily_activity_log": dict(settings.daily_activity_log or {}),
+        }
+
+    snapshot = cache.get_or_set(
+        f"activity_settings:{user_id}",
+        load,
+        tags=[resource_tag("activity_settings", user_id)],
+    )
+    # Значения из кеша менять нельзя: вызывающий получает свою копию (и журнала по дням)
+    return {**snapshot, "daily_activity_log": dict(snapshot["daily_activity_log"])}
+
+
 @router.get("/mode")
 async def get_run_activity_mode(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Получить режим учёта активности"""
-    settings = get_or_create_activity_settings(current_user.id, db)
-    return settings.mode
+    return get_activity_settings_snapshot(current_user.id, db)["mode"]
 
 
 @router.put("/mode")
@@ -58,6 +77,7 @@ async def set_run_activity_mode(
     settings = get_or_create_activity_settings(current_user.id, db)
     settings.mode = mode_data.mode
     db.commit()
+    cache.invalidate(resource_tag("activity_settings", current_user.id))
     return {"message": "Режим активности сохранён"}
 
 
@@ -67,8 +87,7 @@ async def get_run_fixed_pal(
     db: Session = Depends(get_db)
 ):
     """Получить фиксированный коэффициент PAL"""
-    settings = get_or_create_activity_settings(current_user.id, db)
-    return float(settings.fixed_pal) if settings.fixed_pal else None
+    return get_activity_settings_snapshot(current_user.id, db)["fixed_pal"]
 
 
 @router.put("/fixed-pal")
@@ -81,6 +100,7 @@ async def set_run_fixed_pal(
     settings = get_or_create_activity_settings(current_user.id, db)
     settings.fixed_pal = pal_data.pal
     db.commit()
+    cache.invalidate(resource_tag("activity_settings", current_user.id))
     return {"message": "Фиксированный PAL сохранён"}
 
 
@@ -90,8 +110,7 @@ async def get_run_daily_activity_log(
     db: Session = Depends(get_db)
 ):
     """Получить лог ежедневной активности"""
-    settings = get_or_create_activity_settings(current_user.id, db)
-    return settings.daily_activity_log or {}
+    return get_activity_settings_snapshot(current_user.id, db)["daily_activity_log"]
 
 
 @router.post("/daily-log")
@@ -109,6 +128,7 @@ async def set_run_daily_activity_for_date(
     date_str = log_data.date.isoformat()
     settings.daily_activity_log[date_str] = log_data.pal
     db.commit()
+    cache.invalidate(resource_tag("activity_settings", current_user.id))
     return {"message": "Ежедневная активность сохранена"}
 
 
@@ -119,14 +139,11 @@ async def get_run_daily_pal_for_date(
     db: Session = Depends(get_db)
 ):
     """Получить коэффициент PAL за дату (или вчерашний, если за день нет)"""
-    settings = get_or_create_activity_settings(current_user.id, db)
-    
-    if settings.daily_activity_log is None:
-        return None
+    daily_activity_log = get_activity_settings_snapshot(current_user.id, db)["daily_activity_log"]
     
     # Пытаемся получить за указанную дату
-    if date in settings.daily_activity_log:
-        return float(settings.daily_activity_log[date])
+    if date in daily_activity_log:
+        return float(daily_activity_log[date])
     
     # Пытаемся получить за вчера
     try:
@@ -134,8 +151,8 @@ async def get_run_daily_pal_for_date(
         yesterday = date_obj - timedelta(days=1)
         yesterday_str = yesterday.isoformat()
         
-        if yesterday_str in settings.daily_activity_log:
-            return float(settings.daily_activity_log[yesterday_str])
+        if yesterday_str in daily_activity_log:
+            return float(daily_activity_log[yesterday_str])
     except ValueError:
         pass
     
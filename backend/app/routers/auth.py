@@ -1,38 +1,30 @@
 """
 Роутер для авторизации
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
-from app.schemas import LoginRequest, RegisterRequest, LoginResponse, ReferralCodeResponse, ReferralsListResponse, UserMeResponse
+from app.schemas import (
+    DownlineResponse,
+    LoginRequest,
+    LoginResponse,
+    ReferralCodeResponse,
+    ReferralsListResponse,
+    ReferralStatsResponse,
+    RegisterRequest,
+    UserMeResponse,
+)
 from app.auth import verify_password, get_password_hash, create_access_token, get_current_user
+from app.account_service import delete_user_account
+from app.code_service import next_referral_code
+from app.config import settings
+from app.referrals import get_direct_referrals, get_downline_page, get_referral_stats
 import uuid
-import secrets
-import string
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-def generate_referral_code(db: Session, length: int = 8) -> str:
-    """
-    Генерирует уникальный реферальный код.
-    Использует буквы и цифры, исключая похожие символы (0, O, 1, I, l).
-    """
-    alphabet = string.ascii_uppercase.replace('O', '').replace('I', '') + string.digits.replace('0', '').replace('1', '')
-    
-    max_attempts = 100
-    for _ in range(max_attempts):
-        code = ''.join(secrets.choice(alphabet) for _ in range(length))
-        # Проверяем уникальность
-        existing = db.query(User).filter(User.referral_code == code).first()
-        if not existing:
-            return code
-    
-    # Если не удалось сгенерировать за 100 попыток, используем UUID
-    return str(uuid.uuid4())[:length].upper().replace('-', '')
-
-
 @router.post("/register", response_model=LoginResponse)
 async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     """Регистрация нового пользователя"""
@@ -56,8 +48,8 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
             )
         referred_by_id = referrer.id
     
-    # Генерируем уникальный реферальный код для нового пользователя
-    referral_code = generate_referral_code(db)
+    # Уникальный реферальный код — из счётчика, без проверочных запросов
+    referral_code = next_referral_code()
     
     # Создаём нового пользователя
     user = User(
@@ -106,6 +98,18 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return UserMeResponse(created_at=current_user.created_at)
 
 
+@router.delete("/me")
+async def delete_my_account(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Удалить аккаунт текущего пользователя со всеми данными"""
+    user_id = current_user.id
+    db.expunge(current_user)
+    counts = delete_user_account(user_id, db)
+    return {"message": "Аккаунт удалён", "deleted": counts}
+
+
 @router.get("/my-referral-code", response_model=ReferralCodeResponse)
 async def get_my_referral_code(current_user: User = Depends(get_current_user)):
     """Получить свой реферальный код"""
@@ -119,20 +123,32 @@ async def get_my_referral_code(current_user: User = Depends(get_current_user)):
 
 @router.get("/my-referrals", response_model=ReferralsListResponse)
 async def get_my_referrals(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить список пользователей, которых пригласил текущий пользователь"""
-    referrals = db.query(User).filter(User.referred_by_id == current_user.id).order_by(User.created_at.desc()).all()
-    
-    return ReferralsListResponse(
-        referrals=[
-            {
-                "id": ref.id,
-                "email": ref.email,
-                "created_at": ref.created_at
-            }
-            for ref in referrals
-        ],
-        total_count=len(referrals)
-    )
+    """Получить список пользователей, которых пригласил текущий пользователь (страница, общее число — COUNT)"""
+    return get_direct_referrals(db, current_user.id, limit, offset)
+
+
+@router.get("/my-referrals/stats", response_model=ReferralStatsResponse)
+async def get_my_referral_stats(
+    depth: int = Query(settings.REFERRAL_MAX_DEPTH, ge=1, le=settings.REFERRAL_MAX_DEPTH),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Размер реферальной сети по уровням и активные рефералы"""
+    return get_referral_stats(db, current_user.id, depth)
+
+
+@router.get("/my-referrals/downline", response_model=DownlineResponse)
+async def get_my_downline(
+    depth: int = Query(settings.REFERRAL_MAX_DEPTH, ge=1, le=settings.REFERRAL_MAX_DEPTH),
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Нижняя линия: рефералы всех уровней до depth, по уровню и дате регистрации"""
+    return get_downline_page(db, current_user.id, depth, limit, offset)
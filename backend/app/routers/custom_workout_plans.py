@@ -1,29 +1,57 @@
 """
 Роутер для пользовательских планов тренировок
 """
-import random
-import string
-
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.models import User, CustomWorkoutPlan, UserPlanEnrollment
-from app.schemas import CustomWorkoutPlanCreate, CustomWorkoutPlanUpdate, CustomWorkoutPlanResponse, UserPlanEnrollmentResponse
+from app.models import User, CustomWorkoutPlan, PlanScheduleSlot, UserPlanEnrollment
+from app.schemas import CustomWorkoutPlanCreate, CustomWorkoutPlanUpdate, CustomWorkoutPlanResponse, UserPlanEnrollmentResponse, PlanCatalogResponse, TrendingPlansResponse, EnrolledPlanResponse, AgendaSlotResponse
 from app.auth import get_current_user
+from app.cache import cache
+from app.code_service import next_plan_code
+from app.config import settings
+from app.eager import eager
+from app.plan_catalog import (
+    CATALOG_SORTS,
+    PUBLIC_PLANS_TAG,
+    TRENDING_WINDOWS,
+    adjust_enrollment_count,
+    get_catalog_page,
+    get_private_plan_by_code,
+    get_trending,
+    plan_code_tag,
+)
+from app.plan_schedule import get_weekly_agenda, replace_plan_slots
+from app.rate_limit import TokenBucketLimiter, rate_limit
+from app.responses import FastJSONResponse, rows_to_dicts
 from app.utils_id import parse_id
 
 router = APIRouter(prefix="/custom-workout-plans", tags=["custom-workout-plans"])
 
-_CHARS = string.ascii_uppercase + string.digits
-
-
-def _generate_plan_code(db: Session, length: int = 8) -> str:
-    for _ in range(50):
-        code = "".join(random.choices(_CHARS, k=length))
-        if not db.query(CustomWorkoutPlan).filter(CustomWorkoutPlan.code == code).first():
-            return code
-    return "".join(random.choices(_CHARS, k=length))  # fallback
+# /by-code открыт без авторизации: лимит по IP, чтобы перебор кодов не нагружал БД
+by_code_limiter = TokenBucketLimiter(
+    settings.PLAN_CODE_RATE_LIMIT_PER_MINUTE, settings.PLAN_CODE_RATE_LIMIT_BURST
+)
+
+# Колонки для быстрого пути (FAST_JSON_RESPONSES): ключи — как у CustomWorkoutPlanResponse
+_PLAN_COLUMNS = (
+    ("id", CustomWorkoutPlan.id),
+    ("title", CustomWorkoutPlan.title),
+    ("description", CustomWorkoutPlan.description),
+    ("schedule", CustomWorkoutPlan.schedule),
+    ("is_public", CustomWorkoutPlan.is_public),
+    ("code", CustomWorkoutPlan.code),
+    ("enrollment_count", CustomWorkoutPlan.enrollment_count),
+    ("created_at", CustomWorkoutPlan.created_at),
+)
+_PLAN_CONVERTERS = {
+    "schedule": lambda v: v or [],
+    "is_public": bool,
+    "code": lambda v: v if isinstance(v, str) else "",
+}
 
 
 @router.get("", response_model=List[CustomWorkoutPlanResponse])
@@ -34,19 +62,59 @@ async def get_plans(
     """Получить все планы тренировок пользователя"""
     plans = db.query(CustomWorkoutPlan).filter(
         CustomWorkoutPlan.user_id == current_user.id
-    ).order_by(CustomWorkoutPlan.created_at.desc()).all()
+    ).options(*eager()).order_by(CustomWorkoutPlan.created_at.desc()).all()
     return plans
 
 
-@router.get("/public", response_model=List[CustomWorkoutPlanResponse])
+@router.get("/catalog", response_model=PlanCatalogResponse)
+async def get_plan_catalog(
+    sort: str = Query("newest", pattern=f"^({'|'.join(CATALOG_SORTS)})$", description="newest, popular или title"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Каталог публичных планов: краткие карточки (без расписания), постранично"""
+    page = get_catalog_page(db, sort, limit, cursor)
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(page)
+    return page
+
+
+@router.get("/trending", response_model=TrendingPlansResponse)
+async def get_trending_plans(
+    window: str = Query("7d", pattern=f"^({'|'.join(TRENDING_WINDOWS)})$", description="7d или 30d"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Публичные планы в тренде: больше всего записей за 7 или 30 дней (рейтинг пересчитывается периодически)"""
+    trending = get_trending(db, window, limit)
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(trending)
+    return trending
+
+
+@router.get("/public", response_model=List[CustomWorkoutPlanResponse], deprecated=True)
 async def get_public_plans(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить все публичные планы тренировок"""
-    plans = db.query(CustomWorkoutPlan).filter(
-        CustomWorkoutPlan.is_public == True
-    ).order_by(CustomWorkoutPlan.created_at.desc()).all()
+    """Получить все публичные планы тренировок (целиком, с расписанием; для списка — /catalog)"""
+    def load() -> list:
+        if settings.FAST_JSON_RESPONSES:
+            rows = db.query(*(c for _, c in _PLAN_COLUMNS)).filter(
+                CustomWorkoutPlan.is_public == True
+            ).order_by(CustomWorkoutPlan.created_at.desc()).all()
+            return rows_to_dicts(rows, [k for k, _ in _PLAN_COLUMNS], _PLAN_CONVERTERS)
+        plans = db.query(CustomWorkoutPlan).filter(
+            CustomWorkoutPlan.is_public == True
+        ).order_by(CustomWorkoutPlan.created_at.desc()).all()
+        return [CustomWorkoutPlanResponse.model_validate(p).model_dump() for p in plans]
+
+    plans = cache.get_or_set("custom_workout_plans:public", load, tags=[PUBLIC_PLANS_TAG])
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(plans)
     return plans
 
 
@@ -67,39 +135,72 @@ async def get_public_plan(
     return plan
 
 
-@router.get("/by-code/{code}", response_model=CustomWorkoutPlanResponse)
+@router.get(
+    "/by-code/{code}",
+    response_model=CustomWorkoutPlanResponse,
+    dependencies=[Depends(rate_limit(by_code_limiter))],
+)
 async def get_plan_by_code(
     code: str,
     db: Session = Depends(get_db)
 ):
-    """Получить приватный план по коду (без авторизации). Искать можно только приватные планы."""
-    plan = db.query(CustomWorkoutPlan).filter(
-        CustomWorkoutPlan.code == code.upper().strip(),
-        CustomWorkoutPlan.is_public == False
-    ).first()
-    if not plan:
+    """
+    Получить приватный план по коду (без авторизации). Искать можно только приватные планы.
+    Ответы (и «не найдено») кешируются по коду; частота запросов ограничена по IP.
+    """
+    plan = get_private_plan_by_code(db, code)
+    if plan is None:
         raise HTTPException(status_code=404, detail="План не найден или он публичный")
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(plan)
     return plan
 
 
-@router.get("/enrolled", response_model=List[CustomWorkoutPlanResponse])
+@router.get("/enrolled", response_model=List[EnrolledPlanResponse], response_model_exclude_unset=True)
 async def get_enrolled_plans(
+    include_enrollment: bool = Query(False, description="Добавить enrolled_at — когда пользователь записался"),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить планы, на которые записан пользователь"""
-    enrollments = db.query(UserPlanEnrollment).filter(
-        UserPlanEnrollment.user_id == current_user.id
-    ).all()
-    plan_ids = [e.plan_id for e in enrollments]
-    if not plan_ids:
-        return []
-    plans = db.query(CustomWorkoutPlan).filter(
-        CustomWorkoutPlan.id.in_(plan_ids)
-    ).order_by(CustomWorkoutPlan.created_at.desc()).all()
+    """Получить планы, на которые записан пользователь (один запрос с JOIN; limit/offset — постранично)"""
+    query = (
+        db.query(CustomWorkoutPlan, UserPlanEnrollment.enrolled_at)
+        .join(UserPlanEnrollment, UserPlanEnrollment.plan_id == CustomWorkoutPlan.id)
+        .filter(UserPlanEnrollment.user_id == current_user.id)
+        .options(*eager())
+        .order_by(CustomWorkoutPlan.created_at.desc(), CustomWorkoutPlan.id.desc())
+        .offset(offset)
+    )
+    if limit:
+        query = query.limit(limit)
+
+    plans = []
+    for plan, enrolled_at in query.all():
+        item = CustomWorkoutPlanResponse.model_validate(plan).model_dump()
+        if include_enrollment:
+            item["enrolled_at"] = enrolled_at
+        plans.append(item)
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(plans)
     return plans
 
 
+@router.get("/agenda", response_model=List[AgendaSlotResponse])
+async def get_agenda(
+    day_of_week: Optional[int] = Query(None, ge=0, le=6, description="Только этот день недели (0–6)"),
+    include_own: bool = Query(False, description="Добавить слоты собственных планов"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Недельная повестка: слоты всех планов, на которые записан пользователь, по дню и времени (один запрос)"""
+    agenda = get_weekly_agenda(db, current_user.id, day_of_week, include_own)
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(agenda)
+    return agenda
+
+
 @router.get("/{plan_id}", response_model=CustomWorkoutPlanResponse)
 async def get_plan(
     plan_id: str,
@@ -126,18 +227,23 @@ async def create_plan(
     db: Session = Depends(get_db)
 ):
     """Создать план тренировок"""
-    code = _generate_plan_code(db)
+    code = next_plan_code()
     plan = CustomWorkoutPlan(
         user_id=current_user.id,
         title=data.title,
         description=data.description,
-        schedule=data.schedule or [],
+        schedule=data.schedule_json(),
         is_public=data.is_public,
         code=code
     )
     db.add(plan)
+    db.flush()
+    replace_plan_slots(db, plan.id, plan.schedule)
     db.commit()
     db.refresh(plan)
+    cache.invalidate(plan_code_tag(plan.code))
+    if plan.is_public:
+        cache.invalidate(PUBLIC_PLANS_TAG)
     return plan
 
 
@@ -158,13 +264,18 @@ async def update_plan(
     if not plan:
         raise HTTPException(status_code=404, detail="План не найден")
 
+    was_public = plan.is_public
     plan.title = data.title
     plan.description = data.description
-    plan.schedule = data.schedule or []
+    plan.schedule = data.schedule_json()
     plan.is_public = data.is_public
+    replace_plan_slots(db, plan.id, plan.schedule)
 
     db.commit()
     db.refresh(plan)
+    cache.invalidate(plan_code_tag(plan.code))
+    if was_public or plan.is_public:
+        cache.invalidate(PUBLIC_PLANS_TAG)
     return plan
 
 
@@ -184,8 +295,19 @@ async def delete_plan(
     if not plan:
         raise HTTPException(status_code=404, detail="План не найден")
 
+    was_public, code = plan.is_public, plan.code
+    # Записи на план и слоты расписания удаляем одним запросом каждые, не загружая их в сессию
+    for child in (UserPlanEnrollment, PlanScheduleSlot):
+        db.execute(
+            delete(child)
+            .where(child.plan_id == plan.id)
+            .execution_options(synchronize_session=False)
+        )
     db.delete(plan)
     db.commit()
+    cache.invalidate(plan_code_tag(code))
+    if was_public:
+        cache.invalidate(PUBLIC_PLANS_TAG)
     return {"message": "План удалён"}
 
 
@@ -218,7 +340,19 @@ async def enroll_plan(
         plan_id=plan_uuid
     )
     db.add(enrollment)
-    db.commit()
+    try:
+        db.flush()
+        adjust_enrollment_count(db, plan_uuid, 1)
+        db.commit()
+    except IntegrityError:
+        # Параллельная запись того же пользователя: счётчик откатился вместе с ней
+        db.rollback()
+        return db.query(UserPlanEnrollment).filter(
+            UserPlanEnrollment.user_id == current_user.id,
+            UserPlanEnrollment.plan_id == plan_uuid
+        ).one()
+    # enrollment_count виден в каталоге и /public — сбрасываем их после коммита
+    cache.invalidate(PUBLIC_PLANS_TAG)
     db.refresh(enrollment)
     return enrollment
 
@@ -239,5 +373,7 @@ async def unenroll_plan(
         raise HTTPException(status_code=404, detail="Вы не записаны на этот план")
 
     db.delete(enrollment)
+    adjust_enrollment_count(db, plan_uuid, -1)
     db.commit()
+    cache.invalidate(PUBLIC_PLANS_TAG)
     return {"message": "Вы отписались от плана"}
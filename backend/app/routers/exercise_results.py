@@ -9,10 +9,27 @@ from app.database import get_db
 from app.models import User, ExerciseResult
 from app.schemas import ExerciseResultCreate, ExerciseResultResponse, ExerciseStatsItem
 from app.auth import get_current_user
+from app.config import settings
+from app.leaderboards import record_activity
+from app.responses import FastJSONResponse, as_float, rows_to_dicts
 import uuid
 
 router = APIRouter(prefix="/exercise-results", tags=["exercise-results"])
 
+# Колонки для быстрого пути (FAST_JSON_RESPONSES): ключи — как у ExerciseResultResponse по alias
+_RESULT_COLUMNS = (
+    ("exerciseId", ExerciseResult.exercise_id),
+    ("exerciseName", ExerciseResult.exercise_name),
+    ("date", ExerciseResult.date),
+    ("workoutId", ExerciseResult.workout_id),
+    ("sessionId", ExerciseResult.session_id),
+    ("weight", ExerciseResult.weight),
+    ("reps", ExerciseResult.reps),
+    ("hits", ExerciseResult.hits),
+    ("misses", ExerciseResult.misses),
+    ("id", ExerciseResult.id),
+)
+
 
 @router.post("", response_model=ExerciseResultResponse)
 async def save_exercise_result(
@@ -27,6 +44,8 @@ async def save_exercise_result(
         **result_data.model_dump(by_alias=False)
     )
     db.add(result)
+    if result.reps:
+        record_activity(db, current_user.id, "reps", result.date.date(), result.reps)
     db.commit()
     db.refresh(result)
     return result
@@ -39,12 +58,22 @@ async def get_exercise_results(
     db: Session = Depends(get_db)
 ):
     """Получить результаты упражнений"""
-    query = db.query(ExerciseResult).filter(ExerciseResult.user_id == current_user.id)
+    if settings.FAST_JSON_RESPONSES:
+        query = db.query(*(c for _, c in _RESULT_COLUMNS))
+    else:
+        query = db.query(ExerciseResult)
+    query = query.filter(ExerciseResult.user_id == current_user.id)
     
     if exercise_id:
         query = query.filter(ExerciseResult.exercise_id == exercise_id)
     
     results = query.order_by(ExerciseResult.date.desc()).all()
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(rows_to_dicts(
+            results,
+            [k for k, _ in _RESULT_COLUMNS],
+            {"weight": as_float},
+        ))
     return results
 
 
@@ -0,0 +1,126 @@
+"""
+Роутер для экспорта данных пользователя (CSV / NDJSON)
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.auth import get_current_user_id
+from app.config import settings
+from app.database import SessionLocal
+from app.models import FoodLogEntry, ExerciseResult, StepsEntry, WorkoutSession, Workout, Dish
+from app.responses import dumps
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Таблицы, принадлежащие пользователю: имя в выгрузке → модель
+EXPORT_TABLES = {
+    "food_log": FoodLogEntry,
+    "exercise_results": ExerciseResult,
+    "steps": StepsEntry,
+    "workout_sessions": WorkoutSession,
+    "workouts": Workout,
+    "dishes": Dish,
+}
+
+_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _export_columns(model) -> list:
+    return [c for c in model.__table__.columns if c.name != "user_id"]
+
+
+def _iter_row_chunks(model, user_id) -> Iterator[List[Any]]:
+    """
+    Строки таблицы пользователя порциями по EXPORT_CHUNK_SIZE.
+    Каждая порция — отдельная короткая транзакция (keyset по id, LIMIT), поэтому медленный клиент не держит открытую транзакцию, а память не растёт с историей.
+    """
+    columns = _export_columns(model)
+    id_index = [c.name for c in columns].index("id")
+    last_id = None
+    while True:
+        stmt = select(*columns).where(model.user_id == user_id)
+        if last_id is not None:
+            stmt = stmt.where(model.id > last_id)
+        stmt = stmt.order_by(model.id).limit(settings.EXPORT_CHUNK_SIZE)
+        with SessionLocal() as db:
+            rows = [tuple(row) for row in db.execute(stmt)]
+        if not rows:
+            return
+        yield rows
+        if len(rows) < settings.EXPORT_CHUNK_SIZE:
+            return
+        last_id = rows[-1][id_index]
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _stream_csv(user_id, tables: List[str]) -> Iterator[bytes]:
+    """CSV: блок на таблицу — строка заголовка (table + колонки), затем строки; блоки разделены пустой строкой."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for i, name in enumerate(tables):
+        model = EXPORT_TABLES[name]
+        if i:
+            writer.writerow([])
+        writer.writerow(["table"] + [c.name for c in _export_columns(model)])
+        for rows in _iter_row_chunks(model, user_id):
+            writer.writerows([name] + [_csv_value(v) for v in row] for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_ndjson(user_id, tables: List[str]) -> Iterator[bytes]:
+    """NDJSON: одна строка на запись, поле table указывает таблицу."""
+    for name in tables:
+        model = EXPORT_TABLES[name]
+        keys = ["table"] + [c.name for c in _export_columns(model)]
+        for rows in _iter_row_chunks(model, user_id):
+            yield b"".join(dumps(dict(zip(keys, (name,) + row))) + b"\n" for row in rows)
+
+
+@router.get("")
+async def export_data(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv или ndjson"),
+    tables: Optional[str] = Query(None, description="Список таблиц через запятую; по умолчанию все"),
+    user_id: UUID = Depends(get_current_user_id),
+):
+    """Выгрузка всей истории пользователя потоком (без загрузки таблиц в память)"""
+    if tables:
+        selected = [t.strip() for t in tables.split(",") if t.strip()]
+        unknown = [t for t in selected if t not in EXPORT_TABLES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные таблицы: {', '.join(unknown)}")
+    else:
+        selected = list(EXPORT_TABLES)
+
+    stream = _stream_csv(user_id, selected) if format == "csv" else _stream_ndjson(user_id, selected)
+    return StreamingResponse(
+        stream,
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="omniactive-export.{format}"'},
+    )
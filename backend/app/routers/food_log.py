@@ -9,11 +9,32 @@ from app.database import get_db
 from app.models import User, FoodLogEntry
 from app.schemas import FoodLogEntryCreate, FoodLogEntryResponse
 from app.auth import get_current_user
+from app.config import settings
+from app.responses import FastJSONResponse, as_float, date_as_datetime, rows_to_dicts
 from app.utils_id import parse_id
 import uuid
 
 router = APIRouter(prefix="/food-log", tags=["food-log"])
 
+# Колонки для быстрого пути (FAST_JSON_RESPONSES): ключи — как у FoodLogEntryResponse по alias
+_ENTRY_COLUMNS = (
+    ("dishId", FoodLogEntry.dish_id),
+    ("dishName", FoodLogEntry.dish_name),
+    ("calories", FoodLogEntry.calories),
+    ("protein", FoodLogEntry.protein),
+    ("fats", FoodLogEntry.fats),
+    ("carbs", FoodLogEntry.carbs),
+    ("date", FoodLogEntry.date),
+    ("id", FoodLogEntry.id),
+)
+_ENTRY_CONVERTERS = {
+    "calories": as_float,
+    "protein": as_float,
+    "fats": as_float,
+    "carbs": as_float,
+    "date": date_as_datetime,
+}
+
 
 @router.post("", response_model=FoodLogEntryResponse)
 async def add_food_log_entry(
@@ -41,7 +62,11 @@ async def get_food_log(
     db: Session = Depends(get_db)
 ):
     """Получить записи дневника питания"""
-    query = db.query(FoodLogEntry).filter(FoodLogEntry.user_id == current_user.id)
+    if settings.FAST_JSON_RESPONSES:
+        query = db.query(*(c for _, c in _ENTRY_COLUMNS))
+    else:
+        query = db.query(FoodLogEntry)
+    query = query.filter(FoodLogEntry.user_id == current_user.id)
     
     if date:
         date_obj = datetime.fromisoformat(date.replace('Z', '+00:00')).date()
@@ -53,6 +78,8 @@ async def get_food_log(
         query = query.limit(limit)
     
     entries = query.all()
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(rows_to_dicts(entries, [k for k, _ in _ENTRY_COLUMNS], _ENTRY_CONVERTERS))
     return entries
 
 
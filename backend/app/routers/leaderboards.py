@@ -0,0 +1,52 @@
+"""
+Роутер для досок лидеров
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Path, Query
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app.config import settings
+from app.database import get_db
+from app.leaderboards import METRICS, PERIODS, get_leaderboard, get_network_leaderboard
+from app.models import User
+from app.responses import FastJSONResponse
+from app.schemas import LeaderboardResponse
+
+router = APIRouter(prefix="/leaderboards", tags=["leaderboards"])
+
+_METRIC_PATTERN = f"^({'|'.join(METRICS)})$"
+_PERIOD_PATTERN = f"^({'|'.join(PERIODS)})$"
+
+
+def _respond(board: dict):
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(board)
+    return board
+
+
+@router.get("/{metric}", response_model=LeaderboardResponse)
+async def get_board(
+    metric: str = Path(..., pattern=_METRIC_PATTERN, description="reps, steps или workouts"),
+    period: str = Query("week", pattern=_PERIOD_PATTERN, description="day, week или all"),
+    period_key: Optional[str] = Query(None, description="2026-10-18, 2026-W42 или all; по умолчанию — текущий период (UTC)"),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Топ доски и место пользователя (места — из периодически пересчитываемого снимка)"""
+    return _respond(get_leaderboard(db, current_user.id, metric, period, period_key, limit))
+
+
+@router.get("/{metric}/network", response_model=LeaderboardResponse)
+async def get_network_board(
+    metric: str = Path(..., pattern=_METRIC_PATTERN, description="reps, steps или workouts"),
+    period: str = Query("week", pattern=_PERIOD_PATTERN, description="day, week или all"),
+    period_key: Optional[str] = Query(None, description="2026-10-18, 2026-W42 или all; по умолчанию — текущий период (UTC)"),
+    limit: int = Query(100, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Доска реферальной сети: пригласивший, сам пользователь и приглашённые им"""
+    return _respond(get_network_leaderboard(db, current_user, metric, period, period_key, limit))
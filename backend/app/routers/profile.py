@@ -7,6 +7,7 @@ from app.database import get_db
 from app.models import User, UserProfile
 from app.schemas import UserProfileBase, UserProfileResponse
 from app.auth import get_current_user
+from app.cache import cache, resource_tag
 import uuid
 
 router = APIRouter(prefix="/profile", tags=["profile"])
@@ -18,22 +19,29 @@ async def get_user_profile(
     db: Session = Depends(get_db)
 ):
     """Получить профиль пользователя"""
-    profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
-    
-    if not profile:
-        # Создаём пустой профиль, если его нет
-        profile = UserProfile(
-            id=uuid.uuid4(),
-            user_id=current_user.id,
-            height_cm=None,
-            weight_kg=None,
-            age_years=None
-        )
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-    
-    return profile
+    def load() -> dict:
+        profile = db.query(UserProfile).filter(UserProfile.user_id == current_user.id).first()
+
+        if not profile:
+            # Создаём пустой профиль, если его нет
+            profile = UserProfile(
+                id=uuid.uuid4(),
+                user_id=current_user.id,
+                height_cm=None,
+                weight_kg=None,
+                age_years=None
+            )
+            db.add(profile)
+            db.commit()
+            db.refresh(profile)
+
+        return UserProfileResponse.model_validate(profile).model_dump()
+
+    return cache.get_or_set(
+        f"profile:{current_user.id}",
+        load,
+        tags=[resource_tag("user_profiles", current_user.id)],
+    )
 
 
 @router.put("", response_model=UserProfileResponse, response_model_by_alias=True)
@@ -61,4 +69,5 @@ async def save_user_profile(
     
     db.commit()
     db.refresh(profile)
+    cache.invalidate(resource_tag("user_profiles", current_user.id))
     return profile
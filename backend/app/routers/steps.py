@@ -9,6 +9,7 @@ from app.database import get_db
 from app.models import User, StepsEntry
 from app.schemas import StepsEntryCreate, StepsEntryResponse
 from app.auth import get_current_user
+from app.leaderboards import record_activity
 import uuid
 
 router = APIRouter(prefix="/steps", tags=["steps"])
@@ -28,7 +29,8 @@ async def save_steps_entry(
     ).first()
     
     if existing:
-        # Обновляем существующую запись
+        # Обновляем существующую запись; на доске лидеров — разница с прежним значением
+        record_activity(db, current_user.id, "steps", existing.date, entry_data.steps - existing.steps)
         existing.steps = entry_data.steps
         db.commit()
         db.refresh(existing)
@@ -41,6 +43,7 @@ async def save_steps_entry(
             **entry_data.dict()
         )
         db.add(entry)
+        record_activity(db, current_user.id, "steps", entry.date, entry.steps)
         db.commit()
         db.refresh(entry)
         return entry
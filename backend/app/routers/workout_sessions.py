@@ -8,6 +8,7 @@ from app.database import get_db
 from app.models import User, WorkoutSession
 from app.schemas import WorkoutSessionCreate, WorkoutSessionResponse
 from app.auth import get_current_user
+from app.leaderboards import record_activity
 import uuid
 
 router = APIRouter(prefix="/workout-sessions", tags=["workout-sessions"])
@@ -26,6 +27,7 @@ async def save_workout_session(
         **session_data.model_dump(by_alias=False)
     )
     db.add(session)
+    record_activity(db, current_user.id, "workouts", session.date, 1)
     db.commit()
     db.refresh(session)
     return session
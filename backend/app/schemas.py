@@ -2,7 +2,7 @@
 Pydantic схемы для валидации данных
 """
 import uuid
-from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator, model_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 from uuid import UUID
@@ -43,17 +43,50 @@ class ReferralUser(BaseModel):
     id: UUID
     email: str
     created_at: datetime
+    last_activity_date: Optional[date] = None  # последняя тренировка или результат упражнения
     
     class Config:
         from_attributes = True
 
 
 class ReferralsListResponse(BaseModel):
-    """Список рефералов пользователя"""
+    """Список рефералов пользователя (страница) и их общее число"""
     referrals: List[ReferralUser]
     total_count: int
 
 
+class ReferralLevelStats(BaseModel):
+    level: int  # 1 — приглашённые пользователем, 2 — приглашённые ими и т.д.
+    count: int
+    active_count: int
+
+
+class ReferralStatsResponse(BaseModel):
+    """Реферальная сеть: приглашённые и нижняя линия до depth уровней"""
+    depth: int
+    active_days: int  # активный — с тренировкой или результатом за столько дней
+    direct_count: int
+    active_direct_count: int
+    downline_count: int
+    active_downline_count: int
+    levels: List[ReferralLevelStats]
+
+
+class DownlineMember(BaseModel):
+    level: int
+    id: UUID
+    name: str  # начало адреса без домена
+    referred_by_id: UUID
+    created_at: datetime
+    last_activity_date: Optional[date] = None
+
+
+class DownlineResponse(BaseModel):
+    depth: int
+    items: List[DownlineMember]
+    total_count: int
+
+
 class UserMeResponse(BaseModel):
     """Информация о текущем пользователе (дата регистрации)"""
     created_at: datetime
@@ -300,13 +333,26 @@ class PlanSlotBase(BaseModel):
     workout_id: str = Field(..., alias="workoutId")
     workout_name: str = Field(..., alias="workoutName")
 
+    @field_validator("time")
+    @classmethod
+    def normalize_time(cls, v: str) -> str:
+        """«9:05» → «09:05»; часы 0–23, минуты 0–59."""
+        hours, minutes = (int(part) for part in v.split(":"))
+        if hours > 23 or minutes > 59:
+            raise ValueError("time must be HH:MM within 00:00–23:59")
+        return f"{hours:02d}:{minutes:02d}"
+
 
 class CustomWorkoutPlanBase(BaseModel):
     title: str
     description: Optional[str] = None
-    schedule: List[Dict[str, Any]] = Field(default_factory=list)
+    schedule: List[PlanSlotBase] = Field(default_factory=list)
     is_public: bool = False
 
+    def schedule_json(self) -> List[Dict[str, Any]]:
+        """Расписание для колонки schedule — в camelCase, как его отдаёт API."""
+        return [slot.model_dump(by_alias=True) for slot in self.schedule]
+
 
 class CustomWorkoutPlanCreate(CustomWorkoutPlanBase):
     pass
@@ -323,6 +369,7 @@ class CustomWorkoutPlanResponse(BaseModel):
     schedule: List[Dict[str, Any]] = []
     is_public: bool = False
     code: str = ""
+    enrollment_count: int = 0
     created_at: datetime
 
     @field_validator("code", mode="before")
@@ -339,6 +386,41 @@ class CustomWorkoutPlanResponse(BaseModel):
         from_attributes = True
 
 
+class EnrolledPlanResponse(CustomWorkoutPlanResponse):
+    enrolled_at: Optional[datetime] = None  # только с include_enrollment=true
+
+
+class PlanSummaryResponse(BaseModel):
+    """Карточка плана в каталоге (без расписания)"""
+    id: UUID
+    title: str
+    description: Optional[str] = None
+    slots_count: int = 0
+    enrollment_count: int = 0
+    created_at: datetime
+
+
+class PlanCatalogResponse(BaseModel):
+    items: List[PlanSummaryResponse]
+    next_cursor: Optional[str] = None
+
+
+class TrendingPlanResponse(PlanSummaryResponse):
+    recent_enrollments: int = 0  # записей за окно рейтинга
+
+
+class TrendingPlansResponse(BaseModel):
+    window: str
+    refreshed_at: Optional[datetime] = None
+    items: List[TrendingPlanResponse]
+
+
+class AgendaSlotResponse(PlanSlotBase):
+    """Слот недельной повестки пользователя: слот плана и план, из которого он пришёл."""
+    plan_id: UUID = Field(..., alias="planId")
+    plan_title: str = Field(..., alias="planTitle")
+
+
 class UserPlanEnrollmentResponse(BaseModel):
     id: UUID
     user_id: UUID
@@ -347,3 +429,42 @@ class UserPlanEnrollmentResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ==================== ДОСТИЖЕНИЯ ====================
+
+class PushNotifiedAck(BaseModel):
+    """Подтверждение показанных пушей: список achievement_ids или все полученные до up_to."""
+    achievement_ids: Optional[List[str]] = Field(None, max_length=500)
+    up_to: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def one_selector(self) -> "PushNotifiedAck":
+        if (self.achievement_ids is None) == (self.up_to is None):
+            raise ValueError("Укажите achievement_ids или up_to")
+        return self
+
+
+# ==================== ДОСКИ ЛИДЕРОВ ====================
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: UUID
+    name: str
+    score: int
+
+
+class LeaderboardMe(BaseModel):
+    rank: Optional[int] = None  # None — ещё нет в снимке мест
+    score: int = 0
+
+
+class LeaderboardResponse(BaseModel):
+    metric: str
+    period: str
+    period_key: Optional[str] = None
+    scope: str  # global или network
+    entries: int = 0  # участников доски
+    refreshed_at: Optional[datetime] = None  # время снимка мест (у network — None, места живые)
+    top: List[LeaderboardEntry]
+    me: LeaderboardMe
@@ -0,0 +1,91 @@
+"""
+Прогрев контейнера функции по событию-пингу (таймер / EventBridge / {"warmup": true}).
+
+Событие не проходит через Mangum и маршрутизацию FastAPI: handler.py сразу вызывает warm_up(),
+который импортирует роутеры и параллельно запускает ресурсы приложения (app.lifespan):
+соединение пула, справочник достижений, bcrypt/jose. Повторный пинг тёплого контейнера
+стоит одного SELECT 1 (заодно не даёт соединению в пуле устареть).
+"""
+import logging
+import time
+from typing import Callable, Dict
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+WARMUP_EVENT_SOURCES = {"aws.events", "serverless-plugin-warmup"}
+
+
+def is_warmup_event(event) -> bool:
+    """Пинг прогрева: {"warmup": true}, расписание EventBridge или таймер Yandex Cloud."""
+    if not isinstance(event, dict):
+        return False
+    if event.get("warmup") or event.get("source") in WARMUP_EVENT_SOURCES:
+        return True
+    messages = event.get("messages")
+    if isinstance(messages, list) and messages:
+        metadata = messages[0].get("event_metadata") if isinstance(messages[0], dict) else None
+        event_type = metadata.get("event_type", "") if isinstance(metadata, dict) else ""
+        return event_type.endswith("TimerMessage")
+    return False
+
+
+def _warm_routers(app: FastAPI) -> None:
+    from app.router_registry import include_routers
+    include_routers(app)
+
+
+def _ping_db() -> None:
+    from sqlalchemy import text
+    from app.database import engine
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def warm_achievements() -> None:
+    """Проверка справочника достижений (дальше ensure_achievements_seeded не ходит в БД)."""
+    from app.achievements_service import ensure_achievements_seeded
+    from app.database import SessionLocal
+    with SessionLocal() as db:
+        ensure_achievements_seeded(db)
+
+
+def warm_up(app: FastAPI) -> dict:
+    """
+    Импорт роутеров и параллельный запуск ещё не запущенных ресурсов (app.lifespan);
+    если всё уже запущено — только SELECT 1. Ошибка шага не прерывает остальные.
+    """
+    from app.lifespan import resources
+
+    timings: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    started = time.perf_counter()
+
+    def run(name: str, step: Callable[[], None]) -> None:
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:
+            logger.exception("Warm-up step %s failed", name)
+            errors[name] = f"{type(exc).__name__}: {str(exc).splitlines()[0] if str(exc) else ''}"
+        timings[name] = round((time.perf_counter() - t0) * 1000, 2)
+
+    run("routers", lambda: _warm_routers(app))
+    if resources.all_started():
+        run("db", _ping_db)
+    else:
+        before = {name for name, r in resources.stats()["resources"].items() if r["started"]}
+        for name, r in resources.start_sync()["resources"].items():
+            if name in before:
+                continue
+            timings[name] = r["startup_ms"]
+            if r["error"]:
+                errors[name] = r["error"]
+    return {
+        "warmup": True,
+        "ok": not errors,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "steps_ms": timings,
+        "errors": errors,
+    }
@@ -0,0 +1,111 @@
+"""
+Бенчмарк холодного старта serverless-функции: время от запуска интерпретатора до ответа
+handler.handler на синтетическое событие Yandex Cloud. Каждый замер — отдельный процесс.
+
+Сравнивает обычный режим и LAZY_ROUTERS; с --importtime печатает отчёт `-X importtime`
+(самые тяжёлые модули по суммарному времени импорта).
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_cold_start [--runs 5] [--path /health] [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import handler
+t_import = time.perf_counter() - t0
+event = json.loads(sys.argv[1])
+response = handler.handler(event, None)
+t_total = time.perf_counter() - t0
+sys.stdout.write("\n__RESULT__" + json.dumps({
+    "import_ms": t_import * 1000,
+    "total_ms": t_total * 1000,
+    "status": response.get("statusCode"),
+}) + "\n")
+"""
+
+
+def synthetic_event(path: str) -> dict:
+    """Событие в формате Yandex Cloud Functions (HTTP-триггер)."""
+    return {
+        "httpMethod": "GET",
+        "url": path,
+        "headers": {"Accept": "application/json", "User-Agent": "bench"},
+        "queryStringParameters": {},
+        "body": "",
+        "isBase64Encoded": False,
+    }
+
+
+def _env(lazy: bool) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "omniactive_bench.db"))
+    env["LAZY_ROUTERS"] = "true" if lazy else "false"
+    env["PYTHONDONTWRITEBYTECODE"] = "0"
+    return env
+
+
+def run_once(path: str, lazy: bool, importtime: bool = False) -> tuple:
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", _CHILD, json.dumps(synthetic_event(path))]
+    proc = subprocess.run(cmd, cwd=BACKEND_DIR, env=_env(lazy), capture_output=True, text=True)
+    marker = proc.stdout.rfind("__RESULT__")
+    if proc.returncode != 0 or marker == -1:
+        raise RuntimeError(proc.stderr[-2000:])
+    result = json.loads(proc.stdout[marker + len("__RESULT__"):].strip())
+    return result, proc.stderr
+
+
+def importtime_report(stderr: str, top: int) -> list:
+    """Разбор вывода -X importtime: (cumulative_us, self_us, модуль), по убыванию cumulative."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative_us), int(self_us), name.strip()))
+        except ValueError:
+            continue  # строка заголовка
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--importtime", action="store_true", help="отчёт -X importtime")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    run_once(args.path, lazy=False)  # прогрев кеша .pyc, чтобы не мерить компиляцию
+    for lazy in (False, True):
+        results = [run_once(args.path, lazy)[0] for _ in range(args.runs)]
+        mode = "LAZY_ROUTERS" if lazy else "обычный"
+        print(
+            f"{mode:12s} {args.path}: импорт {statistics.median(r['import_ms'] for r in results):7.1f} мс, "
+            f"до ответа {statistics.median(r['total_ms'] for r in results):7.1f} мс "
+            f"(медиана из {args.runs}, статус {results[0]['status']})"
+        )
+
+    if args.importtime:
+        for lazy in (False, True):
+            _, stderr = run_once(args.path, lazy, importtime=True)
+            print(f"\n-X importtime ({'LAZY_ROUTERS' if lazy else 'обычный'}), топ-{args.top} по cumulative:")
+            for cumulative_us, self_us, name in importtime_report(stderr, args.top):
+                print(f"  {cumulative_us / 1000:8.1f} мс  (self {self_us / 1000:6.1f})  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Микробенчмарк преобразования событий Yandex Cloud → AWS HTTP API v2 (handler._to_aws_http_api_v2)
+на записанных событиях из benchmarks/fixtures/yc_events.json. Печатает мкс на событие.
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_event_adapter [--number 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import timeit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "omniactive_bench.db"))
+os.environ.setdefault("LAZY_ROUTERS", "true")  # роутеры для замера не нужны
+
+from handler import _to_aws_http_api_v2  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "yc_events.json")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--show", action="store_true", help="печатать результат преобразования")
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+
+    total = 0.0
+    for fx in fixtures:
+        event = fx["event"]
+        seconds = min(timeit.repeat(lambda: _to_aws_http_api_v2(event, None), number=args.number, repeat=3))
+        per_event_us = seconds / args.number * 1e6
+        total += per_event_us
+        print(f"{fx['name']:40s} {per_event_us:7.2f} мкс")
+        if args.show:
+            out = _to_aws_http_api_v2(event, None)
+            print(f"    {out['requestContext']['http']['method']} {out['rawPath']} ?{out['rawQueryString']}  {out.get('queryStringParameters')}")
+    print(f"{'среднее':40s} {total / len(fixtures):7.2f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Бенчмарк сериализации больших списков: время на 10k строк до и после быстрого пути.
+
+«До» — то, что делает FastAPI с response_model: валидация ORM-объектов (from_attributes),
+dump в JSON-режиме по alias и json.dumps в JSONResponse.
+«После» — rows_to_dicts из кортежей SQL-строк + FastJSONResponse (orjson).
+
+Запуск (из каталога backend):
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# БД не нужна, только модели; файловый sqlite — чтобы create_engine принял параметры пула
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "omniactive_bench.db"))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.models import ExerciseResult, FoodLogEntry  # noqa: E402
+from app.responses import as_float, date_as_datetime, dumps, rows_to_dicts  # noqa: E402
+from app.schemas import ExerciseResultResponse, FoodLogEntryResponse  # noqa: E402
+
+
+def _exercise_rows(n: int) -> list:
+    start = datetime(2020, 1, 1, 8, 30)
+    return [
+        (
+            "quick_pushups", "Отжимания", start + timedelta(hours=i), None, f"s{i // 5}",
+            Decimal("0.00"), 10 + i % 40, None, None, uuid.uuid4(),
+        )
+        for i in range(n)
+    ]
+
+
+def _food_rows(n: int) -> list:
+    start = date(2020, 1, 1)
+    return [
+        (
+            uuid.uuid4(), "Гречка с курицей", Decimal("350.50"), Decimal("30.00"),
+            Decimal("8.20"), Decimal("40.10"), start + timedelta(days=i // 4), uuid.uuid4(),
+        )
+        for i in range(n)
+    ]
+
+
+_EXERCISE_KEYS = ["exercise_id", "exercise_name", "date", "workout_id", "session_id", "weight", "reps", "hits", "misses", "id"]
+_EXERCISE_ALIASES = ["exerciseId", "exerciseName", "date", "workoutId", "sessionId", "weight", "reps", "hits", "misses", "id"]
+_FOOD_KEYS = ["dish_id", "dish_name", "calories", "protein", "fats", "carbs", "date", "id"]
+_FOOD_ALIASES = ["dishId", "dishName", "calories", "protein", "fats", "carbs", "date", "id"]
+_FOOD_CONVERTERS = {k: as_float for k in ("calories", "protein", "fats", "carbs")}
+_FOOD_CONVERTERS["date"] = date_as_datetime
+
+
+def _slow_path(orm_objects: list, schema) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    validated = adapter.validate_python(orm_objects, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json", by_alias=True)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _report(name: str, rows: list, model, keys, aliases, schema, converters, repeat: int) -> None:
+    n = len(rows)
+    hydrate = lambda: [model(**dict(zip(keys, r))) for r in rows]  # noqa: E731
+    orm_objects = hydrate()
+    t_hydrate = _best(hydrate, repeat)
+    t_slow = _best(lambda: _slow_path(orm_objects, schema), repeat)
+    t_fast = _best(lambda: dumps(rows_to_dicts(rows, aliases, converters)), repeat)
+    assert json.loads(_slow_path(orm_objects, schema)) == json.loads(dumps(rows_to_dicts(rows, aliases, converters)))
+    per10k = 10_000 / n * 1000
+    print(f"{name} ({n} строк)")
+    print(f"  ORM-гидрация:                      {t_hydrate * per10k:8.1f} мс / 10k")
+    print(f"  response_model + json.dumps (до):  {t_slow * per10k:8.1f} мс / 10k")
+    print(f"  rows_to_dicts + orjson (после):    {t_fast * per10k:8.1f} мс / 10k")
+    print(f"  ускорение сериализации:            {t_slow / t_fast:8.1f}x (без учёта гидрации)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _report("GET /exercise-results", _exercise_rows(args.rows), ExerciseResult,
+            _EXERCISE_KEYS, _EXERCISE_ALIASES, ExerciseResultResponse, {"weight": as_float}, args.repeat)
+    _report("GET /food-log", _food_rows(args.rows), FoodLogEntry,
+            _FOOD_KEYS, _FOOD_ALIASES, FoodLogEntryResponse, _FOOD_CONVERTERS, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
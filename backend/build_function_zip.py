@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Сборка ZIP-архива для AWS Lambda / Yandex Cloud Functions.
+
+Код функции (handler.py, app/, миграции migrations/ + migrate.py, init_db и handler'ы) и runtime-зависимости
+из requirements.txt (без dev-пакетов: uvicorn, boto3) ставятся во временный каталог,
+из него удаляются тесты, документация, __pycache__, исходники C и лишнее из dist-info,
+затем модули компилируются в .pyc (unchecked-hash: не зависят от mtime после распаковки).
+Архив воспроизводим: файлы в отсортированном порядке с фиксированной датой.
+
+В app/static кладутся заранее собранная схема OpenAPI и файлы Swagger UI (app.docs).
+Из .so удаляются отладочные символы (strip); с --pyc-only у зависимостей остаются только .pyc.
+Режим --no-deps (slim): в архиве только код и requirements.txt — зависимости ставит платформа.
+
+Использование:
+    python build_function_zip.py                      # код + зависимости
+    python build_function_zip.py --no-deps            # только код (лимит 4 MB)
+    python build_function_zip.py --output function.zip --python-version 3.12
+"""
+import argparse
+import compileall
+import os
+import py_compile
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Код функции: каталоги и шаблоны файлов в корне backend
+APP_DIRS = ("app", "migrations")
+APP_FILE_PATTERNS = ("handler.py", "*_handler.py", "init_db.py", "migrate.py")
+# Копии six/typing_extensions в корне backend дублируют пакеты из зависимостей
+VENDORED_FILES = ("six.py", "typing_extensions.py")
+
+# Пакеты из requirements.txt, которые не нужны функции (локальный сервер, деплой-скрипт)
+DEV_ONLY_REQUIREMENTS = {"uvicorn", "boto3"}
+
+PRUNE_DIRS = {"__pycache__", "tests", "test", "docs", "doc", "examples", "benchmarks"}
+PRUNE_SUFFIXES = (".pyc", ".pyo", ".pyi", ".c", ".h", ".pxd", ".pyx", ".md", ".rst")
+# Из *.dist-info оставляем только то, что читается при работе (importlib.metadata)
+DIST_INFO_KEEP = {"METADATA", "top_level.txt", "entry_points.txt"}
+
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+def runtime_requirements(requirements: Path) -> list:
+    """Строки requirements.txt без dev-пакетов."""
+    lines = []
+    for line in requirements.read_text(encoding="utf-8").splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        name = re.split(r"[\[<>=!~; ]", stripped, maxsplit=1)[0].lower().replace("_", "-")
+        if name in DEV_ONLY_REQUIREMENTS:
+            continue
+        lines.append(stripped)
+    return lines
+
+
+def copy_app(staging: Path, include_vendored: bool) -> None:
+    for name in APP_DIRS:
+        shutil.copytree(BACKEND_DIR / name, staging / name, ignore=shutil.ignore_patterns("__pycache__", "*.pyc"))
+    files = {p for pattern in APP_FILE_PATTERNS for p in BACKEND_DIR.glob(pattern)}
+    if include_vendored:
+        files.update(BACKEND_DIR / name for name in VENDORED_FILES)
+    for path in files:
+        shutil.copy2(path, staging / path.name)
+
+
+def build_docs(staging: Path, swagger_ui: bool) -> bool:
+    """OpenAPI-схема и файлы Swagger UI в app/static архива (python -m app.docs)."""
+    cmd = [sys.executable, "-m", "app.docs", "--output-dir", str(staging / "app" / "static")]
+    if not swagger_ui:
+        cmd.append("--no-swagger-ui")
+    # Схема строится без обращения к БД — достаточно любого корректного URL
+    env = {**os.environ, "DATABASE_URL": "sqlite://", "LAZY_ROUTERS": "false"}
+    return subprocess.run(cmd, cwd=str(BACKEND_DIR), env=env).returncode == 0
+
+
+def install_dependencies(staging: Path, requirements: list, python_version: str, platform: str) -> None:
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(requirements) + "\n")
+        req_file = f.name
+    cmd = [
+        sys.executable, "-m", "pip", "install",
+        "-r", req_file,
+        "--target", str(staging),
+        "--no-compile",
+        "--no-cache-dir",
+        "--disable-pip-version-check",
+        "--quiet",
+    ]
+    if platform:
+        # Колёса под платформу функции, даже если сборка идёт на другой ОС
+        cmd += [
+            "--platform", platform,
+            "--python-version", python_version,
+            "--implementation", "cp",
+            "--only-binary=:all:",
+        ]
+    try:
+        subprocess.run(cmd, check=True)
+    finally:
+        os.unlink(req_file)
+    shutil.rmtree(staging / "bin", ignore_errors=True)
+
+
+def prune(staging: Path) -> int:
+    """Удаляет тесты, документацию, кеши и лишнее из dist-info. Возвращает освобождённые байты."""
+    freed = 0
+    for root, dirs, files in os.walk(staging, topdown=True):
+        root_path = Path(root)
+        for d in list(dirs):
+            if d in PRUNE_DIRS:
+                target = root_path / d
+                freed += sum(p.stat().st_size for p in target.rglob("*") if p.is_file())
+                shutil.rmtree(target)
+                dirs.remove(d)
+        in_dist_info = root_path.name.endswith(".dist-info")
+        if in_dist_info:
+            for d in list(dirs):  # licenses/ и т.п.
+                target = root_path / d
+                freed += sum(p.stat().st_size for p in target.rglob("*") if p.is_file())
+                shutil.rmtree(target)
+                dirs.remove(d)
+        for name in files:
+            if (in_dist_info and name not in DIST_INFO_KEEP) or name.endswith(PRUNE_SUFFIXES):
+                path = root_path / name
+                freed += path.stat().st_size
+                path.unlink()
+    return freed
+
+
+def precompile(staging: Path) -> bool:
+    """Компилирует .py в __pycache__ (unchecked-hash .pyc не проверяют mtime исходника)."""
+    # stripdir: в co_filename относительные пути, а не путь временного каталога сборки
+    return compileall.compile_dir(
+        str(staging),
+        quiet=1,
+        stripdir=str(staging),
+        workers=0,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+
+
+def strip_binaries(staging: Path) -> int:
+    """Удаляет отладочные символы из .so (как serverless-плагины в режиме slim). Возвращает освобождённые байты."""
+    strip = shutil.which("strip")
+    if strip is None:
+        print("⚠️ strip не найден — .so не уменьшены")
+        return 0
+    freed = 0
+    for path in staging.rglob("*.so*"):
+        if not path.is_file():
+            continue
+        before = path.stat().st_size
+        if subprocess.run([strip, "--strip-unneeded", str(path)], capture_output=True).returncode == 0:
+            freed += before - path.stat().st_size
+    return freed
+
+
+def drop_dependency_sources(staging: Path, app_names: set) -> int:
+    """Заменяет .py зависимостей на .pyc рядом (legacy-раскладка). Код функции остаётся с исходниками."""
+    freed = 0
+    for path in staging.rglob("*.py"):
+        top = path.relative_to(staging).parts[0]
+        if top in app_names:
+            continue
+        py_compile.compile(
+            str(path),
+            cfile=str(path.with_suffix(".pyc")),
+            dfile=path.relative_to(staging).as_posix(),
+            doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+        )
+        freed += path.stat().st_size
+        path.unlink()
+    return freed
+
+
+def _report_key(arcname: str) -> str:
+    """Пакет верхнего уровня для файла архива (модули в корне — по имени модуля)."""
+    parts = arcname.split("/")
+    top = parts[0]
+    if top.endswith(".dist-info"):
+        return "*.dist-info"
+    if top == "__pycache__":
+        top = parts[1]
+    elif len(parts) > 1:
+        return top
+    return top.split(".", 1)[0].lstrip("_") or top
+
+
+def write_zip(staging: Path, output: Path) -> dict:
+    """Пишет архив (сортировка, фиксированная дата). Возвращает размеры по пакетам верхнего уровня."""
+    sizes = defaultdict(lambda: [0, 0])
+    paths = sorted(p for p in staging.rglob("*") if p.is_file())
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        for path in paths:
+            arcname = path.relative_to(staging).as_posix()
+            info = zipfile.ZipInfo(arcname, date_time=ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            zf.writestr(info, path.read_bytes(), compresslevel=9)
+            key = _report_key(arcname)
+            sizes[key][0] += info.file_size
+            sizes[key][1] += zf.getinfo(arcname).compress_size
+    return sizes
+
+
+def print_report(sizes: dict, output: Path, freed: int) -> None:
+    total_raw = sum(v[0] for v in sizes.values())
+    total_zip = sum(v[1] for v in sizes.values())
+    print(f"\n{'пакет':<32}{'распакован, KB':>16}{'в zip, KB':>12}{'доля':>8}")
+    for name, (raw, packed) in sorted(sizes.items(), key=lambda kv: -kv[1][1]):
+        share = packed / total_zip * 100 if total_zip else 0
+        print(f"{name:<32}{raw / 1024:>16.1f}{packed / 1024:>12.1f}{share:>7.1f}%")
+    print(f"{'итого':<32}{total_raw / 1024:>16.1f}{total_zip / 1024:>12.1f}")
+    print(f"\nУдалено при очистке: {freed / 1024:.1f} KB")
+    print(f"Архив: {output} ({output.stat().st_size / 1024 / 1024:.2f} MB)")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сборка ZIP-архива функции")
+    parser.add_argument("--output", default=str(BACKEND_DIR / "lambda-deployment.zip"))
+    parser.add_argument("--requirements", default=str(BACKEND_DIR / "requirements.txt"))
+    parser.add_argument("--no-deps", action="store_true", help="только код и requirements.txt (зависимости ставит платформа)")
+    parser.add_argument("--python-version", default=f"{sys.version_info.major}.{sys.version_info.minor}",
+                        help="версия Python функции (по умолчанию — текущая)")
+    parser.add_argument("--platform", default="manylinux2014_x86_64",
+                        help="платформа колёс для pip; пустая строка — текущая система")
+    parser.add_argument("--no-compile", action="store_true", help="не добавлять .pyc")
+    parser.add_argument("--pyc-only", action="store_true",
+                        help="у зависимостей оставить только .pyc (без .py): меньше архив, но без исходников в traceback")
+    parser.add_argument("--no-strip", action="store_true", help="не удалять отладочные символы из .so")
+    parser.add_argument("--no-docs", action="store_true", help="без предсобранной схемы OpenAPI и Swagger UI")
+    parser.add_argument("--no-swagger-ui", action="store_true", help="схема OpenAPI без локальных файлов Swagger UI")
+    parser.add_argument("--include-vendored", action="store_true",
+                        help="положить six.py и typing_extensions.py из корня backend")
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve()
+    requirements = runtime_requirements(Path(args.requirements))
+
+    with tempfile.TemporaryDirectory(prefix="function-zip-") as tmp:
+        staging = Path(tmp)
+        copy_app(staging, args.include_vendored)
+        if not args.no_docs and not build_docs(staging, not args.no_swagger_ui):
+            # Не критично: без файла схема строится при первом запросе документации
+            print("⚠️ Документация не собрана (нужны зависимости из requirements.txt локально)")
+        app_names = {p.name for p in staging.iterdir()}
+        if args.no_deps:
+            (staging / "requirements.txt").write_text("\n".join(requirements) + "\n", encoding="utf-8")
+        else:
+            print(f"Установка зависимостей ({len(requirements)} пакетов, Python {args.python_version}, "
+                  f"{args.platform or 'текущая платформа'})...")
+            install_dependencies(staging, requirements, args.python_version, args.platform)
+        freed = prune(staging)
+        if not args.no_deps and not args.no_strip:
+            freed += strip_binaries(staging)
+
+        current = f"{sys.version_info.major}.{sys.version_info.minor}"
+        if args.no_compile:
+            pass
+        elif args.python_version != current:
+            # .pyc привязан к версии интерпретатора — чужой версии он бесполезен
+            print(f"⚠️ .pyc не добавлены: сборка на Python {current}, функция на {args.python_version}")
+        else:
+            if args.pyc_only and not args.no_deps:
+                freed += drop_dependency_sources(staging, app_names)
+            if not precompile(staging):
+                print("❌ Ошибка компиляции модулей")
+                return 1
+
+        if output.exists():
+            output.unlink()
+        sizes = write_zip(staging, output)
+    print_report(sizes, output, freed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
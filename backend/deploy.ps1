@@ -1,12 +1,10 @@
 # PowerShell скрипт для деплоя в AWS Lambda (Windows)
+# Аргументы передаются в build_function_zip.py (например --no-deps для режима slim)
 
-Write-Host "Установка зависимостей..." -ForegroundColor Green
-pip install -r requirements.txt -t .
+Write-Host "Сборка ZIP архива (код + runtime-зависимости)..." -ForegroundColor Green
+python build_function_zip.py @args
+if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
 
-Write-Host "Создание ZIP архива..." -ForegroundColor Green
-Compress-Archive -Path * -DestinationPath lambda-deployment.zip -Force
-
-Write-Host "ZIP архив создан: lambda-deployment.zip" -ForegroundColor Green
 Write-Host ""
 Write-Host "Для загрузки в Lambda выполните:" -ForegroundColor Yellow
 Write-Host "aws lambda update-function-code --function-name omniactive-api --zip-file fileb://lambda-deployment.zip" -ForegroundColor Cyan
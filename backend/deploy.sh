@@ -2,27 +2,21 @@
 # Деплой в serverless (AWS Lambda, Yandex Cloud Functions и т.п.)
 #
 # Обычный режим: ./deploy.sh
-#   — ставит зависимости в текущий каталог и кладёт в zip код + зависимости (архив большой).
+#   — кладёт в zip код + runtime-зависимости из requirements.txt (без тестов, документации,
+#     __pycache__ и dev-пакетов), с предкомпилированными .pyc; печатает размер по пакетам.
 #
 # Режим slim (для лимита 4 MB, например Yandex Cloud): ./deploy.sh slim
-#   — в zip только handler.py, app/ и requirements.txt; зависимости НЕ включаются.
+#   — в zip только код функции и requirements.txt; зависимости НЕ включаются.
 #   — облако само установит пакеты из requirements.txt при сборке.
+#
+# Остальные аргументы передаются в build_function_zip.py (например --python-version 3.12).
 
+set -e
+cd "$(dirname "$0")"
 
-zip -r lambda-deployment.zip . \
-    -x "*.git*" \
-    -x "*.env*" \
-    -x "__pycache__/*" \
-    -x "*.pyc" \
-    -x "*.pyo" \
-    -x "*.pyd" \
-    -x "*.so" \
-    -x "*.egg-info/*" \
-    -x "deploy.sh" \
-    -x "deploy.ps1" \
-    -x "README.md" \
-    -x ".gitignore" \
-    -x "lambda-deployment.zip" \
-    -x "init_db.py"
-
-echo "ZIP архив создан: lambda-deployment.zip"
\ No newline at end of file
+if [ "$1" = "slim" ]; then
+    shift
+    python3 build_function_zip.py --no-deps "$@"
+else
+    python3 build_function_zip.py "$@"
+fi
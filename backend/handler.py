@@ -3,22 +3,33 @@ AWS Lambda / Yandex Cloud Functions handler для FastAPI приложения.
 
 Handler: handler.handler
 """
+import base64
+import json
 import logging
+import re
+import time
+from urllib.parse import parse_qsl, quote, urlsplit
 from mangum import Mangum
 from app.main import app
 from app.config import settings
+from app import request_log
+from app.lifespan import resources
+from app.warmup import is_warmup_event, warm_up
 
 logger = logging.getLogger(__name__)
 
+# Заголовки с учётными данными: в логах маскируются
+_SECRET_HEADERS = {"authorization", "x-access-token", "cookie"}
+
 
 def _safe_headers_for_log(headers: dict) -> dict:
-    """Копия заголовков с маскировкой Authorization для логов."""
+    """Копия заголовков с маскировкой Authorization / X-Access-Token / Cookie для логов."""
     if not headers or not isinstance(headers, dict):
         return {}
     out = {}
     for k, v in headers.items():
         key = k.lower() if isinstance(k, str) else k
-        if key == "authorization" and v:
+        if key in _SECRET_HEADERS and v:
             v = f"{str(v)[:15]}...{str(v)[-4:]}" if len(str(v)) > 25 else "***"
         out[k] = v
     return out
@@ -44,64 +55,116 @@ def _context_to_request_dict(context) -> dict | None:
     }
 
 
+# sourceIp, когда платформа его не передала: такие запросы делят один ключ лимитов по IP
+UNKNOWN_SOURCE_IP = "127.0.0.1"
+
+# Строки из «безопасных» символов не нуждаются в percent-encoding — quote() для них не вызываем
+_is_url_safe = re.compile(r"[A-Za-z0-9_.\-~/:,]*\Z").match
+
+
+def _encode_query_component(value: str) -> str:
+    return value if _is_url_safe(value) else quote(value, safe="/:,")
+
+
+def _query_pairs(multi, single, raw_qs: str) -> list:
+    """Пары (ключ, значение) запроса в исходном порядке; значения уже декодированы."""
+    if isinstance(multi, dict) and multi:
+        return [(k, v) for k, values in multi.items() for v in (values if isinstance(values, list) else [values])]
+    if isinstance(single, dict) and single:
+        return list(single.items())
+    if raw_qs:
+        return parse_qsl(raw_qs, keep_blank_values=True)
+    return []
+
+
 def _to_aws_http_api_v2(event: dict, context) -> dict:
-    """Преобразует событие Yandex Cloud / др. в формат AWS API Gateway HTTP API v2 для Mangum."""
-    # Yandex Cloud: HTTP-запрос в context, в event только request_id, source, version_id
+    """
+    Преобразует событие Yandex Cloud / др. в формат AWS API Gateway HTTP API v2 для Mangum.
+
+    Поля берутся из event, поверх которого (по возрастанию приоритета) накладываются HTTP-данные
+    из context (так их передаёт Yandex Cloud), event["http"] и event["request"].
+    Входное событие не изменяется.
+    Поддерживаются multiValueQueryStringParameters; rawQueryString собирается с percent-encoding.
+    """
     req = _context_to_request_dict(context)
-    if req:
-        event = {**event, **req}
-    # Или в event.http / event.request
-    if isinstance(event.get("http"), dict):
-        event = {**event, **event["http"]}
-    if isinstance(event.get("request"), dict):
-        event = {**event, **event["request"]}
+    http, request = event.get("http"), event.get("request")
+    if req is None and not isinstance(http, dict) and not isinstance(request, dict):
+        src = event
+    else:
+        # Редкий случай: несколько источников — объединяем один раз
+        src = dict(event)
+        for extra in (req, http, request):
+            if isinstance(extra, dict):
+                src.update(extra)
+    get = src.get
 
     # Уже AWS HTTP API v2
-    if event.get("version") == "2.0" and "requestContext" in event:
+    if get("version") == "2.0" and "requestContext" in src:
         return event
 
-    http_method = event.get("httpMethod") or event.get("request_method") or event.get("method") or "GET"
-    path = event.get("url") or event.get("path") or event.get("rawPath") or "/"
-    # Если пришёл полный URL — оставляем только path
-    if path.startswith("http://") or path.startswith("https://"):
-        from urllib.parse import urlparse
-        path = urlparse(path).path or "/"
-    if "?" in path:
+    http_method = get("httpMethod") or get("request_method") or get("method") or "GET"
+    path = get("url") or get("path") or get("rawPath") or "/"
+    # Полный URL — оставляем только path, query берём из URL
+    if "://" in path:
+        parts = urlsplit(path)
+        path, raw_qs = parts.path or "/", parts.query
+    elif "?" in path:
         path, raw_qs = path.split("?", 1)
     else:
-        raw_qs = event.get("rawQueryString") or ""
-    headers = event.get("headers") or {}
+        raw_qs = get("rawQueryString") or ""
+
+    pairs = _query_pairs(get("multiValueQueryStringParameters"), get("queryStringParameters"), raw_qs)
+
+    # Yandex Cloud: путь может приходить в query (path=... или page=... для корня) —
+    # тогда считаем его путём и убираем из параметров для приложения
+    if pairs:
+        path_key = None
+        for k, _ in pairs:
+            if k == "path":
+                path_key = "path"
+                break
+        if path_key is None and (path == "/" or not path.strip()):
+            for k, _ in pairs:
+                if k == "page":
+                    path_key = "page"
+                    break
+        if path_key is not None:
+            path_from_query = next(v for k, v in pairs if k == path_key)
+            pairs = [(k, v) for k, v in pairs if k != path_key]
+            if path_from_query:
+                path = path_from_query
+    if not path.startswith("/"):
+        path = "/" + path
+
+    # rawQueryString и queryStringParameters (мультизначения через запятую, как в API Gateway v2);
+    # пустые значения (?q=) сохраняются — для приложения это не то же самое, что отсутствующий параметр
+    raw_parts = []
+    query = {}
+    for k, v in pairs:
+        v = "" if v is None else str(v)
+        raw_parts.append(f"{_encode_query_component(k)}={_encode_query_component(v)}")
+        query[k] = f"{query[k]},{v}" if k in query else v
+
+    headers = get("headers") or {}
     if not isinstance(headers, dict):
-        headers = dict(headers) if headers else {}
-    # Заголовки в lowercase для ASGI
-    headers = {k.lower() if isinstance(k, str) else k: v for k, v in headers.items()}
-    body = event.get("body") or ""
-    query = event.get("queryStringParameters") or {}
-    if raw_qs and not query:
-        query = dict(x.split("=", 1) for x in raw_qs.split("&") if "=" in x)
-    if not isinstance(query, dict):
-        query = dict(query) if query else {}
-
-    # Yandex Cloud: путь может приходить первым в query (path=... или page=...)
-    # Тогда считаем его путём, убираем из query и передаём остальные параметры в приложение
-    path_from_query = None
-    if query.get("path"):
-        path_from_query = query.pop("path")
-    elif (path == "/" or not path.strip()) and query.get("page"):
-        path_from_query = query.pop("page")
-    if path_from_query is not None:
-        path = path_from_query if path_from_query.startswith("/") else "/" + path_from_query.lstrip("/")
-
-    is_base64 = event.get("isBase64Encoded", False)
-
-    # rawQueryString без path/page — только остальные параметры для приложения
-    raw_qs = "&".join(f"{k}={v}" for k, v in query.items() if v) if query else ""
+        headers = dict(headers)
+    request_context = get("requestContext")
+    identity = request_context.get("identity") if isinstance(request_context, dict) else None
+    identity = identity if isinstance(identity, dict) else {}
+    # Только адрес из контекста платформы: X-Forwarded-For задаёт клиент, по нему обходился бы лимит по IP
+    source_ip = identity.get("sourceIp") or UNKNOWN_SOURCE_IP
+    user_agent = identity.get("userAgent") or headers.get("User-Agent") or headers.get("user-agent") or ""
+    request_id = (
+        getattr(context, "request_id", None)
+        or (request_context.get("requestId") if isinstance(request_context, dict) else None)
+        or "yc"
+    )
 
     return {
         "version": "2.0",
         "routeKey": "$default",
-        "rawPath": path if path.startswith("/") else "/" + path,
-        "rawQueryString": raw_qs,
+        "rawPath": path,
+        "rawQueryString": "&".join(raw_parts),
         "headers": headers,
         "queryStringParameters": query or None,
         "requestContext": {
@@ -110,17 +173,17 @@ def _to_aws_http_api_v2(event: dict, context) -> dict:
             "domainName": "functions.yandexcloud.net",
             "http": {
                 "method": http_method,
-                "path": path if path.startswith("/") else "/" + path,
+                "path": path,
                 "protocol": "HTTP/1.1",
-                "sourceIp": "127.0.0.1",
-                "userAgent": headers.get("user-agent", ""),
+                "sourceIp": source_ip,
+                "userAgent": user_agent,
             },
-            "requestId": getattr(context, "request_id", "yc") if context else "yc",
+            "requestId": request_id,
             "time": "01/Jan/1970:00:00:00 +0000",
             "timeEpoch": 0,
         },
-        "body": body,
-        "isBase64Encoded": is_base64,
+        "body": get("body") or "",
+        "isBase64Encoded": bool(get("isBase64Encoded")),
     }
 
 
@@ -130,14 +193,74 @@ _mangum = Mangum(
     api_gateway_base_path=settings.API_GATEWAY_BASE_PATH or None,
 )
 
+# lifespan="off": Mangum запускал бы lifespan на каждом вызове. Ресурсы (app.lifespan)
+# запускаются здесь при холодном старте или позже — пингом прогрева
+if settings.EAGER_STARTUP:
+    resources.start_sync()
+elif settings.DB_STARTUP_PROBE:
+    resources.start_sync(["db"])
+
+
+def _ensure_binary_body(response: dict) -> dict:
+    """
+    Сжатое тело (Content-Encoding) должно уходить в base64.
+    Mangum по content-type (application/json) считает тело текстом и может отдать его
+    строкой, если байты случайно оказались валидным UTF-8 (возможно для brotli).
+    """
+    headers = response.get("headers") or {}
+    if headers.get("content-encoding") and not response.get("isBase64Encoded") and response.get("body"):
+        response["body"] = base64.b64encode(response["body"].encode("utf-8")).decode("ascii")
+        response["isBase64Encoded"] = True
+    return response
+
+
+def _log_request(ev: dict, response: dict, conversion_s: float, app_s: float, stats) -> None:
+    """Структурная запись о запросе (с выборкой): маскированные заголовки и поля тела, тайминги."""
+    status = response.get("statusCode") if isinstance(response, dict) else None
+    total_ms = (conversion_s + app_s) * 1000
+    if not request_log.should_log(status, total_ms):
+        return
+    http = ev.get("requestContext", {}).get("http", {})
+    request_log.emit({
+        "request_id": ev.get("requestContext", {}).get("requestId"),
+        "method": http.get("method"),
+        "path": ev.get("rawPath"),
+        "query": ev.get("rawQueryString") or None,
+        "status": status,
+        "total_ms": round(total_ms, 2),
+        "conversion_ms": round(conversion_s * 1000, 3),
+        "app_ms": round(app_s * 1000, 2),
+        "db_ms": round(stats.db_time * 1000, 2),
+        "db_queries": stats.db_queries,
+        "db_wait_ms": round(stats.db_wait * 1000, 2),
+        "response_bytes": len(response.get("body") or "") if isinstance(response, dict) else None,
+        "headers": _safe_headers_for_log(ev.get("headers")),
+        "body": request_log.body_for_log(
+            ev.get("body"), ev.get("rawPath"), bool(ev.get("isBase64Encoded")), settings.LOG_BODY_MAX_CHARS
+        ),
+    })
+
 
 def handler(event: dict, context):
-    print("=== handler raw event ===")
-    print(event)
-    print("=== handler context ===")
-    print(context)
     """Обёртка: конвертирует событие Yandex Cloud в AWS HTTP API v2, затем передаёт в Mangum."""
+    if is_warmup_event(event):
+        # Пинг прогрева — без Mangum и маршрутизации FastAPI
+        result = warm_up(app)
+        logger.info("Warm-up: %s", result)
+        return {
+            "statusCode": 200,
+            "headers": {"content-type": "application/json"},
+            "body": json.dumps(result),
+            "isBase64Encoded": False,
+        }
+    stats = request_log.start_request()
+    t0 = time.perf_counter()
     ev = _to_aws_http_api_v2(event, context)
-    print("=== handler converted event ===")
-    print(ev)
-    return _mangum(ev, context)
+    t1 = time.perf_counter()
+    response = _ensure_binary_body(_mangum(ev, context))
+    t2 = time.perf_counter()
+    try:
+        _log_request(ev, response, t1 - t0, t2 - t1, stats)
+    except Exception:  # логирование не должно ломать ответ
+        logger.exception("Не удалось записать лог запроса")
+    return response
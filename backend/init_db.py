@@ -1,25 +1,10 @@
 """
 Скрипт для инициализации базы данных
-Создаёт все таблицы на основе моделей SQLAlchemy
+Создаёт таблицы и применяет все миграции схемы (то же, что python migrate.py)
 """
-from app.database import engine, Base
-from app.models import (
-    User,
-    UserProfile,
-    Workout,
-    CustomWorkoutPlan,
-    ExerciseResult,
-    Dish,
-    FoodLogEntry,
-    StepsEntry,
-    WorkoutSession,
-    ActivitySettings,
-    Achievement,
-    UserAchievement,
-    CustomWorkoutPlan,
-)
+from migrations import run_migrations
 
 if __name__ == "__main__":
-    print("Создание таблиц в базе данных...")
-    Base.metadata.create_all(bind=engine)
-    print("Таблицы успешно созданы!")
+    print("Создание таблиц и применение миграций...")
+    run_migrations()
+    print("База данных готова!")
@@ -0,0 +1,34 @@
+"""
+Handler для Cloud Function пересчёта досок лидеров (app.leaderboards).
+Используется в Yandex Cloud Functions.
+
+В serverless фоновых задач app.lifespan нет, поэтому снимки мест пересчитывает отдельная
+функция по таймеру: тот же zip, Handler: leaderboard_handler.handler, триггер-таймер
+раз в 5 минут (как LEADERBOARD_REFRESH_SECONDS). Переменные окружения — как у основной функции.
+Прогон идёт под той же блокировкой, что и фоновая задача воркеров (app.locks.job_session).
+"""
+from app.locks import job_session
+from app.leaderboards import refresh_leaderboards
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Handler для Cloud Function
+    """
+    try:
+        with job_session("job:leaderboards") as db:
+            if db is None:
+                return {
+                    "statusCode": 200,
+                    "body": {"status": "skipped", "message": "Прогон уже идёт в другом процессе"},
+                }
+            stats = refresh_leaderboards(db)
+        return {
+            "statusCode": 200,
+            "body": {"status": "ok", "message": "Доски лидеров пересчитаны", **stats},
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": {"status": "error", "message": str(e)},
+        }
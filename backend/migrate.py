@@ -0,0 +1,45 @@
+"""
+Миграции схемы БД: применяет по порядку ещё не применённые версии (migrations/versions.py).
+
+Запуск:
+    python migrate.py                         # все новые миграции
+    python migrate.py status                  # применённые версии и незавершённые backfill'ы
+    python migrate.py --target 3              # только до версии 3 включительно
+    python migrate.py --batch-size 5000 --pause-ms 50
+
+Или через Docker:
+    docker-compose exec api python migrate.py
+
+Или через Cloud Function:
+    Handler: migrate_handler.handler
+
+Прерванный запуск безопасно повторить: backfill продолжится с сохранённой позиции.
+"""
+import argparse
+import json
+import sys
+
+from migrations import migration_status, run_migrations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("command", nargs="?", choices=("up", "status"), default="up")
+    parser.add_argument("--target", type=int, default=None, help="последняя применяемая версия")
+    parser.add_argument("--batch-size", type=int, default=None, help="строк в пакете backfill (MIGRATION_BATCH_SIZE)")
+    parser.add_argument("--pause-ms", type=int, default=None, help="пауза между пакетами, мс (MIGRATION_BATCH_PAUSE_MS)")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(json.dumps(migration_status(), ensure_ascii=False, indent=2))
+        return
+    try:
+        result = run_migrations(target=args.target, batch_size=args.batch_size, pause_ms=args.pause_ms)
+    except Exception as e:
+        print(f"\n✗ Ошибка миграции: {e}")
+        sys.exit(1)
+    print(f"Версия схемы: {result['current']}")
+
+
+if __name__ == "__main__":
+    main()
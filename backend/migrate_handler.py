@@ -0,0 +1,34 @@
+"""
+Handler для Cloud Function миграций схемы БД (migrate.py).
+Используется в Yandex Cloud Functions.
+
+В Yandex Cloud: создайте функцию с тем же кодом (тот же zip),
+Handler: migrate_handler.handler
+Переменные окружения: те же (обязательно DATABASE_URL; для CREATE INDEX CONCURRENTLY
+в обход пулера — MIGRATION_DATABASE_URL). Таймаут функции — с запасом на backfill:
+если он истёк, повторный вызов продолжит с места остановки.
+
+Событие (необязательно): {"target": 3} — применить только до версии 3,
+{"batch_size": 5000}, {"status": true} — только показать состояние.
+"""
+from migrations import migration_status, run_migrations
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Handler для Cloud Function
+    """
+    event = event if isinstance(event, dict) else {}
+    try:
+        if event.get("status"):
+            return {"statusCode": 200, "body": {"status": "ok", "migrations": migration_status()}}
+        result = run_migrations(target=event.get("target"), batch_size=event.get("batch_size"))
+        return {
+            "statusCode": 200,
+            "body": {"status": "ok", "message": "Миграции выполнены", **result},
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": {"status": "error", "message": str(e)},
+        }
@@ -0,0 +1,8 @@
+"""
+Версионные миграции схемы БД (раннер — migrations.runner, миграции — migrations.versions).
+
+Запуск: python migrate.py или Cloud Function с Handler migrate_handler.handler.
+"""
+from migrations.runner import migration_status, run_migrations
+
+__all__ = ["run_migrations", "migration_status"]
@@ -0,0 +1,486 @@
+"""
+Раннер версионных миграций: таблица schema_migrations, пакетные backfill'ы, онлайн-индексы.
+
+Миграция — функция с номером версии (migrations/versions.py). Применённые версии
+записываются в schema_migrations, повторный запуск выполняет только новые. Шаги миграций
+идемпотентны: БД, размеченные прежними скриптами migrate_*, проходят их без изменений.
+
+Чтобы не блокировать запись в больших таблицах:
+- DDL — короткими транзакциями с lock_timeout: если таблица занята длинной транзакцией,
+  шаг падает (повторите запуск позже), а не выстраивает за собой очередь запросов;
+- колонки добавляются без перезаписи таблицы (NULL или константный DEFAULT);
+- индексы — CREATE INDEX CONCURRENTLY, внешние ключи — NOT VALID + VALIDATE CONSTRAINT;
+- backfill — пакетами по MIGRATION_BATCH_SIZE строк: один UPDATE на пакет в своей
+  транзакции, позиция (последний id) пишется в schema_migration_progress в той же
+  транзакции — прерванный backfill продолжается с места остановки.
+
+Раннер подключается отдельно от приложения (MIGRATION_DATABASE_URL или DATABASE_URL),
+без пула и без statement_timeout. Через PgBouncer в режиме transaction pooling
+CREATE INDEX CONCURRENTLY и параметры сессии не работают — нужен прямой адрес БД.
+"""
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.database import Base
+from app.db_pool import normalize_url
+import app.models  # noqa: F401 — регистрация таблиц в Base.metadata
+
+# Ключ pg_advisory_lock: два раннера одновременно не работают
+ADVISORY_LOCK_KEY = 7_104_040
+PROGRESS_PRINT_INTERVAL = 5.0
+BATCH_RETRIES = 3
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+    Column("duration_ms", Integer, nullable=False),
+)
+
+migration_progress = Table(
+    "schema_migration_progress",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("step", String(100), primary_key=True),
+    Column("last_key", String(64), nullable=True),
+    Column("rows_done", BigInteger, nullable=False),
+    Column("done", Boolean, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+class Migration:
+    __slots__ = ("version", "name", "apply")
+
+    def __init__(self, version: int, name: str, apply: Callable[["MigrationContext"], None]):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Декоратор: регистрирует функцию как миграцию с номером version."""
+    def decorator(apply: Callable[["MigrationContext"], None]):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Версия миграции {version} уже занята")
+        MIGRATIONS.append(Migration(version, name, apply))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return apply
+    return decorator
+
+
+def make_engine(url: Optional[str] = None) -> Engine:
+    """Engine раннера: без пула и без statement_timeout (долгие CREATE INDEX / VALIDATE не обрываются)."""
+    url = normalize_url(url or settings.MIGRATION_DATABASE_URL or settings.DATABASE_URL)
+    connect_args = {}
+    if make_url(url).get_backend_name() == "postgresql":
+        connect_args = {
+            "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+            "application_name": f"{settings.DB_APPLICATION_NAME}-migrate",
+        }
+    return create_engine(url, poolclass=NullPool, connect_args=connect_args)
+
+
+class MigrationContext:
+    """Соединение раннера и операции, безопасные для больших таблиц."""
+
+    def __init__(self, engine: Engine, conn: Connection, batch_size: int, pause_ms: int):
+        self.engine = engine
+        self.conn = conn
+        self.batch_size = batch_size
+        self.pause_ms = pause_ms
+        self.is_postgres = engine.dialect.name == "postgresql"
+        self.version: Optional[int] = None
+        self._autocommit_conn: Optional[Connection] = None
+
+    # --- транзакции ---
+
+    @contextmanager
+    def transaction(self):
+        """Короткая транзакция; в PostgreSQL с lock_timeout на ожидание блокировок."""
+        if self.conn.in_transaction():
+            self.conn.commit()
+        with self.conn.begin():
+            if self.is_postgres:
+                self.conn.execute(text(f"SET LOCAL lock_timeout = '{settings.MIGRATION_LOCK_TIMEOUT_MS}ms'"))
+            yield self.conn
+
+    def autocommit(self) -> Connection:
+        """Отдельное соединение в autocommit для CONCURRENTLY (вне транзакции)."""
+        if self._autocommit_conn is None:
+            self._autocommit_conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            if self.is_postgres:
+                self._autocommit_conn.execute(text("SET statement_timeout = 0"))
+        return self._autocommit_conn
+
+    def close(self) -> None:
+        if self._autocommit_conn is not None:
+            self._autocommit_conn.close()
+            self._autocommit_conn = None
+
+    # --- проверки схемы ---
+
+    def _inspect(self, check: Callable):
+        with self.transaction():
+            return check(inspect(self.conn))
+
+    def table_exists(self, table: str) -> bool:
+        return self._inspect(lambda insp: insp.has_table(table))
+
+    def column_exists(self, table: str, column: str) -> bool:
+        return self._inspect(lambda insp: any(c["name"] == column for c in insp.get_columns(table)))
+
+    # --- DDL ---
+
+    def create_tables(self, *tables: str) -> None:
+        """Создаёт недостающие таблицы модели (все, если имена не заданы) с их индексами."""
+        selected = [Base.metadata.tables[name] for name in tables] if tables else None
+        with self.transaction():
+            Base.metadata.create_all(self.conn, tables=selected, checkfirst=True)
+
+    def add_column(
+        self,
+        table: str,
+        column: str,
+        ddl_type: Optional[str] = None,
+        default: Optional[str] = None,
+        nullable: bool = True,
+    ) -> bool:
+        """
+        ADD COLUMN без перезаписи таблицы: NULL или константный DEFAULT (PostgreSQL 11+).
+        Тип по умолчанию — из модели. False — колонка уже есть.
+        """
+        if self.column_exists(table, column):
+            print(f"  {table}.{column} уже существует, пропускаем")
+            return False
+        if ddl_type is None:
+            ddl_type = Base.metadata.tables[table].c[column].type.compile(dialect=self.engine.dialect)
+        sql = f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"
+        if default is not None:
+            sql += f" DEFAULT {default}"
+        if not nullable:
+            sql += " NOT NULL"
+        with self.transaction():
+            self.conn.execute(text(sql))
+        print(f"  ✓ {table}.{column} добавлена")
+        return True
+
+    def _pg_index_valid(self, name: str) -> Optional[bool]:
+        with self.transaction():
+            row = self.conn.execute(
+                text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+                {"name": name},
+            ).first()
+        return None if row is None else bool(row[0])
+
+    def create_index(
+        self,
+        name: str,
+        table: str,
+        columns: Sequence[str],
+        unique: bool = False,
+        where: Optional[str] = None,
+    ) -> bool:
+        """
+        Индекс без блокировки записи: CREATE INDEX CONCURRENTLY (PostgreSQL), иначе обычный.
+        Невалидный индекс от прерванной сборки удаляется и строится заново. False — индекс уже есть.
+        """
+        sql = (
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX {{concurrently}}{{if_not_exists}}{name} "
+            f"ON {table} ({', '.join(columns)})" + (f" WHERE {where}" if where else "")
+        )
+        if not self.is_postgres:
+            if self._inspect(lambda insp: any(i["name"] == name for i in insp.get_indexes(table))):
+                print(f"  Индекс {name} уже существует, пропускаем")
+                return False
+            with self.transaction():
+                self.conn.execute(text(sql.format(concurrently="", if_not_exists="IF NOT EXISTS ")))
+            print(f"  ✓ Индекс {name} создан")
+            return True
+
+        valid = self._pg_index_valid(name)
+        if valid:
+            print(f"  Индекс {name} уже существует, пропускаем")
+            return False
+        conn = self.autocommit()
+        if valid is False:
+            print(f"  Индекс {name} невалиден (прерванная сборка) — пересоздаём")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        t0 = time.perf_counter()
+        conn.execute(text(sql.format(concurrently="CONCURRENTLY ", if_not_exists="")))
+        print(f"  ✓ Индекс {name} создан (CONCURRENTLY, {time.perf_counter() - t0:.1f} с)")
+        return True
+
+    def ensure_foreign_key(
+        self,
+        table: str,
+        column: str,
+        ref_table: str,
+        ref_column: str = "id",
+        ondelete: Optional[str] = None,
+    ) -> bool:
+        """
+        Внешний ключ с нужным ON DELETE (только PostgreSQL). Старый ключ на колонке заменяется;
+        новый добавляется как NOT VALID и проверяется отдельным VALIDATE CONSTRAINT,
+        который не блокирует запись. False — ключ уже такой.
+        """
+        if not self.is_postgres:
+            print(f"  {table}.{column}: внешние ключи меняются только в PostgreSQL, пропускаем")
+            return False
+        current = self._inspect(lambda insp: [
+            fk for fk in insp.get_foreign_keys(table)
+            if fk["constrained_columns"] == [column] and fk["referred_table"] == ref_table
+        ])
+        wanted = (ondelete or "").upper()
+        if any((fk.get("options") or {}).get("ondelete", "").upper() == wanted for fk in current):
+            print(f"  {table}.{column}: внешний ключ уже задан, пропускаем")
+            return False
+
+        name = f"{table}_{column}_fkey"
+        with self.transaction():
+            for fk in current:
+                self.conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{fk["name"]}"'))
+            self.conn.execute(text(
+                f'ALTER TABLE {table} ADD CONSTRAINT "{name}" FOREIGN KEY ({column}) '
+                f"REFERENCES {ref_table}({ref_column})"
+                + (f" ON DELETE {wanted}" if wanted else "")
+                + " NOT VALID"
+            ))
+        with self.transaction():
+            self.conn.execute(text(f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"'))
+        print(f"  ✓ {table}.{column} → {ref_table}.{ref_column}" + (f" ON DELETE {wanted}" if wanted else ""))
+        return True
+
+    # --- backfill ---
+
+    def _load_progress(self, step: str) -> Optional[dict]:
+        with self.transaction():
+            row = self.conn.execute(
+                select(migration_progress).where(
+                    migration_progress.c.version == self.version,
+                    migration_progress.c.step == step,
+                )
+            ).mappings().first()
+        return dict(row) if row else None
+
+    def _save_progress(self, step: str, last_key: Optional[str], rows_done: int, done: bool) -> None:
+        """Позиция backfill — в текущей транзакции (вместе с данными пакета)."""
+        values = {"last_key": last_key, "rows_done": rows_done, "done": done, "updated_at": datetime.utcnow()}
+        key = (migration_progress.c.version == self.version) & (migration_progress.c.step == step)
+        updated = self.conn.execute(migration_progress.update().where(key).values(**values)).rowcount
+        if not updated:
+            self.conn.execute(migration_progress.insert().values(version=self.version, step=step, **values))
+
+    def backfill(
+        self,
+        step: str,
+        table: str,
+        pending,
+        fill: Callable[[Connection, list], None],
+        batch_size: Optional[int] = None,
+        final_pass: bool = True,
+    ) -> int:
+        """
+        Пакетное заполнение строк таблицы, для которых выполняется pending (условие SQLAlchemy).
+        fill(conn, ids) делает один set-based UPDATE по пакету id. Пакеты идут по возрастанию id
+        (keyset), в конце — контрольный проход с начала для строк, вставленных позади курсора
+        (final_pass=False — без него: для pending, который остаётся истинным после заполнения).
+        IntegrityError (например, совпадение случайного кода) — пакет повторяется.
+        Возвращает число обработанных строк.
+        """
+        t = Base.metadata.tables[table]
+        key_type = t.c.id.type.python_type
+        batch_size = batch_size or self.batch_size
+
+        state = self._load_progress(step)
+        if state and state["done"]:
+            print(f"  {step}: уже выполнен ({state['rows_done']} строк), пропускаем")
+            return 0
+        last = key_type(state["last_key"]) if state and state["last_key"] else None
+        rows_done = state["rows_done"] if state else 0
+        with self.transaction():
+            remaining = self.conn.execute(select(func.count()).select_from(t).where(pending)).scalar() or 0
+        total = rows_done + remaining
+        if state:
+            print(f"  {step}: продолжаем с {last} ({rows_done} строк уже обработано)")
+        print(f"  {step}: осталось {remaining} строк, пакет {batch_size}")
+
+        started = last_print = time.perf_counter()
+        processed = 0
+        restarted = False
+        while True:
+            for attempt in range(BATCH_RETRIES):
+                try:
+                    with self.transaction():
+                        query = select(t.c.id).where(pending)
+                        if last is not None:
+                            query = query.where(t.c.id > last)
+                        ids = self.conn.execute(query.order_by(t.c.id).limit(batch_size)).scalars().all()
+                        if ids:
+                            fill(self.conn, ids)
+                            self._save_progress(step, str(ids[-1]), rows_done + len(ids), done=False)
+                    break
+                except IntegrityError:
+                    if attempt == BATCH_RETRIES - 1:
+                        raise
+                    print(f"  {step}: конфликт уникальности в пакете, повторяем")
+            if not ids:
+                if last is None or restarted or not final_pass:
+                    break
+                restarted, last = True, None
+                continue
+
+            last = ids[-1]
+            rows_done += len(ids)
+            processed += len(ids)
+            now = time.perf_counter()
+            if now - last_print >= PROGRESS_PRINT_INTERVAL:
+                last_print = now
+                percent = rows_done / total * 100 if total else 100.0
+                rate = processed / max(now - started, 1e-6)
+                print(f"  {step}: {rows_done}/{total} ({percent:.1f}%), {rate:.0f} строк/с", flush=True)
+            if self.pause_ms:
+                time.sleep(self.pause_ms / 1000)
+
+        with self.transaction():
+            self._save_progress(step, None, rows_done, done=True)
+        print(f"  ✓ {step}: {processed} строк за {time.perf_counter() - started:.1f} с")
+        return processed
+
+
+def _applied_versions(conn: Connection) -> Dict[int, datetime]:
+    rows = conn.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all()
+    return {version: applied_at for version, applied_at in rows}
+
+
+@contextmanager
+def _runner_connection(engine: Engine):
+    """Соединение раннера: служебные таблицы, advisory lock (PostgreSQL) на время работы."""
+    is_postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as conn:
+        if is_postgres:
+            conn.execute(text("SET statement_timeout = 0"))
+            if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY}).scalar():
+                raise RuntimeError("Миграции уже выполняются другим процессом")
+        conn.commit()
+        try:
+            with conn.begin():
+                _metadata.create_all(conn, checkfirst=True)
+            yield conn
+        finally:
+            if conn.in_transaction():
+                conn.rollback()
+            if is_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+                conn.commit()
+
+
+def run_migrations(
+    target: Optional[int] = None,
+    engine: Optional[Engine] = None,
+    batch_size: Optional[int] = None,
+    pause_ms: Optional[int] = None,
+) -> dict:
+    """Применяет по порядку ещё не применённые миграции (до версии target включительно)."""
+    import migrations.versions  # noqa: F401 — регистрация миграций
+
+    own_engine = engine is None
+    engine = engine or make_engine()
+    applied_now: List[int] = []
+    try:
+        with _runner_connection(engine) as conn:
+            with conn.begin():
+                applied = _applied_versions(conn)
+            ctx = MigrationContext(
+                engine,
+                conn,
+                batch_size or settings.MIGRATION_BATCH_SIZE,
+                settings.MIGRATION_BATCH_PAUSE_MS if pause_ms is None else pause_ms,
+            )
+            try:
+                for m in MIGRATIONS:
+                    if m.version in applied or (target is not None and m.version > target):
+                        continue
+                    print("=" * 60)
+                    print(f"Миграция {m.version:04d}: {m.name}")
+                    t0 = time.perf_counter()
+                    ctx.version = m.version
+                    m.apply(ctx)
+                    duration_ms = int((time.perf_counter() - t0) * 1000)
+                    with ctx.transaction():
+                        conn.execute(schema_migrations.insert().values(
+                            version=m.version, name=m.name, applied_at=datetime.utcnow(), duration_ms=duration_ms,
+                        ))
+                    applied_now.append(m.version)
+                    print(f"✓ {m.version:04d} применена за {duration_ms / 1000:.1f} с")
+            finally:
+                ctx.close()
+            with conn.begin():
+                current = max(_applied_versions(conn), default=0)
+    finally:
+        if own_engine:
+            engine.dispose()
+    if not applied_now:
+        print(f"Новых миграций нет, версия схемы {current}")
+    return {"applied": applied_now, "current": current}
+
+
+def migration_status(engine: Optional[Engine] = None) -> List[dict]:
+    """Все известные миграции: применена ли, когда, и прогресс незавершённых backfill'ов."""
+    import migrations.versions  # noqa: F401
+
+    own_engine = engine is None
+    engine = engine or make_engine()
+    try:
+        with engine.connect() as conn:
+            if not inspect(conn).has_table(schema_migrations.name):
+                applied, progress = {}, []
+            else:
+                applied = _applied_versions(conn)
+                progress = conn.execute(
+                    select(migration_progress).where(migration_progress.c.done == False)  # noqa: E712
+                ).mappings().all()
+    finally:
+        if own_engine:
+            engine.dispose()
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "applied_at": applied[m.version].isoformat() if m.version in applied else None,
+            "backfills": {
+                p["step"]: {"rows_done": p["rows_done"], "last_key": p["last_key"]}
+                for p in progress if p["version"] == m.version
+            },
+        }
+        for m in MIGRATIONS
+    ]
@@ -0,0 +1,416 @@
+"""
+Миграции схемы по версиям. Новая миграция — функция с @migration(<следующий номер>, "<имя>");
+номера не переиспользуются, применённые миграции не редактируются.
+
+0001–0005 заменяют прежние скрипты init_db, migrate_referral_fields, migrate_custom_plan,
+migrate_enrollments и migrate_achievements.
+
+Код приложения (кроме моделей) миграции не импортируют: справочники и логика заполнения,
+нужные миграции, скопированы сюда в том виде, какой был при её написании, — иначе правка
+приложения незаметно меняла бы уже применённые миграции.
+
+Схема при этом не заморожена: create_tables, внешние ключи 0006 и таблицы в backfill
+берутся из текущих моделей (Base.metadata). На пустой БД 0001 создаёт таблицы уже в
+нынешнем виде, а следующие шаги находят колонки и индексы на месте и пропускают их.
+Поэтому модель меняют только вместе с новой миграцией, которая доводит до неё
+существующие БД, а колонку, которую читает старый backfill, из модели не удаляют.
+"""
+import secrets
+import string
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, or_, select, true, update
+from sqlalchemy.engine import Connection
+
+from app.database import Base
+from migrations.runner import MigrationContext, migration
+
+# Алфавиты кодов — как в app/routers/auth.py и app/routers/custom_workout_plans.py
+REFERRAL_CODE_ALPHABET = (
+    string.ascii_uppercase.replace("O", "").replace("I", "")
+    + string.digits.replace("0", "").replace("1", "")
+)
+PLAN_CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+# Таблицы бывшего init_db без тех, что создают 0003–0005
+INITIAL_TABLES = (
+    "users",
+    "user_profiles",
+    "workouts",
+    "exercise_results",
+    "dishes",
+    "food_log_entries",
+    "steps_entries",
+    "workout_sessions",
+    "activity_settings",
+)
+
+# Справочник достижений на момент 0005 (id, name, type, exercise_id, target)
+ACHIEVEMENTS_0005 = [
+    ("pushups_100", "Отжаться сто раз", "total_reps", "quick_pushups", 100),
+    ("pushups_1000", "Отжаться тысячу раз", "total_reps", "quick_pushups", 1000),
+    ("pullups_100", "Подтянуться сто раз", "total_reps", "quick_pullups", 100),
+    ("pullups_1000", "Подтянуться тысячу раз", "total_reps", "quick_pullups", 1000),
+    ("squats_100", "Присесть сто раз", "total_reps", "quick_squats", 100),
+    ("squats_1000", "Присесть тысячу раз", "total_reps", "quick_squats", 1000),
+    ("pushups_max_10", "Отжаться 10 раз за раз", "max_reps", "quick_pushups", 10),
+    ("pushups_max_20", "Отжаться 20 раз за раз", "max_reps", "quick_pushups", 20),
+    ("pushups_max_50", "Отжаться 50 раз за раз", "max_reps", "quick_pushups", 50),
+    ("pullups_max_5", "Подтянуться 5 раз за раз", "max_reps", "quick_pullups", 5),
+    ("pullups_max_10", "Подтянуться 10 раз за раз", "max_reps", "quick_pullups", 10),
+    ("pullups_max_20", "Подтянуться 20 раз за раз", "max_reps", "quick_pullups", 20),
+    ("squats_max_20", "Присесть 20 раз за раз", "max_reps", "quick_squats", 20),
+    ("squats_max_50", "Присесть 50 раз за раз", "max_reps", "quick_squats", 50),
+    ("squats_max_100", "Присесть 100 раз за раз", "max_reps", "quick_squats", 100),
+    ("plank_60", "Стоять в планке 60 секунд", "max_reps", "quick_plank", 60),
+    ("plank_120", "Стоять в планке 2 минуты", "max_reps", "quick_plank", 120),
+    ("plank_180", "Стоять в планке 3 минуты", "max_reps", "quick_plank", 180),
+    ("streak_3", "Заниматься 3 дня подряд", "streak", None, 3),
+    ("streak_5", "Заниматься 5 дней подряд", "streak", None, 5),
+    ("streak_7", "Заниматься неделю подряд", "streak", None, 7),
+    ("streak_14", "Заниматься 2 недели подряд", "streak", None, 14),
+    ("streak_30", "Заниматься месяц подряд", "streak", None, 30),
+]
+
+# Имена счётчиков app.code_service на момент 0007
+CODE_SEQUENCE_NAMES_0007 = ("referral", "plan")
+
+# Хранение дневных и недельных очков досок на момент 0013 (LEADERBOARD_RETENTION_DAYS)
+LEADERBOARD_RETENTION_DAYS_0013 = 35
+
+
+def _random_codes(count: int, alphabet: str, length: int = 8) -> List[str]:
+    codes = set()
+    while len(codes) < count:
+        codes.add("".join(secrets.choice(alphabet) for _ in range(length)))
+    return list(codes)
+
+
+def _fill_codes(table: str, column: str, alphabet: str) -> Callable[[Connection, list], None]:
+    """Пакет id → один UPDATE ... SET column = CASE id WHEN ... END. Совпадение с уже
+    существующим кодом ловит уникальный индекс (если он есть) — backfill повторит пакет."""
+    t = Base.metadata.tables[table]
+
+    def fill(conn: Connection, ids: list) -> None:
+        codes = dict(zip(ids, _random_codes(len(ids), alphabet)))
+        conn.execute(
+            update(t).where(t.c.id.in_(ids)).values({column: case(codes, value=t.c.id)})
+        )
+
+    return fill
+
+
+@migration(1, "initial_schema")
+def initial_schema(ctx: MigrationContext) -> None:
+    """Таблицы бывшего init_db (остальные создают следующие миграции)."""
+    ctx.create_tables(*INITIAL_TABLES)
+
+
+@migration(2, "referral_fields")
+def referral_fields(ctx: MigrationContext) -> None:
+    """users.referral_code / referred_by_id и коды для пользователей без кода."""
+    ctx.add_column("users", "referral_code")
+    ctx.add_column("users", "referred_by_id")
+    ctx.ensure_foreign_key("users", "referred_by_id", "users", ondelete="SET NULL")
+    # Уникальный индекс — до backfill: совпадения кодов отлавливаются сразу, по пакету
+    ctx.create_index("ix_users_referral_code", "users", ["referral_code"], unique=True)
+    users = Base.metadata.tables["users"]
+    ctx.backfill(
+        "referral_codes",
+        "users",
+        users.c.referral_code.is_(None),
+        _fill_codes("users", "referral_code", REFERRAL_CODE_ALPHABET),
+    )
+
+
+@migration(3, "custom_plan_fields")
+def custom_plan_fields(ctx: MigrationContext) -> None:
+    """custom_workout_plans.is_public / code и коды для планов без кода."""
+    ctx.create_tables("custom_workout_plans")
+    ctx.add_column("custom_workout_plans", "is_public", "BOOLEAN", default="FALSE", nullable=False)
+    ctx.add_column("custom_workout_plans", "code", "VARCHAR(12)")
+    plans = Base.metadata.tables["custom_workout_plans"]
+    ctx.backfill(
+        "plan_codes",
+        "custom_workout_plans",
+        or_(plans.c.code.is_(None), plans.c.code == ""),
+        _fill_codes("custom_workout_plans", "code", PLAN_CODE_ALPHABET),
+    )
+    # Индекс — после backfill: пустые коды '' старых записей нарушили бы уникальность
+    ctx.create_index("ix_custom_workout_plans_code", "custom_workout_plans", ["code"], unique=True)
+
+
+@migration(4, "plan_enrollments")
+def plan_enrollments(ctx: MigrationContext) -> None:
+    ctx.create_tables("user_plan_enrollments")
+
+
+@migration(5, "achievements")
+def achievements(ctx: MigrationContext) -> None:
+    """Таблицы достижений и справочник (если он пуст)."""
+    ctx.create_tables("achievements", "user_achievements")
+    t = Base.metadata.tables["achievements"]
+    with ctx.transaction() as conn:
+        if conn.execute(select(func.count()).select_from(t)).scalar():
+            print("  Справочник достижений уже заполнен, пропускаем")
+            return
+        conn.execute(insert(t), [
+            {"id": a_id, "name": name, "type": a_type, "exercise_id": exercise_id, "target": target}
+            for a_id, name, a_type, exercise_id, target in ACHIEVEMENTS_0005
+        ])
+    print(f"  ✓ Справочник достижений: {len(ACHIEVEMENTS_0005)} записей")
+
+
+@migration(6, "cascade_foreign_keys")
+def cascade_foreign_keys(ctx: MigrationContext) -> None:
+    """FK с ON DELETE из модели: CASCADE для user_id/plan_id, SET NULL для workout_id/referred_by_id."""
+    existing = {name for name in Base.metadata.tables if ctx.table_exists(name)}
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        for fk in table.foreign_keys:
+            if fk.ondelete:
+                ctx.ensure_foreign_key(
+                    table.name, fk.parent.name, fk.column.table.name, fk.column.name, fk.ondelete
+                )
+
+
+@migration(7, "code_sequences")
+def code_sequences(ctx: MigrationContext) -> None:
+    """Счётчики app.code_service: строки referral и plan со случайным ключом перестановки."""
+    ctx.create_tables("code_sequences")
+    t = Base.metadata.tables["code_sequences"]
+    with ctx.transaction() as conn:
+        existing = set(conn.execute(select(t.c.name)).scalars())
+        for name in CODE_SEQUENCE_NAMES_0007:
+            if name not in existing:
+                conn.execute(insert(t).values(name=name, next_block=0, secret=secrets.token_hex(32)))
+                print(f"  ✓ Счётчик кодов {name} создан")
+
+
+@migration(8, "plan_catalog_indexes")
+def plan_catalog_indexes(ctx: MigrationContext) -> None:
+    """Частичные индексы каталога публичных планов (newest, title) — CONCURRENTLY."""
+    ctx.create_index(
+        "ix_custom_workout_plans_public_created", "custom_workout_plans", ["created_at", "id"], where="is_public"
+    )
+    ctx.create_index(
+        "ix_custom_workout_plans_public_title", "custom_workout_plans", ["title", "id"], where="is_public"
+    )
+
+
+@migration(9, "plan_enrollment_counters")
+def plan_enrollment_counters(ctx: MigrationContext) -> None:
+    """custom_workout_plans.enrollment_count (пересчёт по записям), plan_trending и индексы рейтинга."""
+    ctx.add_column("custom_workout_plans", "enrollment_count", "INTEGER", default="0", nullable=False)
+    ctx.create_tables("plan_trending")
+    ctx.create_index("ix_user_plan_enrollments_enrolled_at", "user_plan_enrollments", ["enrolled_at"])
+
+    plans = Base.metadata.tables["custom_workout_plans"]
+    enrollments = Base.metadata.tables["user_plan_enrollments"]
+
+    def recount(conn: Connection, ids: list) -> None:
+        conn.execute(
+            update(plans)
+            .where(plans.c.id.in_(ids))
+            .values(enrollment_count=(
+                select(func.count())
+                .where(enrollments.c.plan_id == plans.c.id)
+                .scalar_subquery()
+            ))
+        )
+
+    # Условие пересчёта истинно всегда — контрольный проход с начала не нужен
+    ctx.backfill("enrollment_counts", "custom_workout_plans", true(), recount, final_pass=False)
+    ctx.create_index(
+        "ix_custom_workout_plans_public_popular",
+        "custom_workout_plans",
+        ["enrollment_count", "id"],
+        where="is_public",
+    )
+    # Первый рейтинг «в тренде» — как app.plan_catalog.refresh_trending на момент 0009
+    trending = Base.metadata.tables["plan_trending"]
+    now = datetime.utcnow()
+    recent = (
+        select(
+            enrollments.c.plan_id,
+            func.sum(case((enrollments.c.enrolled_at >= now - timedelta(days=7), 1), else_=0)),
+            func.count(),
+            literal(now),
+        )
+        .where(enrollments.c.enrolled_at >= now - timedelta(days=30))
+        .group_by(enrollments.c.plan_id)
+    )
+    with ctx.transaction() as conn:
+        conn.execute(delete(trending))
+        conn.execute(insert(trending).from_select(
+            ["plan_id", "enrollments_7d", "enrollments_30d", "refreshed_at"], recent
+        ))
+        count = conn.execute(select(func.count()).select_from(trending)).scalar()
+    print(f"  ✓ Рейтинг «в тренде»: {count} планов")
+
+
+def _slot_time_0010(value: Any) -> Optional[time]:
+    if not isinstance(value, str):
+        return None
+    try:
+        hours, minutes = (int(part) for part in value.strip().split(":"))
+        return time(hours, minutes)
+    except ValueError:
+        return None
+
+
+def _slot_rows_0010(plan_id, schedule) -> List[dict]:
+    """Слоты из schedule — как app.plan_schedule.slot_rows на момент 0010."""
+    rows = []
+    for position, slot in enumerate(schedule or []):
+        if not isinstance(slot, dict):
+            continue
+        day = slot.get("dayOfWeek")
+        slot_time = _slot_time_0010(slot.get("time"))
+        if not isinstance(day, int) or not 0 <= day <= 6 or slot_time is None:
+            continue
+        rows.append({
+            "plan_id": plan_id,
+            "position": position,
+            "day_of_week": day,
+            "time": slot_time,
+            "workout_id": str(slot.get("workoutId") or "")[:255],
+            "workout_name": str(slot.get("workoutName") or "")[:255],
+        })
+    return rows
+
+
+@migration(10, "plan_schedule_slots")
+def plan_schedule_slots(ctx: MigrationContext) -> None:
+    """plan_schedule_slots из JSON schedule существующих планов (пакетами по планам)."""
+    ctx.create_tables("plan_schedule_slots")
+    plans = Base.metadata.tables["custom_workout_plans"]
+    slots = Base.metadata.tables["plan_schedule_slots"]
+
+    def fill(conn: Connection, ids: list) -> None:
+        # Повтор пакета (возобновление) безопасен: слоты плана пишутся заново
+        conn.execute(delete(slots).where(slots.c.plan_id.in_(ids)))
+        rows = []
+        for plan_id, schedule in conn.execute(select(plans.c.id, plans.c.schedule).where(plans.c.id.in_(ids))):
+            rows += [{"id": uuid.uuid4(), **row} for row in _slot_rows_0010(plan_id, schedule)]
+        if rows:
+            conn.execute(insert(slots), rows)
+
+    # Новые планы пишут слоты сами — контрольный проход не нужен
+    ctx.backfill("schedule_slots", "custom_workout_plans", true(), fill, final_pass=False)
+
+
+@migration(11, "notification_outbox")
+def notification_outbox(ctx: MigrationContext) -> None:
+    """Очередь уведомлений и индексы (user_id, date) для проверки последней активности."""
+    ctx.create_tables("notification_outbox")
+    ctx.create_index(
+        "ix_notification_outbox_pending",
+        "notification_outbox",
+        ["next_attempt_at", "id"],
+        where="status = 'pending'",
+    )
+    ctx.create_index("ix_workout_sessions_user_date", "workout_sessions", ["user_id", "date"])
+    ctx.create_index("ix_exercise_results_user_date", "exercise_results", ["user_id", "date"])
+
+
+@migration(12, "achievement_push_pending_index")
+def achievement_push_pending_index(ctx: MigrationContext) -> None:
+    """Частичный индекс непоказанных пушей достижений (push_notified = false)."""
+    ctx.create_index(
+        "ix_user_achievements_push_pending",
+        "user_achievements",
+        ["user_id", "achieved_at"],
+        where="NOT push_notified",
+    )
+
+
+def _period_keys_0013(day: date) -> Dict[str, str]:
+    """Ключи периодов дня — как app.leaderboards.period_keys на момент 0013."""
+    year, week, _ = day.isocalendar()
+    return {"day": day.isoformat(), "week": f"{year}-W{week:02d}", "all": "all"}
+
+
+@migration(13, "leaderboards")
+def leaderboards(ctx: MigrationContext) -> None:
+    """Таблицы досок лидеров, очки по истории (пакетами по пользователям) и первый снимок мест."""
+    ctx.create_tables("leaderboard_scores", "leaderboard_ranks", "leaderboard_boards")
+    scores = Base.metadata.tables["leaderboard_scores"]
+    results = Base.metadata.tables["exercise_results"]
+    steps = Base.metadata.tables["steps_entries"]
+    sessions = Base.metadata.tables["workout_sessions"]
+    cutoff = _period_keys_0013(date.today() - timedelta(days=LEADERBOARD_RETENTION_DAYS_0013))
+    sources = {
+        "reps": (results.c.user_id, func.date(results.c.date), func.sum(results.c.reps)),
+        "steps": (steps.c.user_id, steps.c.date, func.sum(steps.c.steps)),
+        "workouts": (sessions.c.user_id, sessions.c.date, func.count()),
+    }
+
+    def fill(conn: Connection, ids: list) -> None:
+        # Повтор пакета (возобновление) безопасен: очки пользователей считаются заново
+        conn.execute(delete(scores).where(scores.c.user_id.in_(ids)))
+        totals = {}
+        for metric, (user_id, day, value) in sources.items():
+            query = select(user_id, day, value).where(user_id.in_(ids)).group_by(user_id, day)
+            for uid, activity_day, amount in conn.execute(query):
+                if not amount:
+                    continue
+                if isinstance(activity_day, str):  # SQLite: date() возвращает строку
+                    activity_day = date.fromisoformat(activity_day)
+                for period, key in _period_keys_0013(activity_day).items():
+                    if period != "all" and key < cutoff[period]:
+                        continue
+                    totals[(metric, period, key, uid)] = totals.get((metric, period, key, uid), 0) + int(amount)
+        if totals:
+            now = datetime.utcnow()
+            conn.execute(insert(scores), [
+                {"metric": metric, "period": period, "period_key": key, "user_id": uid,
+                 "score": score, "updated_at": now}
+                for (metric, period, key, uid), score in totals.items()
+            ])
+
+    # Новые результаты пишут очки сами — контрольный проход не нужен
+    ctx.backfill("leaderboard_scores", "users", true(), fill, final_pass=False)
+    # Первый снимок мест всех досок; дальше его обновляет app.leaderboards по расписанию
+    ranks = Base.metadata.tables["leaderboard_ranks"]
+    boards = Base.metadata.tables["leaderboard_boards"]
+    board = (scores.c.metric, scores.c.period, scores.c.period_key)
+    ranked = select(
+        *board,
+        scores.c.user_id,
+        func.rank().over(partition_by=board, order_by=scores.c.score.desc()),
+        scores.c.score,
+    ).where(scores.c.score > 0)
+    counted = select(*board, func.count(), literal(datetime.utcnow())).where(scores.c.score > 0).group_by(*board)
+    with ctx.transaction() as conn:
+        conn.execute(delete(ranks))
+        conn.execute(delete(boards))
+        conn.execute(insert(ranks).from_select(
+            ["metric", "period", "period_key", "user_id", "rank", "score"], ranked
+        ))
+        conn.execute(insert(boards).from_select(
+            ["metric", "period", "period_key", "entries", "refreshed_at"], counted
+        ))
+        count = conn.execute(select(func.count()).select_from(boards)).scalar()
+    print(f"  ✓ Доски лидеров: {count} досок")
+
+
+@migration(14, "referral_tree_index")
+def referral_tree_index(ctx: MigrationContext) -> None:
+    """Индекс (referred_by_id, created_at): приглашённые пользователя и обход реферальной сети."""
+    ctx.create_index("ix_users_referred_by_created", "users", ["referred_by_id", "created_at"])
+
+
+@migration(15, "notification_outbox_lease")
+def notification_outbox_lease(ctx: MigrationContext) -> None:
+    """Аренда захваченных к отправке строк outbox (status sending, lease_until) и индекс по ней."""
+    ctx.add_column("notification_outbox", "lease_until")
+    ctx.create_index(
+        "ix_notification_outbox_sending",
+        "notification_outbox",
+        ["lease_until"],
+        where="status = 'sending'",
+    )
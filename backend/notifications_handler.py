@@ -0,0 +1,36 @@
+"""
+Handler для Cloud Function напоминаний и пуш-уведомлений (app.notifications).
+Используется в Yandex Cloud Functions.
+
+В serverless фоновых задач app.lifespan нет, поэтому прогон запускает отдельная функция
+по таймеру: тот же zip, Handler: notifications_handler.handler, триггер-таймер раз в 5 минут
+(как NOTIFICATION_INTERVAL_SECONDS; окно NOTIFICATION_LOOKAHEAD_MINUTES — не меньше периода).
+Переменные окружения — как у основной функции. Отправителя подключает set_sender()
+при импорте модуля с его реализацией; без него сообщения уходят в LocalFakeSender.
+Прогон идёт под той же блокировкой, что и фоновая задача воркеров (app.locks.job_session).
+"""
+from app.locks import job_session
+from app.notifications import run_notifications
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Handler для Cloud Function
+    """
+    try:
+        with job_session("job:notifications") as db:
+            if db is None:
+                return {
+                    "statusCode": 200,
+                    "body": {"status": "skipped", "message": "Прогон уже идёт в другом процессе"},
+                }
+            result = run_notifications(db)
+        return {
+            "statusCode": 200,
+            "body": {"status": "ok", "message": "Уведомления обработаны", **result},
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": {"status": "error", "message": str(e)},
+        }
@@ -0,0 +1,20 @@
+"""
+Общие настройки тестов: приложение работает с SQLite во временном каталоге.
+
+Модели объявляют postgresql.UUID; в SQLite он создаётся как CHAR(32) — значения
+SQLAlchemy хранит там hex-строками.
+"""
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "app.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects.postgresql import UUID  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+
+
+@compiles(UUID, "sqlite")
+def _uuid_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
@@ -0,0 +1,81 @@
+"""
+Двухуровневый кеш (app.cache) с общим уровнем LocalSharedCache: несколько экземпляров Cache
+изображают процессы/контейнеры с общим backend.
+"""
+import threading
+import time
+
+from app.cache import Cache, LocalSharedCache, LRUCache, resource_tag
+
+USER_TAG = resource_tag("user_profiles", "u1")
+PUBLIC_TAG = resource_tag("custom_workout_plans")
+
+
+def _containers(count: int = 2, **kwargs) -> list:
+    shared = LocalSharedCache()
+    return [Cache(LRUCache(ttl_seconds=30.0), shared, **kwargs) for _ in range(count)]
+
+
+def test_shared_hit_fills_local_tier():
+    a, b = _containers()
+    assert a.get_or_set("k", lambda: {"v": 1}, tags=[PUBLIC_TAG]) == {"v": 1}
+    assert b.get_or_set("k", lambda: {"v": 2}, tags=[PUBLIC_TAG]) == {"v": 1}
+    assert b.get_or_set("k", lambda: {"v": 3}, tags=[PUBLIC_TAG]) == {"v": 1}
+    assert (a.stats()["misses"], b.stats()["shared_hits"], b.stats()["local_hits"]) == (1, 1, 1)
+
+
+def test_invalidation_reaches_shared_tier():
+    a, b = _containers()
+    a.get_or_set("k", lambda: 1, tags=[PUBLIC_TAG])
+    a.invalidate(PUBLIC_TAG)
+    assert b.get_or_set("k", lambda: 2, tags=[PUBLIC_TAG]) == 2
+    assert a.get_or_set("k", lambda: 3, tags=[PUBLIC_TAG]) == 2
+
+
+def test_user_data_short_local_ttl():
+    a, b = _containers(user_local_ttl=0.05)
+    assert b.get_or_set("profile:u1", lambda: "old", tags=[USER_TAG]) == "old"
+    a.get_or_set("profile:u1", lambda: "unused", tags=[USER_TAG])
+    # Запись в контейнере a: его локальный уровень и общий сброшены, локальный уровень b — нет
+    a.invalidate(USER_TAG)
+    assert a.get_or_set("profile:u1", lambda: "new", tags=[USER_TAG]) == "new"
+    time.sleep(0.06)
+    assert b.get_or_set("profile:u1", lambda: "unused", tags=[USER_TAG]) == "new"
+
+
+def test_public_data_keeps_local_ttl():
+    (a,) = _containers(1, user_local_ttl=0.01)
+    a.get_or_set("catalog", lambda: [1], tags=[PUBLIC_TAG])
+    time.sleep(0.02)
+    assert a.get_or_set("catalog", lambda: [2], tags=[PUBLIC_TAG]) == [1]
+
+
+def test_negative_result_kept_in_shared_tier_only():
+    a, b = _containers()
+    assert a.get_or_set("code:X", lambda: None, tags=[PUBLIC_TAG], negative_ttl=30) is None
+    assert len(a.local) == 0
+    assert b.get_or_set("code:X", lambda: {"found": True}, tags=[PUBLIC_TAG], negative_ttl=30) is None
+    a.invalidate(PUBLIC_TAG)
+    assert b.get_or_set("code:X", lambda: {"found": True}, tags=[PUBLIC_TAG], negative_ttl=30) == {"found": True}
+
+
+def test_none_without_negative_ttl_not_shared():
+    a, b = _containers()
+    assert a.get_or_set("k", lambda: None) is None
+    assert b.get_or_set("k", lambda: 5) == 5
+
+
+def test_counters_are_thread_safe():
+    (cache,) = _containers(1)
+    cache.get_or_set("k", lambda: 1)
+
+    def hit():
+        for _ in range(2000):
+            cache.get_or_set("k", lambda: 1)
+
+    threads = [threading.Thread(target=hit) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.stats()["local_hits"] == 8 * 2000
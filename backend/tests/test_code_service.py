@@ -0,0 +1,62 @@
+"""
+Выдача кодов (app.code_service): перестановка, запись в алфавите и блоки номеров
+из code_sequences. Два CodeAllocator на одной БД изображают два процесса.
+"""
+import pytest
+
+from app.code_service import (
+    CODE_LENGTH,
+    PLAN_ALPHABET,
+    REFERRAL_ALPHABET,
+    CodeAllocator,
+    KeyedPermutation,
+)
+from app.database import Base, engine
+from app.models import CodeSequence
+
+
+@pytest.fixture(scope="module", autouse=True)
+def code_sequences_table():
+    Base.metadata.create_all(engine, tables=[CodeSequence.__table__], checkfirst=True)
+
+
+@pytest.mark.parametrize("domain", [2, 7, 100, 1000])
+def test_permute_is_bijection(domain):
+    permutation = KeyedPermutation(b"secret", domain)
+    assert sorted(permutation.permute(n) for n in range(domain)) == list(range(domain))
+
+
+def test_permute_depends_on_key_and_rejects_out_of_range():
+    a, b = KeyedPermutation(b"a", 1000), KeyedPermutation(b"b", 1000)
+    assert [a.permute(n) for n in range(20)] != [b.permute(n) for n in range(20)]
+    with pytest.raises(ValueError):
+        a.permute(1000)
+
+
+@pytest.mark.parametrize("alphabet", [REFERRAL_ALPHABET, PLAN_ALPHABET])
+def test_encode_uses_alphabet_and_fixed_length(alphabet):
+    allocator = CodeAllocator("encode", alphabet)
+    for n in (0, 1, len(alphabet), allocator.domain // 2, allocator.domain - 1):
+        code = allocator.encode(n)
+        assert len(code) == CODE_LENGTH
+        assert set(code) <= set(alphabet)
+    assert allocator.encode(0) == alphabet[0] * CODE_LENGTH
+    assert allocator.encode(allocator.domain - 1) == alphabet[-1] * CODE_LENGTH
+
+
+def test_allocators_sharing_db_never_repeat_codes():
+    a = CodeAllocator("shared", PLAN_ALPHABET, block_size=3)
+    b = CodeAllocator("shared", PLAN_ALPHABET, block_size=3)
+    codes = []
+    # Вперемешку и с разной скоростью: блоки обоих процессов чередуются и пересекают границы
+    for i in range(20):
+        codes.append(a.next_code())
+        if i % 2:
+            codes.append(b.next_code())
+    assert len(codes) == 30
+    assert len(set(codes)) == len(codes)
+
+    # Перезапуск процесса: недоданный блок пропускается, старые коды не возвращаются
+    a.reset()
+    codes.extend(a.next_code() for _ in range(5))
+    assert len(set(codes)) == len(codes)
@@ -0,0 +1,107 @@
+"""
+Преобразование событий Yandex Cloud → AWS HTTP API v2 (handler._to_aws_http_api_v2)
+на записанных событиях benchmarks/fixtures/yc_events.json и разбор результата в Mangum.
+"""
+import base64
+import json
+import os
+from urllib.parse import parse_qsl
+
+import pytest
+from mangum import Mangum
+
+from handler import UNKNOWN_SOURCE_IP, _to_aws_http_api_v2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "yc_events.json")
+
+with open(FIXTURES, encoding="utf-8") as f:
+    EVENTS = {fx["name"]: fx["event"] for fx in json.load(f)}
+
+
+def _asgi_request(event: dict) -> dict:
+    """Что увидит ASGI-приложение: scope и тело запроса, собранные Mangum из события."""
+    seen = {}
+
+    async def app(scope, receive, send):
+        message = await receive()
+        seen["scope"], seen["body"] = scope, message.get("body", b"")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    Mangum(app, lifespan="off")(_to_aws_http_api_v2(event, None), None)
+    return seen
+
+
+def test_path_from_query_is_removed_from_params():
+    out = _to_aws_http_api_v2(EVENTS["yc_http_trigger_get_path_in_query"], None)
+    assert out["rawPath"] == "/exercise-results"
+    assert out["rawQueryString"] == "exercise_id=quick_pushups"
+    assert out["queryStringParameters"] == {"exercise_id": "quick_pushups"}
+    assert out["requestContext"]["http"]["sourceIp"] == "203.0.113.7"
+
+
+def test_percent_encoding_round_trip():
+    out = _to_aws_http_api_v2(EVENTS["full_url_encoded_query"], None)
+    assert out["rawPath"] == "/workouts"
+    assert out["rawQueryString"] == "category=%D1%81%D0%B8%D0%BB%D0%B0%20%26%20%D0%B1%D0%B5%D0%B3"
+    assert out["queryStringParameters"] == {"category": "сила & бег"}
+    scope = _asgi_request(EVENTS["full_url_encoded_query"])["scope"]
+    assert parse_qsl(scope["query_string"].decode()) == [("category", "сила & бег")]
+
+
+def test_url_with_query():
+    out = _to_aws_http_api_v2(EVENTS["yc_api_gateway_url_with_query"], None)
+    assert (out["rawPath"], out["rawQueryString"]) == ("/food-log", "date=2026-10-18&limit=50")
+
+
+def test_multi_value_params():
+    out = _to_aws_http_api_v2(EVENTS["multi_value_query"], None)
+    assert out["rawQueryString"] == "format=ndjson&tables=food_log&tables=steps"
+    assert out["queryStringParameters"] == {"format": "ndjson", "tables": "food_log,steps"}
+    scope = _asgi_request(EVENTS["multi_value_query"])["scope"]
+    assert parse_qsl(scope["query_string"].decode()) == [
+        ("format", "ndjson"), ("tables", "food_log"), ("tables", "steps"),
+    ]
+
+
+def test_empty_param_is_kept():
+    out = _to_aws_http_api_v2(EVENTS["empty_query_value_forwarded_for"], None)
+    assert out["rawPath"] == "/custom-workout-plans/public"
+    assert out["rawQueryString"] == "q=&limit=20"
+    assert out["queryStringParameters"] == {"q": "", "limit": "20"}
+    scope = _asgi_request(EVENTS["empty_query_value_forwarded_for"])["scope"]
+    assert parse_qsl(scope["query_string"].decode(), keep_blank_values=True) == [("q", ""), ("limit", "20")]
+
+
+def test_source_ip_ignores_forwarded_for():
+    out = _to_aws_http_api_v2(EVENTS["empty_query_value_forwarded_for"], None)
+    assert out["requestContext"]["http"]["sourceIp"] == UNKNOWN_SOURCE_IP
+
+
+def test_base64_body():
+    event = EVENTS["yc_http_trigger_post_base64"]
+    out = _to_aws_http_api_v2(event, None)
+    assert out["isBase64Encoded"] is True
+    assert out["body"] == event["body"]
+    body = _asgi_request(event)["body"]
+    assert body == base64.b64decode(event["body"])
+    assert json.loads(body)["dishName"] == "Гречка"
+
+
+@pytest.mark.parametrize("name", ["yc_http_trigger_get_path_in_query", "empty_query_value_forwarded_for"])
+def test_header_casing(name):
+    event = EVENTS[name]
+    out = _to_aws_http_api_v2(event, None)
+    assert out["headers"] == event["headers"]
+    user_agent = event["headers"].get("User-Agent") or event["headers"]["user-agent"]
+    assert out["requestContext"]["http"]["userAgent"] == user_agent
+    headers = dict(_asgi_request(event)["scope"]["headers"])
+    assert all(key == key.lower() for key in headers)
+    assert headers[b"user-agent"] == user_agent.encode()
+
+
+def test_docs_page_and_v2_passthrough():
+    assert _to_aws_http_api_v2(EVENTS["docs_page"], None)["rawPath"] == "/docs"
+    event = EVENTS["aws_http_api_v2_passthrough"]
+    assert _to_aws_http_api_v2(event, None) is event
@@ -0,0 +1,117 @@
+"""
+Раннер миграций на SQLite: учёт применённых версий и возобновление прерванного backfill.
+"""
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select, update
+
+import migrations.versions  # noqa: F401 — регистрация миграций
+from app.database import Base
+from migrations import migration_status, run_migrations
+from migrations.runner import (
+    MIGRATIONS,
+    MigrationContext,
+    _runner_connection,
+    make_engine,
+    migration_progress,
+    schema_migrations,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _applied(engine) -> list:
+    with engine.connect() as conn:
+        return conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version)).scalars().all()
+
+
+def test_versions_applied_once_and_up_to_target(engine):
+    all_versions = [m.version for m in MIGRATIONS]
+
+    first = run_migrations(target=3, engine=engine, pause_ms=0)
+    assert first == {"applied": [1, 2, 3], "current": 3}
+    assert _applied(engine) == [1, 2, 3]
+
+    rest = run_migrations(engine=engine, pause_ms=0)
+    assert rest["applied"] == all_versions[3:]
+    assert rest["current"] == all_versions[-1]
+
+    again = run_migrations(engine=engine, pause_ms=0)
+    assert again == {"applied": [], "current": all_versions[-1]}
+    assert _applied(engine) == all_versions
+    assert all(item["applied_at"] for item in migration_status(engine))
+
+
+def test_initial_schema_creates_only_its_tables(engine):
+    run_migrations(target=1, engine=engine, pause_ms=0)
+    with engine.connect() as conn:
+        tables = set(engine.dialect.get_table_names(conn))
+    assert "users" in tables
+    assert "custom_workout_plans" not in tables
+    assert "leaderboard_scores" not in tables
+
+
+def _users(engine, count: int) -> list:
+    users = Base.metadata.tables["users"]
+    ids = sorted(uuid.uuid4() for _ in range(count))
+    with engine.begin() as conn:
+        conn.execute(insert(users), [
+            {"id": user_id, "email": f"u{n}@example.com", "hashed_password": "x", "created_at": datetime.utcnow()}
+            for n, user_id in enumerate(ids)
+        ])
+    return ids
+
+
+def test_backfill_resumes_after_failure(engine):
+    run_migrations(engine=engine, pause_ms=0)
+    ids = _users(engine, 7)
+    users = Base.metadata.tables["users"]
+    pending = users.c.referral_code.is_(None)
+    seen = []
+
+    def fill(conn, batch):
+        seen.extend(batch)
+        conn.execute(update(users).where(users.c.id.in_(batch)).values(referral_code=users.c.email))
+
+    def fill_then_fail(conn, batch):
+        if len(seen) == 4:
+            raise RuntimeError("обрыв")
+        fill(conn, batch)
+
+    with _runner_connection(engine) as conn:
+        ctx = MigrationContext(engine, conn, batch_size=2, pause_ms=0)
+        ctx.version = 999
+        with pytest.raises(RuntimeError):
+            ctx.backfill("test_codes", "users", pending, fill_then_fail)
+
+    assert seen == ids[:4]
+    status = {p["step"]: p for p in _progress(engine)}
+    assert status["test_codes"]["rows_done"] == 4
+    assert uuid.UUID(status["test_codes"]["last_key"]) == ids[3]
+    assert not status["test_codes"]["done"]
+
+    seen.clear()
+    with _runner_connection(engine) as conn:
+        ctx = MigrationContext(engine, conn, batch_size=2, pause_ms=0)
+        ctx.version = 999
+        assert ctx.backfill("test_codes", "users", pending, fill) == 3
+        # Завершённый шаг повторно не выполняется
+        assert ctx.backfill("test_codes", "users", pending, fill) == 0
+
+    assert seen == ids[4:]
+    status = {p["step"]: p for p in _progress(engine)}
+    assert status["test_codes"]["done"] and status["test_codes"]["rows_done"] == 7
+    with engine.connect() as conn:
+        assert conn.execute(select(users.c.id).where(pending)).all() == []
+
+
+def _progress(engine) -> list:
+    with engine.connect() as conn:
+        return [dict(row) for row in conn.execute(select(migration_progress)).mappings()]
@@ -0,0 +1,34 @@
+"""
+Handler для Cloud Function пересчёта рейтинга «в тренде» (plan_trending).
+Используется в Yandex Cloud Functions.
+
+В serverless фоновых задач app.lifespan нет, поэтому рейтинг пересчитывает отдельная
+функция по таймеру: тот же zip, Handler: trending_handler.handler, триггер-таймер
+раз в 10 минут (как TRENDING_REFRESH_SECONDS). Переменные окружения — как у основной функции.
+Прогон идёт под той же блокировкой, что и фоновая задача воркеров (app.locks.job_session).
+"""
+from app.locks import job_session
+from app.plan_catalog import refresh_trending
+
+
+def handler(event: dict, context) -> dict:
+    """
+    Handler для Cloud Function
+    """
+    try:
+        with job_session("job:plan_trending") as db:
+            if db is None:
+                return {
+                    "statusCode": 200,
+                    "body": {"status": "skipped", "message": "Прогон уже идёт в другом процессе"},
+                }
+            plans = refresh_trending(db)
+        return {
+            "statusCode": 200,
+            "body": {"status": "ok", "message": "Рейтинг пересчитан", "plans": plans},
+        }
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": {"status": "error", "message": str(e)},
+        }
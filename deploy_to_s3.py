@@ -2,8 +2,28 @@
 """
 Скрипт для создания ZIP-архива и загрузки в Yandex Cloud S3 bucket
 для деплоя Cloud Functions
+
+Архив загружается только если изменился: SHA-256 содержимого хранится в метаданных объекта
+(x-amz-meta-sha256) и сравнивается с локальным перед загрузкой. Большие архивы идут
+параллельным multipart upload (размер части — не меньше 5 MB, минимум S3; число потоков
+настраивается). Загрузка идёт с контрольной суммой SHA-256 (ChecksumAlgorithm), после
+загрузки ChecksumSHA256 объекта сверяется с локально посчитанной: для multipart — SHA-256
+от SHA-256 частей + "-<число частей>". ETag как MD5 не годится при SSE-KMS — к нему
+скрипт возвращается, только если хранилище не отдаёт ChecksumSHA256 и объект не зашифрован KMS.
+
+Для проверки без облака подойдёт любой S3-совместимый сервер, например MinIO из
+backend/docker-compose.yml (профиль s3):
+    docker compose -f backend/docker-compose.yml --profile s3 up -d s3
+    python deploy_to_s3.py --endpoint http://localhost:9000 --access-key minioadmin \\
+        --secret-key minioadmin --create-bucket
 """
+import argparse
+import base64
+import hashlib
 import os
+import sys
+import threading
+import time
 import zipfile
 import subprocess
 import shutil
@@ -11,69 +31,258 @@ import tempfile
 import boto3
 from pathlib import Path
 
-# Настройки S3
-S3_ENDPOINT = 'https://storage.yandexcloud.net'
-S3_BUCKET = 'testbackpython'
+# Настройки S3 (переопределяются переменными окружения и аргументами командной строки)
+S3_ENDPOINT = os.environ.get('S3_ENDPOINT', 'https://storage.yandexcloud.net')
+S3_BUCKET = os.environ.get('S3_BUCKET', 'testbackpython')
 
 # Настройки сборки
 BACKEND_DIR = './backend'
 ZIP_FILENAME = 'function.zip'
-S3_ACCESS_KEY = ''
-S3_SECRET_KEY = ''
+S3_ACCESS_KEY = os.environ.get('S3_ACCESS_KEY', '')
+S3_SECRET_KEY = os.environ.get('S3_SECRET_KEY', '')
 INSTALL_DEPENDENCIES = True  # Установить зависимости из requirements.txt в архив
 
-def upload_zip_to_s3(zip_file, bucket_name):
+# Параметры загрузки
+PART_SIZE_MB = 8      # размер части multipart upload (и порог, с которого он включается)
+MIN_PART_SIZE_MB = 5  # меньше S3 не принимает (s3transfer молча увеличил бы часть)
+CONCURRENCY = 8       # число параллельно загружаемых частей
+HASH_METADATA_KEY = 'sha256'
+
+
+def file_digests(path, part_size):
     """
-    Загружает ZIP-архив в S3 bucket
+    SHA-256 файла, ожидаемые ChecksumSHA256 и ETag S3 за один проход.
+    Для обычной загрузки это base64 SHA-256 и MD5 файла. Для multipart (файл не меньше
+    part_size, как в TransferConfig ниже) — хеш от хешей частей + "-<число частей>".
     """
-    print(f"\n☁️ Загружаю {zip_file} в S3...")
-    
+    sha256 = hashlib.sha256()
+    whole_md5 = hashlib.md5()
+    part_sha256s = []
+    part_md5s = []
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(part_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            sha256.update(chunk)
+            whole_md5.update(chunk)
+            part_sha256s.append(hashlib.sha256(chunk).digest())
+            part_md5s.append(hashlib.md5(chunk).digest())
+    if size >= part_size:
+        composite = base64.b64encode(hashlib.sha256(b''.join(part_sha256s)).digest()).decode('ascii')
+        checksum = f"{composite}-{len(part_sha256s)}"
+        etag = f"{hashlib.md5(b''.join(part_md5s)).hexdigest()}-{len(part_md5s)}"
+    else:
+        checksum = base64.b64encode(sha256.digest()).decode('ascii')
+        etag = whole_md5.hexdigest()
+    return sha256.hexdigest(), checksum, etag
+
+
+def verify_upload(s3_client, bucket_name, key, expected_checksum, expected_etag):
+    """
+    Сверяет загруженный объект с локальным файлом: ChecksumSHA256, иначе ETag.
+    (True, описание) — совпало или сверять нечем; (False, описание) — расхождение.
+    """
+    from botocore.exceptions import ClientError
+
+    head = s3_client.head_object(Bucket=bucket_name, Key=key, ChecksumMode='ENABLED')
+    checksum = head.get('ChecksumSHA256')
+    if not checksum:
+        # Часть S3-совместимых хранилищ отдаёт контрольную сумму только в GetObjectAttributes
+        try:
+            attributes = s3_client.get_object_attributes(Bucket=bucket_name, Key=key, ObjectAttributes=['Checksum'])
+            checksum = (attributes.get('Checksum') or {}).get('ChecksumSHA256')
+        except ClientError:
+            checksum = None
+    if checksum:
+        # GetObjectAttributes отдаёт сумму multipart-объекта без суффикса "-<число частей>"
+        if checksum.split('-')[0] != expected_checksum.split('-')[0]:
+            return False, f"ChecksumSHA256 не совпал: в бакете {checksum}, ожидался {expected_checksum}"
+        return True, "ChecksumSHA256 совпал"
+    if head.get('ServerSideEncryption') == 'aws:kms':
+        # ETag объекта с SSE-KMS — не MD5 содержимого
+        return True, "хранилище не вернуло ChecksumSHA256, объект зашифрован KMS — проверка пропущена"
+    etag = head['ETag'].strip('"')
+    if etag != expected_etag:
+        return False, f"ETag не совпал: в бакете {etag}, ожидался {expected_etag}"
+    return True, "ETag совпал (хранилище не вернуло ChecksumSHA256)"
+
+
+class UploadProgress:
+    """Callback для boto3: прогресс загрузки (вызывается из нескольких потоков)."""
+
+    def __init__(self, total, interval=0.5):
+        self.total = total
+        self.interval = interval
+        self.sent = 0
+        self.started = time.perf_counter()
+        self._last_print = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, bytes_amount):
+        with self._lock:
+            self.sent += bytes_amount
+            now = time.perf_counter()
+            if now - self._last_print < self.interval and self.sent < self.total:
+                return
+            self._last_print = now
+            elapsed = max(now - self.started, 1e-6)
+            percent = self.sent / self.total * 100 if self.total else 100.0
+            speed = self.sent / elapsed / 1024 / 1024
+            sys.stdout.write(
+                f"\r   {percent:5.1f}%  {self.sent / 1024 / 1024:.2f} / {self.total / 1024 / 1024:.2f} MB  {speed:.2f} MB/s"
+            )
+            if self.sent >= self.total:
+                sys.stdout.write("\n")
+            sys.stdout.flush()
+
+
+def make_s3_client(endpoint=S3_ENDPOINT, access_key=S3_ACCESS_KEY, secret_key=S3_SECRET_KEY, max_pool_connections=CONCURRENCY):
+    from botocore.config import Config
+
     session = boto3.session.Session()
-    s3_client = session.client(
+    return session.client(
         service_name='s3',
-        endpoint_url=S3_ENDPOINT,
-        aws_access_key_id=S3_ACCESS_KEY,
-        aws_secret_access_key=S3_SECRET_KEY
+        endpoint_url=endpoint,
+        # Пустые ключи — стандартная цепочка boto3 (переменные AWS_*, ~/.aws/credentials)
+        aws_access_key_id=access_key or None,
+        aws_secret_access_key=secret_key or None,
+        # Пул соединений не меньше числа потоков загрузки
+        config=Config(max_pool_connections=max(10, max_pool_connections)),
     )
-    
+
+
+def remote_sha256(s3_client, bucket_name, key):
+    """SHA-256 из метаданных объекта в бакете или None, если объекта нет."""
+    from botocore.exceptions import ClientError
+
+    try:
+        head = s3_client.head_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return head.get('Metadata', {}).get(HASH_METADATA_KEY)
+
+
+def upload_zip_to_s3(zip_file, bucket_name, key=None, s3_client=None, part_size_mb=PART_SIZE_MB,
+                     concurrency=CONCURRENCY, force=False):
+    """
+    Загружает ZIP-архив в S3 bucket, если его содержимое изменилось
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    if part_size_mb < MIN_PART_SIZE_MB:
+        raise ValueError(f"Размер части multipart upload — не меньше {MIN_PART_SIZE_MB} MB")
+    key = key or os.path.basename(zip_file)
+    part_size = int(part_size_mb * 1024 * 1024)
+    if s3_client is None:
+        s3_client = make_s3_client(max_pool_connections=concurrency)
+
     file_size = os.path.getsize(zip_file)
-    zip_name = os.path.basename(zip_file)
-    
+    digest, expected_checksum, expected_etag = file_digests(zip_file, part_size)
+
     try:
-        with open(zip_file, 'rb') as f:
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=zip_name,
-                Body=f,
-                ContentType='application/zip'
-            )
-        
-        print(f"✅ Загружено: {zip_name} ({file_size / 1024 / 1024:.2f} MB)")
+        if not force and remote_sha256(s3_client, bucket_name, key) == digest:
+            print(f"\n⏭️ {key} не изменился (sha256 {digest[:12]}…) — загрузка пропущена")
+            return True
+
+        print(f"\n☁️ Загружаю {zip_file} в S3 ({file_size / 1024 / 1024:.2f} MB, "
+              f"части по {part_size_mb} MB, потоков: {concurrency})...")
+        config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=concurrency,
+            use_threads=concurrency > 1,
+        )
+        s3_client.upload_file(
+            zip_file,
+            bucket_name,
+            key,
+            ExtraArgs={
+                'ContentType': 'application/zip',
+                'Metadata': {HASH_METADATA_KEY: digest},
+                'ChecksumAlgorithm': 'SHA256',
+            },
+            Config=config,
+            Callback=UploadProgress(file_size),
+        )
+
+        verified, details = verify_upload(s3_client, bucket_name, key, expected_checksum, expected_etag)
+        if not verified:
+            print(f"❌ {details}")
+            return False
+
+        print(f"✅ Загружено: {key} ({file_size / 1024 / 1024:.2f} MB, {details})")
         print(f"\n🎯 Для Cloud Function укажите:")
         print(f"   Бакет: {bucket_name}")
-        print(f"   Объект: {zip_name}")
+        print(f"   Объект: {key}")
         return True
-        
+
     except Exception as e:
         print(f"❌ Ошибка загрузки: {e}")
         return False
 
 
+def part_size_arg(value):
+    """--part-size-mb: число не меньше MIN_PART_SIZE_MB."""
+    try:
+        size = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"не число: {value}")
+    if size < MIN_PART_SIZE_MB:
+        raise argparse.ArgumentTypeError(f"не меньше {MIN_PART_SIZE_MB} MB (минимальная часть S3)")
+    return size
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Загрузка архива функции в S3")
+    parser.add_argument('--file', default='./backend/lambda-deployment.zip', help="путь к ZIP-архиву")
+    parser.add_argument('--bucket', default=S3_BUCKET)
+    parser.add_argument('--key', default=None, help="имя объекта (по умолчанию — имя файла)")
+    parser.add_argument('--endpoint', default=S3_ENDPOINT, help="S3 endpoint (например http://localhost:9000 для MinIO)")
+    parser.add_argument('--access-key', default=S3_ACCESS_KEY)
+    parser.add_argument('--secret-key', default=S3_SECRET_KEY)
+    parser.add_argument('--part-size-mb', type=part_size_arg, default=PART_SIZE_MB,
+                        help=f"размер части multipart upload, MB (не меньше {MIN_PART_SIZE_MB})")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="число параллельных потоков загрузки")
+    parser.add_argument('--force', action='store_true', help="загрузить, даже если архив не изменился")
+    parser.add_argument('--create-bucket', action='store_true', help="создать бакет, если его нет (локальный S3)")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     print("🚀 Деплой backend в Yandex Cloud Functions")
     print("=" * 60)
-    
-    zip_path = './backend/lambda-deployment.zip'
+
+    started = time.perf_counter()
+    s3_client = make_s3_client(args.endpoint, args.access_key, args.secret_key, args.concurrency)
+    if args.create_bucket:
+        existing = {b['Name'] for b in s3_client.list_buckets().get('Buckets', [])}
+        if args.bucket not in existing:
+            s3_client.create_bucket(Bucket=args.bucket)
 
     # Загружаем в S3
-    success = upload_zip_to_s3(zip_path, S3_BUCKET)
-    
+    success = upload_zip_to_s3(
+        args.file,
+        args.bucket,
+        key=args.key,
+        s3_client=s3_client,
+        part_size_mb=args.part_size_mb,
+        concurrency=args.concurrency,
+        force=args.force,
+    )
+
     if success:
         print("\n" + "=" * 60)
-        print("✨ Деплой завершен успешно!")
+        print(f"✨ Деплой завершен успешно! ({time.perf_counter() - started:.2f} с)")
         print(f"   Точка входа: handler.handler")
     else:
         print("\n❌ Деплой завершен с ошибками")
+        sys.exit(1)
 
 
 if __name__ == '__main__':
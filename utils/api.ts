@@ -145,6 +145,7 @@ export interface ReferralUser {
   id: string;
   email: string;
   created_at: string;
+  last_activity_date?: string | null;
 }
 
 export interface ReferralsListResponse {
@@ -152,6 +153,16 @@ export interface ReferralsListResponse {
   total_count: number;
 }
 
+export interface ReferralStatsResponse {
+  depth: number;
+  active_days: number;
+  direct_count: number;
+  active_direct_count: number;
+  downline_count: number;
+  active_downline_count: number;
+  levels: { level: number; count: number; active_count: number }[];
+}
+
 export interface UserMeResponse {
   created_at: string;
 }
@@ -173,8 +184,15 @@ export async function getMyReferralCode(): Promise<ReferralCodeResponse> {
 /**
  * Получить список пользователей, которых пригласил текущий пользователь
  */
-export async function getMyReferrals(): Promise<ReferralsListResponse> {
-  return apiRequest<ReferralsListResponse>('/auth/my-referrals');
+export async function getMyReferrals(limit = 100, offset = 0): Promise<ReferralsListResponse> {
+  return apiRequest<ReferralsListResponse>(`/auth/my-referrals?limit=${limit}&offset=${offset}`);
+}
+
+/**
+ * Статистика реферальной сети: приглашённые, нижняя линия по уровням, активные
+ */
+export async function getMyReferralStats(depth?: number): Promise<ReferralStatsResponse> {
+  return apiRequest<ReferralStatsResponse>(depth ? `/auth/my-referrals/stats?depth=${depth}` : '/auth/my-referrals/stats');
 }
 
 // ==================== ТРЕНИРОВКИ ====================
@@ -466,6 +484,28 @@ export async function markAchievementPushNotified(achievementId: string): Promis
   });
 }
 
+/**
+ * Достижения, пуш по которым ещё не показан
+ */
+export async function getPendingAchievementNotifications(): Promise<CheckAchievementsResponse['newly_awarded']> {
+  return apiRequest<CheckAchievementsResponse['newly_awarded']>('/achievements/pending-notifications');
+}
+
+/**
+ * Отметить пуши отправленными одним запросом: по списку id или все полученные до upTo
+ */
+export async function markAchievementsPushNotified(
+  selector: { achievementIds: string[] } | { upTo: string }
+): Promise<{ success: boolean; updated: number }> {
+  const body = 'achievementIds' in selector
+    ? { achievement_ids: selector.achievementIds }
+    : { up_to: selector.upTo };
+  return apiRequest<{ success: boolean; updated: number }>('/achievements/push-notified', {
+    method: 'POST',
+    body: JSON.stringify(body),
+  });
+}
+
 // ==================== ПОЛЬЗОВАТЕЛЬСКИЕ ПЛАНЫ ТРЕНИРОВОК ====================
 
 export interface PlanSlot {
@@ -499,6 +539,35 @@ export async function getPublicWorkoutPlans(): Promise<CustomWorkoutPlan[]> {
   return apiRequest<CustomWorkoutPlan[]>('/custom-workout-plans/public');
 }
 
+export interface PlanSummary {
+  id: string;
+  title: string;
+  description: string | null;
+  slots_count: number;
+  enrollment_count: number;
+  created_at: string;
+}
+
+export interface PlanCatalogPage {
+  items: PlanSummary[];
+  next_cursor: string | null;
+}
+
+export type PlanCatalogSort = 'newest' | 'popular' | 'title';
+
+/**
+ * Каталог публичных планов: краткие карточки без расписания, постранично (cursor — next_cursor предыдущей страницы)
+ */
+export async function getPublicPlanCatalog(
+  sort: PlanCatalogSort = 'newest',
+  cursor?: string | null,
+  limit = 20
+): Promise<PlanCatalogPage> {
+  const query = new URLSearchParams({ sort, limit: String(limit) });
+  if (cursor) query.set('cursor', cursor);
+  return apiRequest<PlanCatalogPage>(`/custom-workout-plans/catalog?${query.toString()}`);
+}
+
 /**
  * Получить публичный план по ID
  */